@@ -14,15 +14,52 @@ class AbuseIpDb(object):
     Can handle version 2 of the API.
 
     For links to the documentation see the modules.
+
+    Pass a cache, e.g. :class:`abuseipdb.cache.LookupCache`, to reuse the
+    results of earlier checks.
+
+    With ``models`` the results of ``blacklist``, ``check``,
+    ``check_block`` and ``sweep_network`` are compact objects from
+    :mod:`abuseipdb.models` instead of dictionaries.  Errors are still
+    returned as a list.
+
+    Any additional keyword arguments are passed on to the API class.  For
+    APIv2 these configure the connection pool, e.g. ``pool_maxsize``, the
+    ``rate_limiter``, the ``retry_policy``, see
+    :class:`abuseipdb.retry.RetryPolicy`, and the ``instrumentation``, see
+    :class:`abuseipdb.metrics.MetricsRegistry`.  Use the instance as a context
+    manager or call ``close()`` to release the pooled connections.
     """
 
-    def __init__(self, api_key, api_version=AbuseIpDbV2.VERSION, subscriber=False):
-        if api_version == AbuseIpDbV2.VERSION:
-            self.api = AbuseIpDbV2(api_key=api_key, subscriber=subscriber)
+    API_CLASSES = {
+        AbuseIpDbV2.VERSION: AbuseIpDbV2,
+    }
+
+    def __init__(self, api_key, api_version=AbuseIpDbV2.VERSION, subscriber=False, cache=None, models=False,
+                 **kwargs):
+        self.cache = cache
+        self.models = models
+        self.instrumentation = kwargs.get('instrumentation')
+        if api_version in self.API_CLASSES:
+            api_class = self.API_CLASSES[api_version]
+            self.api = api_class(api_key=api_key, subscriber=subscriber, **kwargs)
         else:
             msg = 'API version {} is not supported'
             raise ValueError(msg.format(api_version))
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the pooled connections of the underlying API"""
+        self.api.close()
+
+    def _max_age(self, max_age_in_days):
+        return int(max_age_in_days or self.api.DEFAULT.MAX_AGE_IN_DAYS)
+
     def _normalize_categories(self, categories):
         cleaned_categories = set([])
         unknown_categories = set([])
@@ -47,26 +84,177 @@ class AbuseIpDb(object):
             raise ValueError(msg.format(','.join(unknown_categories)))
         return ','.join(sorted(cleaned_categories))
 
+    def _cached_lookup(self, key, lookup):
+        if self.cache is None:
+            return lookup()
+        result = self.cache.get(key)
+        if self.instrumentation is not None:
+            self.instrumentation.cache_lookup(key[0], result is not None)
+        if result is None:
+            result = lookup()
+            # Errors are returned as a list.  Those must not be cached.
+            if isinstance(result, dict):
+                self.cache.set(key, result)
+        return result
+
+    def _as_model(self, name, result):
+        # Errors are returned as a list and stay as they are
+        if not self.models or not isinstance(result, dict):
+            return result
+        from abuseipdb import models
+        return getattr(models, name).from_dict(result)
+
+    def _as_blacklist_entries(self, result):
+        if not self.models:
+            return result
+        from abuseipdb.models import BlacklistEntry, is_error
+        if is_error(result):
+            return result
+        return [BlacklistEntry.from_dict(entry) for entry in result]
+
+    @staticmethod
+    def _iter_models(name, entries):
+        from abuseipdb import models
+        from_dict = getattr(models, name).from_dict
+        for entry in entries:
+            yield from_dict(entry)
+
+    @staticmethod
+    def _unique_addresses(ip_addresses):
+        seen = set()
+        for ip_address in ip_addresses:
+            try:
+                key = ipaddress.ip_address(ip_address)
+            except ValueError:
+                key = ip_address
+            if key in seen:
+                continue
+            seen.add(key)
+            yield ip_address
+
     def blacklist(self, confidence_minimum=None, limit=None):
         """Retrieve a list of blacklisted IP addresses"""
-        return self.api.blacklist(confidence_minimum, limit)
+        return self._as_blacklist_entries(self.api.blacklist(confidence_minimum, limit))
+
+    def bulk_report(self, reports):
+        """Report a list of IP addresses by uploading CSV files
 
-    def bulk_report(self, file_name):
-        """Report a list of IP addresses by uploading a CSV file"""
-        return self.api.bulk_report(file_name)
+        ``reports`` is the name of a CSV file or an iterable of reports.
+        Category names are translated to their numbers.  Reports with
+        unknown categories are uploaded unchanged and show up as rejected
+        in the result.
+        """
+        if isinstance(reports, str):
+            from abuseipdb.bulk import read_reports
+            reports = read_reports(reports)
+        return self.api.bulk_report(self._normalize_reports(reports))
+
+    def _normalize_reports(self, reports):
+        from abuseipdb.bulk import normalize_report
+        for report in reports:
+            report = list(normalize_report(report))
+            try:
+                report[1] = self._normalize_categories(report[1])
+            except ValueError:
+                pass
+            yield report
 
     def check(self, ip_address, max_age_in_days=None):
         """Check a single IPv4 or IPv6 address"""
-        ipaddress.ip_address(ip_address)
-        return self.api.check(ip_address, max_age_in_days)
+        key = ('check', str(ipaddress.ip_address(ip_address)), self._max_age(max_age_in_days))
+        result = self._cached_lookup(key, lambda: self.api.check(ip_address, max_age_in_days))
+        return self._as_model('CheckResult', result)
 
     def check_block(self, cidr_network, max_age_in_days=None):
         """Check a CIDR network block"""
-        ipaddress.ip_network(cidr_network)
-        return self.api.check_block(cidr_network, max_age_in_days)
+        return self._as_model('BlockResult', self._check_block(cidr_network, max_age_in_days))
+
+    def _check_block(self, cidr_network, max_age_in_days):
+        key = ('check-block', str(ipaddress.ip_network(cidr_network)), self._max_age(max_age_in_days))
+        return self._cached_lookup(key, lambda: self.api.check_block(cidr_network, max_age_in_days))
+
+    def check_many(self, ip_addresses, max_age_in_days=None, concurrency=10, planner=None):
+        """Check many IPv4 or IPv6 addresses concurrently
+
+        Yields ``(ip_address, result)`` tuples as the checks complete.  Each
+        address is only checked once.  For invalid addresses and failed
+        requests the exception is yielded instead of the result.
+
+        With a :class:`abuseipdb.planner.CheckPlanner` addresses clustered in
+        a network are answered by a single ``check_block`` call.  Then all
+        addresses are read before the first request.
+        """
+        from abuseipdb.workers import imap_unordered
+
+        if planner is None:
+            def check(ip_address):
+                return self.check(ip_address, max_age_in_days)
+            return imap_unordered(check, self._unique_addresses(ip_addresses), concurrency)
+
+        from abuseipdb.planner import answer_from_block
+        plan = planner.plan(self._unique_addresses(ip_addresses))
+
+        def run(task):
+            network, members = task
+            if network is None:
+                return [(members[0], self.check(members[0], max_age_in_days))]
+            data = self._check_block(str(network), max_age_in_days)
+            return [
+                (ip_address, self._as_model('CheckResult', result))
+                for ip_address, result in answer_from_block(members, data)]
+        tasks = [(None, [ip_address]) for ip_address in plan.checks] + plan.blocks
+        return self._expand_answers(imap_unordered(run, tasks, concurrency))
+
+    @staticmethod
+    def _expand_answers(results):
+        for (network, members), answers in results:
+            if isinstance(answers, Exception):
+                answers = [(ip_address, answers) for ip_address in members]
+            for answer in answers:
+                yield answer
+
+    def export_firewall(self, firewall='nft', set_name='abuseipdb', confidence_minimum=None, limit=None,
+                        state_file=None, full=False):
+        """Return the lines loading the blacklist into nftables or ipset sets
+
+        The blacklist is streamed as plain text and collapsed into CIDR
+        networks.  With ``state_file`` only the changes since the last
+        committed export are written, see :mod:`abuseipdb.firewall`.
+        """
+        from abuseipdb.firewall import export_firewall
+        entries = self.api.iter_blacklist(confidence_minimum, limit, plaintext=True)
+        return export_firewall(entries, firewall, set_name, state_file, full)
+
+    def iter_blacklist(self, confidence_minimum=None, limit=None, plaintext=False):
+        """Yield the blacklisted IP addresses while they are downloaded
+
+        The memory needed is independent of the size of the blacklist.
+        """
+        entries = self.api.iter_blacklist(confidence_minimum, limit, plaintext)
+        if self.models and not plaintext:
+            return self._iter_models('BlacklistEntry', entries)
+        return entries
 
     def report(self, ip_address, categories, comment=""):
         """Report a single IPv4 or IPv6 address"""
         ipaddress.ip_address(ip_address)
         categories = self._normalize_categories(categories)
         return self.api.report(ip_address, categories, comment)
+
+    def sweep_network(self, cidr_network, max_age_in_days=None, concurrency=10):
+        """Check a network of any size with concurrent check_block calls
+
+        The network is split into the largest blocks the API accepts.
+        Yields the reported addresses of all blocks sorted by address, see
+        :mod:`abuseipdb.sweep`.
+        """
+        from abuseipdb.sweep import sweep_network
+
+        network = ipaddress.ip_network(cidr_network)
+
+        def check_block(block):
+            return self._check_block(block, max_age_in_days)
+        entries = sweep_network(check_block, network, self.api.block_prefixlen(network.version), concurrency)
+        if self.models:
+            return self._iter_models('ReportedAddress', entries)
+        return entries
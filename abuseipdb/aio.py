@@ -0,0 +1,275 @@
+"""Asynchronous clients for the AbuseIpDb service
+
+This module requires ``aiohttp``.  Install it with ``pip install abuseipdb[async]``.
+
+The classes mirror :class:`abuseipdb.AbuseIpDb` and
+:class:`abuseipdb.api_v2.AbuseIpDbV2`.  Parameter validation, category
+normalization and the handling of 422 and 429 responses are shared with
+the synchronous clients.  All API methods are coroutines.  The helpers
+``check_many``, ``sweep_network``, ``export_firewall`` and
+``iter_blacklist`` of the synchronous client raise ``TypeError``.  Gather
+the coroutines of ``check`` or ``check_block``, or await ``blacklist``
+instead.
+"""
+import asyncio
+import ipaddress
+import time
+
+import aiohttp
+
+from abuseipdb import AbuseIpDb, codec
+from abuseipdb.api_v2 import AbuseIpDbV2
+
+
+class _AsyncChunks(object):
+    """Asynchronous iterator over the chunks of a body, aiohttp streams those
+
+    A class instead of an asynchronous generator, which needs Python 3.6.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        for chunk in self._chunks:
+            return chunk
+        raise StopAsyncIteration
+
+
+class AsyncAbuseIpDbV2(AbuseIpDbV2):
+    """Asynchronous wrapper for the AbuseIpDb API version 2
+
+    At most ``max_concurrency`` requests are in flight at the same time.
+    Further calls wait for a free slot without blocking the event loop.
+    """
+
+    def __init__(self, api_key, subscriber=False, max_concurrency=10, **kwargs):
+        super(AsyncAbuseIpDbV2, self).__init__(api_key, subscriber=subscriber, **kwargs)
+        if max_concurrency < 1:
+            raise ValueError('Maximum concurrency must be greater than 0')
+        self._max_concurrency = max_concurrency
+        self._semaphore = None
+
+    def __enter__(self):
+        raise TypeError('Use "async with" for {}'.format(type(self).__name__))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close all pooled connections"""
+        session, self._session = self._session, None
+        if session is not None:
+            await session.close()
+
+    def _get_session(self):
+        # Only ever called from a coroutine.  Creating the session and the
+        # semaphore there binds them to the running event loop.
+        if self._session is None:
+            self._session = self._create_session()
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    def _create_session(self):
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_maxsize,
+            force_close=not self._keep_alive)
+        headers = {'Accept-Encoding': 'gzip, deflate' if self._gzip else 'identity'}
+        return aiohttp.ClientSession(connector=connector, headers=headers)
+
+    def _is_transient(self, error):
+        return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError))
+
+    async def _get_response(self, endpoint, query, data=None, content_type=None):
+        method, url, headers = self._prepare_request(endpoint)
+        kwargs = {}
+        if data is not None:
+            headers['Content-Type'] = content_type
+            kwargs['data'] = data
+        policy = self._retry_policy
+        if policy is None:
+            return await self._request(endpoint, method, url, headers, query, **kwargs)
+        retries = self._retries(endpoint)
+        attempt = 0
+        while True:
+            policy.before_request()
+            try:
+                result = await self._request(endpoint, method, url, headers, query, **kwargs)
+            except aiohttp.ClientResponseError as error:
+                # Raised by raise_for_status, only 5xx responses are failures
+                if error.status not in policy.status_codes:
+                    policy.record_success()
+                    raise
+                policy.record_failure()
+                if attempt >= retries:
+                    raise
+            except Exception as error:
+                # Errors of the client, e.g. RateLimitExceeded, are no failures of the API
+                if not self._is_transient(error):
+                    raise
+                policy.record_failure()
+                if attempt >= retries:
+                    raise
+            else:
+                policy.record_success()
+                return result
+            await asyncio.sleep(policy.backoff(attempt))
+            attempt += 1
+            if self._instrumentation is not None:
+                self._instrumentation.request_retried(endpoint, attempt)
+
+    async def _request(self, endpoint, method, url, headers, query, **kwargs):
+        session = self._get_session()
+        limiter = self._rate_limiter
+        instrumentation = self._instrumentation
+        if limiter is not None:
+            await limiter.acquire_async(endpoint)
+        async with self._semaphore:
+            if instrumentation is not None:
+                instrumentation.before_request(endpoint, method)
+                start = time.perf_counter()
+            try:
+                async with session.request(
+                        method=method, url=url, headers=headers, params=query, **kwargs) as response:
+                    if limiter is not None:
+                        limiter.update(endpoint, response.status, response.headers)
+                        limiter = None
+                    if instrumentation is not None:
+                        instrumentation.after_request(
+                            endpoint, method, response.status, time.perf_counter() - start,
+                            response_size=response.content_length, headers=response.headers)
+                        instrumentation = None
+                    if response.status in self.ERROR_STATUS_CODES:
+                        return codec.loads(await response.read())['errors']
+                    response.raise_for_status()
+                    return codec.loads(await response.read())['data']
+            except BaseException as error:
+                # The request failed before a response arrived
+                if instrumentation is not None:
+                    instrumentation.after_request(
+                        endpoint, method, None, time.perf_counter() - start, error=error)
+                raise
+            finally:
+                if limiter is not None:
+                    limiter.release(endpoint)
+
+    async def blacklist(self, confidence_minimum=None, limit=None):
+        query = self._blacklist_query(confidence_minimum, limit)
+        return await self._get_response('blacklist', query)
+
+    def iter_blacklist(self, confidence_minimum=None, limit=None, plaintext=False):
+        raise TypeError('iter_blacklist is not available in the asynchronous client, use blacklist instead')
+
+    async def bulk_report(self, reports):
+        """Report many IP addresses by uploading CSV files
+
+        Works like :meth:`abuseipdb.api_v2.AbuseIpDbV2.bulk_report`.
+        """
+        chunker = self._bulk_report_chunker(reports)
+        result = {'savedReports': 0, 'invalidReports': [], 'uploads': []}
+        while chunker.has_reports():
+            rows_before = chunker.rows_sent
+            data = await self._get_response(
+                'bulk-report', {}, data=_AsyncChunks(chunker.body()), content_type=chunker.content_type)
+            if not self._add_upload(result, data, rows_before, chunker.rows_sent):
+                break
+        return result
+
+    async def check(self, ip_address, max_age_in_days=None):
+        query = self._check_query(ip_address, max_age_in_days)
+        return await self._get_response('check', query)
+
+    async def check_block(self, cidr_network, max_age_in_days=None):
+        query = self._check_block_query(cidr_network, max_age_in_days)
+        return await self._get_response('check-block', query)
+
+    async def report(self, ip_address, categories, comment=''):
+        query = self._report_query(ip_address, categories, comment)
+        return await self._get_response('report', query)
+
+
+class AsyncAbuseIpDb(AbuseIpDb):
+    """Asynchronous wrapper for AbuseIpDb blacklist service
+
+    Use it with ``async with`` or await ``close()`` when done.
+    """
+
+    API_CLASSES = {
+        AsyncAbuseIpDbV2.VERSION: AsyncAbuseIpDbV2,
+    }
+
+    def __enter__(self):
+        raise TypeError('Use "async with" for {}'.format(type(self).__name__))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """Release the pooled connections of the underlying API"""
+        await self.api.close()
+
+    async def _cached_lookup(self, key, lookup):
+        if self.cache is None:
+            return await lookup()
+        result = self.cache.get(key)
+        if self.instrumentation is not None:
+            self.instrumentation.cache_lookup(key[0], result is not None)
+        if result is None:
+            result = await lookup()
+            # Errors are returned as a list.  Those must not be cached.
+            if isinstance(result, dict):
+                self.cache.set(key, result)
+        return result
+
+    async def blacklist(self, confidence_minimum=None, limit=None):
+        """Retrieve a list of blacklisted IP addresses"""
+        return self._as_blacklist_entries(await self.api.blacklist(confidence_minimum, limit))
+
+    async def bulk_report(self, reports):
+        """Report a list of IP addresses by uploading CSV files
+
+        Works like :meth:`abuseipdb.AbuseIpDb.bulk_report`.
+        """
+        if isinstance(reports, str):
+            from abuseipdb.bulk import read_reports
+            reports = read_reports(reports)
+        return await self.api.bulk_report(self._normalize_reports(reports))
+
+    async def check(self, ip_address, max_age_in_days=None):
+        """Check a single IPv4 or IPv6 address"""
+        key = ('check', str(ipaddress.ip_address(ip_address)), self._max_age(max_age_in_days))
+        result = await self._cached_lookup(key, lambda: self.api.check(ip_address, max_age_in_days))
+        return self._as_model('CheckResult', result)
+
+    async def check_block(self, cidr_network, max_age_in_days=None):
+        """Check a CIDR network block"""
+        key = ('check-block', str(ipaddress.ip_network(cidr_network)), self._max_age(max_age_in_days))
+        result = await self._cached_lookup(key, lambda: self.api.check_block(cidr_network, max_age_in_days))
+        return self._as_model('BlockResult', result)
+
+    def check_many(self, ip_addresses, max_age_in_days=None, concurrency=10, planner=None):
+        raise TypeError('check_many is not available in the asynchronous client, '
+                        'gather the coroutines of check instead')
+
+    def export_firewall(self, firewall='nft', set_name='abuseipdb', confidence_minimum=None, limit=None,
+                        state_file=None, full=False):
+        raise TypeError('export_firewall is not available in the asynchronous client, use AbuseIpDb instead')
+
+    async def report(self, ip_address, categories, comment=""):
+        """Report a single IPv4 or IPv6 address"""
+        ipaddress.ip_address(ip_address)
+        categories = self._normalize_categories(categories)
+        return await self.api.report(ip_address, categories, comment)
+
+    def sweep_network(self, cidr_network, max_age_in_days=None, concurrency=10):
+        raise TypeError('sweep_network is not available in the asynchronous client, '
+                        'gather the coroutines of check_block instead')
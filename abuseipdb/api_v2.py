@@ -1,4 +1,6 @@
-import requests
+import threading
+import time
+from contextlib import closing
 
 
 class AbuseIpDbV2(object):
@@ -9,6 +11,8 @@ class AbuseIpDbV2(object):
 
     VERSION = 'APIv2'
 
+    BASE_URL = 'https://api.abuseipdb.com/api/v2/{endpoint}'
+
     CATEGORIES = {
         'DDOS_ATTACK': '4',
         'FTP_BRUTE_FORCE': '5',
@@ -32,43 +36,213 @@ class AbuseIpDbV2(object):
         'IOT_TARGETED': '23',
     }
 
+    KNOWN_ENDPOINTS = {
+        'blacklist': 'GET',
+        'bulk-report': 'POST',
+        'check': 'GET',
+        'check-block': 'GET',
+        'report': 'POST',
+    }
+
+    # Size of the chunks read from the socket while streaming a response
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # The API reports validation errors and exceeded rate limits in the body
+    ERROR_STATUS_CODES = (422, 429)
+
     class DEFAULT(object):
         CONFIDENCE_MINIMUM = 100
         LIMIT = 10000
         MAX_AGE_IN_DAYS = 30
 
-    def __init__(self, api_key, subscriber=False):
+    class BULK_REPORT(object):
+        # Limits of a single upload, including the CSV header
+        MAX_LINES = 10000
+        MAX_BYTES = 2 * 1024 * 1024
+
+    class CHECK_BLOCK(object):
+        # Prefix lengths of the largest networks accepted by check-block
+        PREFIXLEN = {4: 24, 6: 64}
+        SUBSCRIBER_PREFIXLEN = {4: 20, 6: 64}
+
+    def __init__(self, api_key, subscriber=False, base_url=None, pool_connections=1,
+                 pool_maxsize=10, pool_block=False, keep_alive=True, gzip=True, rate_limiter=None,
+                 retry_policy=None, instrumentation=None):
         if not api_key:
             raise ValueError('An API key is required')
+        if pool_maxsize < 1:
+            raise ValueError('Pool size must be greater than 0')
         self._api_key = api_key
         self._subscriber = subscriber
+        self._base_url = base_url or self.BASE_URL
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        self._pool_block = pool_block
+        self._keep_alive = keep_alive
+        self._gzip = gzip
+        self._rate_limiter = rate_limiter
+        self._retry_policy = retry_policy
+        self._instrumentation = instrumentation
+        self._session = None
+        self._session_lock = threading.Lock()
 
     def __getattr__(self, name):
         raise NotImplementedError('{} not available in APIv2'.format(name))
 
-    def _get_response(self, endpoint, query):
-        BASE_URL = 'https://api.abuseipdb.com/api/v2/{endpoint}'
-        KNOWN_ENDPOINTS = {
-            'blacklist': 'GET',
-            'bulk-report': 'POST',
-            'check': 'GET',
-            'check-block': 'GET',
-            'report': 'POST',
-        }
-        if endpoint not in KNOWN_ENDPOINTS.keys():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Close all pooled connections
+
+        The client stays usable.  A new pool is created on the next request.
+        """
+        with self._session_lock:
+            session, self._session = self._session, None
+        if session is not None:
+            session.close()
+
+    def _get_session(self):
+        # The session is created lazily and shared by all threads.  Its
+        # connection pool keeps the TLS connections to the API alive, so only
+        # the first request pays for DNS lookup, TCP connect and handshake.
+        session = self._session
+        if session is not None:
+            return session
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
+
+    def _create_session(self):
+        # requests takes longer to import than the rest of the package.  It
+        # is only needed, once the first request is sent.
+        import requests
+        from requests.adapters import HTTPAdapter
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self._pool_connections,
+            pool_maxsize=self._pool_maxsize,
+            pool_block=self._pool_block)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip, deflate' if self._gzip else 'identity'
+        if not self._keep_alive:
+            session.headers['Connection'] = 'close'
+        return session
+
+    def _prepare_request(self, endpoint):
+        if endpoint not in self.KNOWN_ENDPOINTS.keys():
             msg = 'Unknown endpoint "{}"'
             raise NotImplementedError(msg.format(endpoint))
         headers = {'Key': self._api_key, 'Accept': 'application/json'}
-        response = requests.request(
-            method=KNOWN_ENDPOINTS[endpoint],
-            url=BASE_URL.format(endpoint=endpoint),
-            headers=headers, params=query)
-        if response.status_code in (422, 429):
-            return response.json()['errors']
+        return self.KNOWN_ENDPOINTS[endpoint], self._base_url.format(endpoint=endpoint), headers
+
+    def _retries(self, endpoint):
+        # Only reads are idempotent.  A report might have been saved already.
+        if self._retry_policy is None or self.KNOWN_ENDPOINTS[endpoint] != 'GET':
+            return 0
+        return self._retry_policy.max_retries
+
+    def _is_transient(self, error):
+        """Return True for failures of the transport, that are worth a retry"""
+        import requests
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+    def _send(self, endpoint, method, url, headers, query, **kwargs):
+        policy = self._retry_policy
+        if policy is None:
+            return self._request(endpoint, method, url, headers, query, **kwargs)
+        retries = self._retries(endpoint)
+        attempt = 0
+        while True:
+            policy.before_request()
+            try:
+                response = self._request(endpoint, method, url, headers, query, **kwargs)
+            except Exception as error:
+                # Errors of the client, e.g. RateLimitExceeded, are no failures of the API
+                if not self._is_transient(error):
+                    raise
+                policy.record_failure()
+                if attempt >= retries:
+                    raise
+            else:
+                if response.status_code not in policy.status_codes:
+                    policy.record_success()
+                    return response
+                policy.record_failure()
+                if attempt >= retries:
+                    return response
+                response.close()
+            policy.sleep(policy.backoff(attempt))
+            attempt += 1
+            if self._instrumentation is not None:
+                self._instrumentation.request_retried(endpoint, attempt)
+
+    def _request(self, endpoint, method, url, headers, query, **kwargs):
+        limiter = self._rate_limiter
+        instrumentation = self._instrumentation
+        if limiter is not None:
+            limiter.acquire(endpoint)
+        if instrumentation is not None:
+            instrumentation.before_request(endpoint, method)
+            start = time.perf_counter()
+        try:
+            response = self._get_session().request(
+                method=method,
+                url=url,
+                headers=headers, params=query, **kwargs)
+        except BaseException as error:
+            if limiter is not None:
+                limiter.release(endpoint)
+            if instrumentation is not None:
+                instrumentation.after_request(endpoint, method, None, time.perf_counter() - start, error=error)
+            raise
+        if limiter is not None:
+            limiter.update(endpoint, response.status_code, response.headers)
+        if instrumentation is not None:
+            instrumentation.after_request(
+                endpoint, method, response.status_code, time.perf_counter() - start,
+                response_size=self._response_size(response, kwargs.get('stream', False)),
+                headers=response.headers)
+        return response
+
+    @staticmethod
+    def _response_size(response, stream):
+        length = response.headers.get('Content-Length')
+        if length is not None:
+            return int(length)
+        # The body of a streamed response is not read yet
+        return None if stream else len(response.content)
+
+    def _get_response(self, endpoint, query, data=None, content_type=None):
+        method, url, headers = self._prepare_request(endpoint)
+        kwargs = {}
+        if data is not None:
+            headers['Content-Type'] = content_type
+            kwargs['data'] = data
+        response = self._send(endpoint, method, url, headers, query, **kwargs)
+        from abuseipdb import codec
+        if response.status_code in self.ERROR_STATUS_CODES:
+            return codec.loads(response.content)['errors']
         response.raise_for_status()
-        return response.json()['data']
+        return codec.loads(response.content)['data']
 
-    def blacklist(self, confidence_minimum=None, limit=None):
+    def _stream_response(self, endpoint, query, accept='application/json'):
+        method, url, headers = self._prepare_request(endpoint)
+        headers['Accept'] = accept
+        response = self._send(endpoint, method, url, headers, query, stream=True)
+        # Error details are returned in the body, but the body is streamed.
+        # So they cannot be returned like in _get_response.
+        if response.status_code >= 400:
+            response.close()
+        response.raise_for_status()
+        return response
+
+    def _blacklist_query(self, confidence_minimum, limit):
         query = {}
         if self._subscriber and confidence_minimum:
             if confidence_minimum < 25 or confidence_minimum > 100:
@@ -82,16 +256,119 @@ class AbuseIpDbV2(object):
                 msg = 'Limit {} is above {}, which is not allowed, unless you\'re a subscriber'
                 raise ValueError(msg.format(limit, self.DEFAULT.LIMIT))
             query['limit'] = str(limit)
-        return self._get_response('blacklist', query)
-
-    def bulk_report(self, file_name):
-        raise NotImplementedError('bulk_report not yet available.  Implementation still pending.')
+        return query
 
-    def check(self, ip_address, max_age_in_days=None):
-        query = {
+    def _check_query(self, ip_address, max_age_in_days):
+        return {
             'ipAddress': ip_address,
             'maxAgeInDays': str(max_age_in_days or self.DEFAULT.MAX_AGE_IN_DAYS),
         }
+
+    def _check_block_query(self, cidr_network, max_age_in_days):
+        return {
+            'network': cidr_network,
+            'maxAgeInDays': str(max_age_in_days or self.DEFAULT.MAX_AGE_IN_DAYS),
+        }
+
+    def _report_query(self, ip_address, categories, comment):
+        return {
+            'ip': ip_address,
+            'categories': categories,
+            'comment': comment,
+        }
+
+    def blacklist(self, confidence_minimum=None, limit=None):
+        query = self._blacklist_query(confidence_minimum, limit)
+        return self._get_response('blacklist', query)
+
+    def iter_blacklist(self, confidence_minimum=None, limit=None, plaintext=False):
+        """Yield the entries of the blacklist one at a time
+
+        The response is parsed while it is read from the socket.  With
+        ``plaintext`` the IP addresses are yielded as strings instead of
+        dictionaries.  Errors are raised as ``requests.HTTPError``.
+        """
+        query = self._blacklist_query(confidence_minimum, limit)
+        if plaintext:
+            query['plaintext'] = ''
+            response = self._stream_response('blacklist', query, accept='text/plain')
+            return self._iter_lines(response)
+        response = self._stream_response('blacklist', query)
+        return self._iter_entries(response)
+
+    def _iter_lines(self, response):
+        with closing(response):
+            for line in response.iter_lines(chunk_size=self.STREAM_CHUNK_SIZE, decode_unicode=True):
+                line = line.strip()
+                if line:
+                    yield line
+
+    def _iter_entries(self, response):
+        from abuseipdb.stream import iter_json_array
+        with closing(response):
+            for entry in iter_json_array(response.iter_content(chunk_size=self.STREAM_CHUNK_SIZE)):
+                yield entry
+
+    def block_prefixlen(self, version):
+        """Return the prefix length of the largest network check_block accepts"""
+        if self._subscriber:
+            return self.CHECK_BLOCK.SUBSCRIBER_PREFIXLEN[version]
+        return self.CHECK_BLOCK.PREFIXLEN[version]
+
+    def bulk_report(self, reports):
+        """Report many IP addresses by uploading CSV files
+
+        ``reports`` is the name of a CSV file or an iterable of reports, see
+        :mod:`abuseipdb.bulk`.  The CSV is streamed while it is uploaded.
+        Reports exceeding the limits of a single upload are split into
+        several uploads.
+
+        Returns the number of saved reports, the rejected reports with their
+        row number counted over all reports, and the result of each upload.
+
+        See https://docs.abuseipdb.com/#bulk-report-endpoint for documentation.
+        """
+        chunker = self._bulk_report_chunker(reports)
+        result = {'savedReports': 0, 'invalidReports': [], 'uploads': []}
+        while chunker.has_reports():
+            rows_before = chunker.rows_sent
+            data = self._get_response(
+                'bulk-report', {}, data=chunker.body(), content_type=chunker.content_type)
+            if not self._add_upload(result, data, rows_before, chunker.rows_sent):
+                break
+        return result
+
+    def _bulk_report_chunker(self, reports):
+        from abuseipdb.bulk import BulkReportChunker, read_reports
+        if isinstance(reports, str):
+            reports = read_reports(reports)
+        return BulkReportChunker(reports, self.BULK_REPORT.MAX_LINES, self.BULK_REPORT.MAX_BYTES)
+
+    @staticmethod
+    def _add_upload(result, data, rows_before, rows_sent):
+        """Add the result of an upload to the result of bulk_report
+
+        Returns False, if the body of the upload was not sent.
+        """
+        result['uploads'].append({
+            'firstRow': rows_before + 1,
+            'lastRow': rows_sent,
+            'result': data,
+        })
+        if rows_sent == rows_before:
+            # Stop instead of retrying forever
+            return False
+        # Errors of the whole upload are returned as a list
+        if isinstance(data, dict):
+            result['savedReports'] += data.get('savedReports', 0)
+            for invalid_report in data.get('invalidReports', []):
+                invalid_report = dict(invalid_report)
+                invalid_report['rowNumber'] = invalid_report.get('rowNumber', 0) + rows_before
+                result['invalidReports'].append(invalid_report)
+        return True
+
+    def check(self, ip_address, max_age_in_days=None):
+        query = self._check_query(ip_address, max_age_in_days)
         return self._get_response('check', query)
 
     def check_block(self, cidr_network, max_age_in_days=None):
@@ -99,16 +376,9 @@ class AbuseIpDbV2(object):
 
         See https://docs.abuseipdb.com/#check-endpoint for documentation.
         """
-        query = {
-            'network': cidr_network,
-            'maxAgeInDays': str(max_age_in_days or self.DEFAULT.MAX_AGE_IN_DAYS),
-        }
+        query = self._check_block_query(cidr_network, max_age_in_days)
         return self._get_response('check-block', query)
 
     def report(self, ip_address, categories, comment=''):
-        query = {
-            'ip': ip_address,
-            'categories': categories,
-            'comment': comment,
-        }
+        query = self._report_query(ip_address, categories, comment)
         return self._get_response('report', query)
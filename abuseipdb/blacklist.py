@@ -0,0 +1,187 @@
+"""Local lookups in a blacklist retrieved from AbuseIpDb
+
+Build an index from the result of :meth:`abuseipdb.AbuseIpDb.blacklist` to
+answer whether an IP address is blacklisted without calling the API.
+
+    index = BlacklistIndex(abuse.blacklist())
+    if index.contains('192.0.2.123'):
+        ...
+"""
+import calendar
+import ipaddress
+import socket
+import struct
+from array import array
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
+
+BlacklistMatch = namedtuple('BlacklistMatch', ('score', 'last_reported_at'))
+
+# Prefer a typecode with exactly four bytes for the IPv4 keys
+IPV4_TYPECODE = 'I' if array('I').itemsize >= 4 else 'L'
+
+_unpack_ipv4 = struct.Struct('!I').unpack
+_unpack_ipv6 = struct.Struct('!QQ').unpack
+
+
+@lru_cache(maxsize=4096)
+def _epoch_day(date):
+    return calendar.timegm((int(date[0:4]), int(date[5:7]), int(date[8:10]), 0, 0, 0))
+
+
+def parse_timestamp(value):
+    """Convert a timestamp like ``2020-01-31T12:34:56+01:00`` to epoch seconds
+
+    Returns None for empty values.
+    """
+    if not value:
+        return None
+    # Slicing is an order of magnitude faster than time.strptime.  The
+    # entries of a blacklist share few dates, so those are cached.
+    seconds = _epoch_day(value[0:10]) + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+    offset = value[19:]
+    if offset.startswith('.'):
+        offset = offset[1:].lstrip('0123456789')
+    if offset and offset not in ('Z', 'z'):
+        sign = -1 if offset[0] == '-' else 1
+        hours, minutes = offset[1:3], offset[-2:]
+        seconds -= sign * (int(hours) * 3600 + int(minutes) * 60)
+    return seconds
+
+
+def address_key(ip_address):
+    """Return the IP version and integer value of an IP address
+
+    Accepts strings, integers and :mod:`ipaddress` objects.  Integers below
+    2**32 are considered IPv4 addresses.
+    """
+    if isinstance(ip_address, str):
+        try:
+            return 4, _unpack_ipv4(socket.inet_pton(socket.AF_INET, ip_address))[0]
+        except OSError:
+            pass
+        try:
+            high, low = _unpack_ipv6(socket.inet_pton(socket.AF_INET6, ip_address))
+        except OSError:
+            msg = '"{}" does not appear to be an IPv4 or IPv6 address'
+            raise ValueError(msg.format(ip_address))
+        return 6, high << 64 | low
+    if isinstance(ip_address, int) and 0 <= ip_address < 1 << 128:
+        return (4 if ip_address < 1 << 32 else 6), ip_address
+    address = ipaddress.ip_address(ip_address)
+    return address.version, int(address)
+
+
+def entry_key(entry):
+    """Return the IP version and integer value of the address of an entry
+
+    ``entry`` is an IP address, an entry of the blacklist or an object with
+    ``version`` and ``key`` attributes like
+    :class:`abuseipdb.models.BlacklistEntry`.
+    """
+    if isinstance(entry, dict):
+        return address_key(entry['ipAddress'])
+    if isinstance(entry, str):
+        return address_key(entry)
+    try:
+        return entry.version, entry.key
+    except AttributeError:
+        return address_key(entry)
+
+
+def _entry_record(entry):
+    """Return the version, key, score and time of the last report of an entry"""
+    if isinstance(entry, dict):
+        version, key = address_key(entry['ipAddress'])
+        return (
+            version, key, int(entry.get('abuseConfidenceScore') or 0),
+            parse_timestamp(entry.get('lastReportedAt')) or 0)
+    version, key = entry_key(entry)
+    return (
+        version, key, int(getattr(entry, 'abuse_confidence_score', None) or 0),
+        getattr(entry, 'last_reported', None) or 0)
+
+
+class BlacklistIndex(object):
+    """Sorted index of blacklisted IPv4 and IPv6 addresses
+
+    The IPv4 addresses are kept as sorted 32 bit integers in an array, the
+    IPv6 addresses as sorted 128 bit integers.  The confidence score and
+    the time of the last report are kept in parallel columns.  Lookups are
+    binary searches.
+
+    ``entries`` are the dictionaries or the
+    :class:`abuseipdb.models.BlacklistEntry` objects of the blacklist.
+    """
+
+    def __init__(self, entries):
+        records = {4: {}, 6: {}}
+        for entry in entries:
+            version, key, score, last_reported_at = _entry_record(entry)
+            records[version][key] = (score, last_reported_at)
+        self._keys = {4: array(IPV4_TYPECODE), 6: []}
+        self._scores = {4: array('B'), 6: array('B')}
+        self._last_reported = {4: array('q'), 6: array('q')}
+        for version in (4, 6):
+            keys = self._keys[version]
+            scores = self._scores[version]
+            last_reported = self._last_reported[version]
+            for key in sorted(records[version]):
+                score, timestamp = records[version][key]
+                keys.append(key)
+                scores.append(score)
+                last_reported.append(timestamp)
+
+    def __len__(self):
+        return len(self._keys[4]) + len(self._keys[6])
+
+    def __contains__(self, ip_address):
+        return self.contains(ip_address)
+
+    def _find(self, ip_address):
+        version, key = address_key(ip_address)
+        keys = self._keys[version]
+        position = bisect_left(keys, key)
+        if position < len(keys) and keys[position] == key:
+            return version, position
+        return version, None
+
+    def records(self):
+        """Yield ``(version, key, score, last_reported_at)`` tuples
+
+        IPv4 addresses come first.  Within each version the records are
+        sorted by the integer value of the address.
+        """
+        for version in (4, 6):
+            keys = self._keys[version]
+            scores = self._scores[version]
+            last_reported = self._last_reported[version]
+            for position in range(len(keys)):
+                yield version, keys[position], scores[position], last_reported[position]
+
+    def contains(self, ip_address):
+        """Check, whether the IP address is on the blacklist"""
+        return self._find(ip_address)[1] is not None
+
+    def contains_many(self, ip_addresses):
+        """Check a number of IP addresses and return a list of booleans"""
+        keys = self._keys
+        result = []
+        for ip_address in ip_addresses:
+            version, key = address_key(ip_address)
+            version_keys = keys[version]
+            position = bisect_left(version_keys, key)
+            result.append(position < len(version_keys) and version_keys[position] == key)
+        return result
+
+    def lookup(self, ip_address):
+        """Return the score and time of the last report of a blacklisted address
+
+        The time is given in seconds since the epoch.  Returns None, if the
+        address is not on the blacklist.
+        """
+        version, position = self._find(ip_address)
+        if position is None:
+            return None
+        return BlacklistMatch(self._scores[version][position], self._last_reported[version][position])
@@ -0,0 +1,128 @@
+"""Streaming CSV uploads for the bulk-report endpoint
+
+See https://www.abuseipdb.com/bulk-report for the format of the CSV file.
+A report is either a row from such a file or a sequence with the IP
+address, the categories, the report date and the comment.  Dictionaries
+with the keys ``ip_address``, ``categories``, ``report_date`` and
+``comment`` are accepted as well.
+"""
+import csv
+import datetime
+import io
+import uuid
+
+CSV_HEADER = ('IP', 'Categories', 'ReportDate', 'Comment')
+
+
+def read_reports(file_name):
+    """Yield the reports of a CSV file one at a time"""
+    with open(file_name, newline='', encoding='utf-8') as reports:
+        rows = csv.reader(reports)
+        for row in rows:
+            if not row:
+                continue
+            if row[0].strip().upper() == CSV_HEADER[0]:
+                continue
+            yield row
+
+
+def normalize_report(report):
+    """Convert a report into a tuple of four strings"""
+    if isinstance(report, dict):
+        report = (
+            report.get('ip_address'), report.get('categories'),
+            report.get('report_date'), report.get('comment'))
+    report = list(report) + [None] * (len(CSV_HEADER) - len(report))
+    ip_address, categories, report_date, comment = report[:len(CSV_HEADER)]
+    if isinstance(categories, (list, tuple, set)):
+        categories = ','.join(str(category) for category in categories)
+    if not report_date:
+        report_date = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    if isinstance(report_date, datetime.datetime):
+        report_date = report_date.isoformat()
+    return str(ip_address), str(categories or ''), str(report_date), str(comment or '')
+
+
+def _encode_row(row):
+    line = io.StringIO()
+    csv.writer(line, lineterminator='\r\n').writerow(row)
+    return line.getvalue().encode('utf-8')
+
+
+def split_reports(reports, max_lines, max_bytes):
+    """Split reports into lists, that fit into a single upload each
+
+    The limits are the same as for :class:`BulkReportChunker` and include
+    the CSV header.
+    """
+    header_size = len(_encode_row(CSV_HEADER))
+    uploads = []
+    upload, lines, size = [], 1, header_size
+    for report in reports:
+        line_size = len(_encode_row(normalize_report(report)))
+        if upload and (lines >= max_lines or size + line_size > max_bytes):
+            uploads.append(upload)
+            upload, lines, size = [], 1, header_size
+        upload.append(report)
+        lines += 1
+        size += line_size
+    if upload:
+        uploads.append(upload)
+    return uploads
+
+
+class BulkReportChunker(object):
+    """Split reports into uploads within the limits of the service
+
+    Each call of :meth:`body` returns a generator for the multipart body of
+    the next upload.  It yields the CSV lines while they are sent, so no
+    upload is ever built in memory.  A report, that would exceed a limit,
+    is kept for the next upload.
+    """
+
+    def __init__(self, reports, max_lines, max_bytes):
+        self._reports = iter(reports)
+        self._pending = None
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.boundary = uuid.uuid4().hex
+        self.rows_sent = 0
+
+    @property
+    def content_type(self):
+        return 'multipart/form-data; boundary={}'.format(self.boundary)
+
+    def _next_line(self):
+        if self._pending is not None:
+            line, self._pending = self._pending, None
+            return line
+        for report in self._reports:
+            return _encode_row(normalize_report(report))
+        return None
+
+    def has_reports(self):
+        if self._pending is None:
+            self._pending = self._next_line()
+        return self._pending is not None
+
+    def body(self):
+        yield (
+            '--{}\r\n'
+            'Content-Disposition: form-data; name="csv"; filename="report.csv"\r\n'
+            'Content-Type: text/csv\r\n\r\n'
+        ).format(self.boundary).encode('ascii')
+        header = _encode_row(CSV_HEADER)
+        yield header
+        lines, size = 1, len(header)
+        while lines < self.max_lines:
+            line = self._next_line()
+            if line is None:
+                break
+            if size + len(line) > self.max_bytes and lines > 1:
+                self._pending = line
+                break
+            yield line
+            lines += 1
+            size += len(line)
+            self.rows_sent += 1
+        yield '\r\n--{}--\r\n'.format(self.boundary).encode('ascii')
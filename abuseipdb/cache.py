@@ -0,0 +1,183 @@
+"""Caches for the results of lookups
+
+A cache is passed to :class:`abuseipdb.AbuseIpDb` with the ``cache``
+parameter.  It stores the results of ``check`` and ``check_block``.  Only
+successful lookups are stored.  Error responses, like an exceeded rate
+limit, always go to the API again.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class LookupCache(object):
+    """In-process cache with expiry and least recently used eviction
+
+    Entries expire ``ttl`` seconds after they were stored.  If more than
+    ``maxsize`` entries are stored, the least recently used one is evicted.
+    The cache can be shared by several threads.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600, clock=time.monotonic):
+        if maxsize < 1:
+            raise ValueError('Maximum size must be greater than 0')
+        if ttl <= 0:
+            raise ValueError('TTL must be greater than 0')
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value or None, if there is no valid entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                if expires > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+
+class SqliteLookupCache(object):
+    """Cache in a SQLite database, that is shared by several processes
+
+    This is meant for short-lived processes like the command line
+    interface, which is started for every ban by fail2ban.
+
+    Entries expire ``ttl`` seconds after they were stored.  Whenever an
+    entry is stored, expired entries are removed.  If there are still more
+    than ``maxsize`` entries, those expiring first are removed.
+
+    The database uses write-ahead logging, so readers never block each
+    other.  Writers wait up to ``timeout`` seconds for a lock.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS lookups ('
+        ' key TEXT PRIMARY KEY,'
+        ' expires REAL NOT NULL,'
+        ' value TEXT NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS lookups_expires ON lookups (expires)',
+    )
+
+    def __init__(self, file_name, maxsize=10000, ttl=3600, timeout=5.0, clock=time.time):
+        if maxsize < 1:
+            raise ValueError('Maximum size must be greater than 0')
+        if ttl <= 0:
+            raise ValueError('TTL must be greater than 0')
+        self.file_name = file_name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timeout = timeout
+        self._clock = clock
+        self._connection = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM lookups').fetchone()[0]
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.file_name, timeout=self._timeout, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    @staticmethod
+    def _serialize_key(key):
+        return json.dumps(key, separators=(',', ':'))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def get(self, key):
+        """Return the cached value or None, if there is no valid entry"""
+        with self._lock:
+            row = self._connect().execute(
+                'SELECT value FROM lookups WHERE key = ? AND expires > ?',
+                (self._serialize_key(key), self._clock())).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        now = self._clock()
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'INSERT OR REPLACE INTO lookups (key, expires, value) VALUES (?, ?, ?)',
+                    (self._serialize_key(key), now + self.ttl, json.dumps(value)))
+                self._compact(connection, now)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+
+    def _compact(self, connection, now):
+        connection.execute('DELETE FROM lookups WHERE expires <= ?', (now,))
+        cursor = connection.execute(
+            'DELETE FROM lookups WHERE key IN '
+            '(SELECT key FROM lookups ORDER BY expires DESC LIMIT -1 OFFSET ?)',
+            (self.maxsize,))
+        self.evictions += cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._connect().execute('DELETE FROM lookups')
+
+    def stats(self):
+        return {
+            'entries': len(self),
+            'evictions': self.evictions,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -1,9 +1,7 @@
+# fail2ban starts the command line interface for every ban.  So modules,
+# that are only needed by some commands, are imported where they are used.
 import argparse
-import json
 import os
-import pwd
-import re
-import socket
 import stat
 from configparser import ConfigParser, NoOptionError
 
@@ -12,19 +10,173 @@ from abuseipdb import AbuseIpDb
 
 def main():
     args = _parse_parameter()
-    api = _create_api(args)
-    if args.action == "list_categories":
-        _print_categories(api)
+    if args.action == "serve":
+        _serve(args)
+    elif args.action == "list_categories":
+        _print_categories(_create_api(args))
+    elif args.action == "export":
+        _export(args)
+    elif getattr(args, "from_file", None):
+        _run_batch(args)
     else:
         kwargs = _create_kwargs_from_args(args)
-        result = _call_action(api, args.action, **kwargs)
-        _print_result(result)
+        result = _report_deduplicated(args, kwargs)
+        if result is None:
+            result = _hand_off_to_daemon(args, kwargs)
+        if result is None:
+            result = _call_action(_create_api(args), args.action, **kwargs)
+        _print_result(result, args.compact)
+
+
+def _hand_off_to_daemon(args, kwargs):
+    """Queue a report in a running daemon
+
+    Returns None, if no daemon is running.  Other errors are raised, as
+    the daemon may have queued the report already.
+    """
+    if args.action != "report" or args.daemon_socket == "":
+        return None
+    from abuseipdb.daemon import submit_report
+    try:
+        result = submit_report(_daemon_socket(args), **kwargs)
+    except (FileNotFoundError, ConnectionRefusedError):
+        return None
+    if 'error' in result:
+        raise ValueError(result['error'])
+    return result
+
+
+def _daemon_socket(args):
+    from abuseipdb.daemon import DEFAULT_SOCKET
+    return args.daemon_socket or DEFAULT_SOCKET
+
+
+def _serve(args):
+    import signal
+
+    from abuseipdb.daemon import ReportDaemon
+    daemon = ReportDaemon(
+        _create_api(args), _daemon_socket(args),
+        flush_interval=args.flush_interval, max_batch=args.max_batch, max_queue=args.max_queue)
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def _export(args):
+    """Write the firewall sets to stdout or a file while they are generated
+
+    The state is stored once all lines are written.
+    """
+    import sys
+    export = _create_api(args).export_firewall(
+        args.firewall, args.set_name, args.confidence_minimum, args.limit, args.state_file, args.full)
+    if args.output is None:
+        sys.stdout.writelines(export)
+        sys.stdout.flush()
+    else:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.writelines(export)
+    export.commit()
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt()
+
+
+def _report_deduplicated(args, kwargs):
+    """Report unless the IP address was reported within the window
+
+    The reports, that are sent, are handed over to a running daemon.
+    Returns None, if no deduplication file is configured.
+    """
+    if args.action != "report" or not args.dedup_file:
+        return None
+    from abuseipdb.dedup import (REPORT_WINDOW, ReportDeduplicator,
+                                 SqliteReportStore)
+    store = SqliteReportStore(args.dedup_file)
+    window = args.dedup_window or REPORT_WINDOW
+    with ReportDeduplicator(_DaemonHandOff(_create_api(args), args), window=window, store=store) as dedup:
+        return dedup.report(**kwargs)
+
+
+class _DaemonHandOff(object):
+    """Client, that hands reports over to a running daemon
+
+    Without a daemon they are reported directly.  Everything else is
+    passed on to the client.
+    """
+
+    def __init__(self, api, args):
+        self.api = api
+        self.args = args
+
+    def __getattr__(self, name):
+        return getattr(self.api, name)
+
+    def report(self, ip_address, categories, comment=''):
+        kwargs = dict(ip_address=ip_address, categories=categories, comment=comment)
+        result = _hand_off_to_daemon(self.args, kwargs)
+        if result is None:
+            result = self.api.report(ip_address, categories, comment)
+        return result
 
 
 def _call_action(api, action, **kwargs):
     return getattr(api, action)(**kwargs)
 
 
+def _run_batch(args):
+    """Check or report every IP address read from a file
+
+    The lines are read lazily and processed by a pool of workers.  Each
+    result is printed as a single line of JSON, as soon as it is available.
+    """
+    from abuseipdb.workers import imap_unordered
+    api = _create_api(args, pool_maxsize=args.workers)
+    lines = _read_lines(args.from_file)
+    if args.action == "check":
+        ip_addresses = (_split_line(line)[0] for line in lines)
+        results = api.check_many(ip_addresses, args.max_age_in_days, concurrency=args.workers)
+    else:
+        masker = None
+        if args.mask_sensitive_data:
+            from abuseipdb.masking import SensitiveDataMasker
+            masker = SensitiveDataMasker()
+        categories = ",".join(str(c) for c in args.categories)
+
+        def report(line):
+            ip_address, comment = _split_line(line)
+            return api.report(ip_address, categories, _prepare_comment([comment], masker))
+        results = (
+            (_split_line(line)[0], result)
+            for line, result in imap_unordered(report, lines, args.workers))
+    for ip_address, result in results:
+        _print_json_line(ip_address, result)
+
+
+def _split_line(line):
+    """Split a line into the IP address and the rest at any whitespace"""
+    ip_address, *rest = line.split(None, 1)
+    return ip_address, rest[0] if rest else ""
+
+
+def _read_lines(file_name):
+    """Yield the stripped lines of a file or stdin, skipping empty lines and comments"""
+    import sys
+    lines = sys.stdin if file_name == "-" else open(file_name, encoding="utf-8")
+    try:
+        for line in lines:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
+
+
 def _print_categories(api):
     template = "{:15} - {:>7}"
     print(template.format('Mame', 'Numeric'))
@@ -33,8 +185,22 @@ def _print_categories(api):
         print(template.format(*item))
 
 
-def _print_result(result):
-    print(json.dumps(result, indent=4, sort_keys=True))
+def _print_result(result, compact=False):
+    from abuseipdb import codec
+    print(codec.dumps(result, indent=None if compact else 4, sort_keys=True))
+
+
+def _print_json_line(ip_address, result):
+    from abuseipdb import codec
+    line = {"ipAddress": ip_address}
+    if isinstance(result, Exception):
+        line["error"] = str(result)
+    elif isinstance(result, list):
+        # Validation errors and exceeded rate limits
+        line["errors"] = result
+    else:
+        line["result"] = result
+    print(codec.dumps(line, sort_keys=True), flush=True)
 
 
 def _to_unicode(s):
@@ -56,30 +222,21 @@ def _convert_to_flattened_list(comment):
     return splitted
 
 
-def _filter_for_sensitive_data(comment):
-    filtered = []
-    hostname = socket.gethostname()
-    users = [user[0].lower() for user in pwd.getpwall()]
-    pattern = re.compile(r'[a-zA-Z0-9.+-]*\w@\w[a-zA-Z0-9.:+-]*\.\w+')
-    for word in comment:
-        word = str(word)
-        if word.lower() == hostname.lower():
-            filtered.append('*host*')
-        elif word.lower() in users:
-            filtered.append('*user*')
-        elif '@' in word:
-            filtered.append('*email*'.join(re.split(pattern, word)))
-        else:
-            filtered.append(word)
-    return filtered
+def _prepare_comment(comment, masker=None):
+    comment = " ".join(str(c) for c in _convert_to_flattened_list(comment))
+    if masker is not None:
+        comment = masker.mask(comment)
+    if len(comment) > 1000:
+        comment = comment[:1000] + '\n...'
+    return comment
 
 
 def _get_list_of_arguments_for_action(args):
     if args.action == "blacklist":
         return ("confidence_minimum", "limit")
     elif args.action == "bulk_report":
-        args.file_name = args.report_file
-        return ("file_name")
+        args.reports = args.report_file
+        return ("reports",)
     elif args.action == "check":
         return ("ip_address", "max_age_in_days")
     elif args.action == "check_block":
@@ -100,12 +257,11 @@ def _create_kwargs_from_args(args):
     if "categories" in kwargs.keys():
         kwargs["categories"] = ",".join(str(c) for c in kwargs["categories"])
     if "comment" in kwargs.keys():
-        kwargs["comment"] = _convert_to_flattened_list(kwargs["comment"])
+        masker = None
         if mask_sensitive_data:
-            kwargs["comment"] = _filter_for_sensitive_data(kwargs["comment"])
-        kwargs["comment"] = " ".join(str(c) for c in kwargs["comment"])
-        if len(kwargs["comment"]) > 1000:
-            kwargs["comment"] = kwargs["comment"][:1000] + '\n...'
+            from abuseipdb.masking import SensitiveDataMasker
+            masker = SensitiveDataMasker()
+        kwargs["comment"] = _prepare_comment(kwargs["comment"], masker)
     # Needed for Python 2.7
     if "ip_address" in kwargs.keys():
         kwargs["ip_address"] = _to_unicode(kwargs["ip_address"])
@@ -114,11 +270,15 @@ def _create_kwargs_from_args(args):
     return kwargs
 
 
-def _create_api(args):
+def _create_api(args, **kwargs):
     api_version = "APIv{}".format(args.api_version)
     api_key, subscriber = _read_api_key_and_subscriber_status(args.config_file)
     subscriber = False
-    return AbuseIpDb(api_key=api_key, api_version=api_version, subscriber=subscriber)
+    cache = None
+    if args.cache_file:
+        from abuseipdb.cache import SqliteLookupCache
+        cache = SqliteLookupCache(args.cache_file, ttl=args.cache_ttl)
+    return AbuseIpDb(api_key=api_key, api_version=api_version, subscriber=subscriber, cache=cache, **kwargs)
 
 
 def _read_api_key_and_subscriber_status(file_name):
@@ -150,6 +310,30 @@ def _parse_parameter():
                         default="/etc/abuseipdb",
                         metavar="FILE",
                         help="specify a different configuration file")
+    parser.add_argument("--cache-file",
+                        metavar="FILE",
+                        help="cache the results of checks in this file, shared by all invocations")
+    parser.add_argument("--cache-ttl",
+                        type=int,
+                        default=3600,
+                        metavar="SECONDS",
+                        help="keep cached results for this many seconds (default: %(default)s)")
+    parser.add_argument("--dedup-file",
+                        metavar="FILE",
+                        help="hold repeated reports of an IP address in this file and send them "
+                             "combined, when the window of the service has passed")
+    parser.add_argument("--dedup-window",
+                        type=int,
+                        metavar="SECONDS",
+                        help="hold repeated reports for this many seconds (default: 900)")
+    parser.add_argument("--daemon-socket",
+                        metavar="SOCKET",
+                        help="hand reports over to the daemon listening on this socket, if it is "
+                             "running, an empty value disables it (default: /run/abuseipdb.sock)")
+    parser.add_argument("--compact",
+                        action='store_true',
+                        default=False,
+                        help="print the result as compact JSON on a single line")
     parser.add_argument("-s", "--mask-sensitive-data",
                         action='store_true',
                         default=False,
@@ -160,10 +344,21 @@ def _parse_parameter():
         description=subparsers_description,
         dest="action",
         help="execute the specified command")
+    for command, usage in _COMMAND_USAGES:
+        subparsers.add_parser(command, add_help=False, usage=usage)
+
+    # Only the arguments of the requested command are added.  The first pass
+    # finds the command, the second one parses its arguments.
+    args, _ = parser.parse_known_args()
+    if args.action in _COMMAND_ARGUMENTS:
+        _COMMAND_ARGUMENTS[args.action](subparsers.choices[args.action])
+    args = parser.parse_args()
+    if args.action in ("check", "report") and (args.ip_address is None) == (args.from_file is None):
+        parser.error("{} needs either an IP address or --from-file".format(args.action))
+    return args
 
-    blacklist = subparsers.add_parser(
-        "blacklist", add_help=False,
-        usage="abusipdb blacklist [{-l,--limit} LIMIT] [{-m,--confidence_minimum} MINIMUM]")
+
+def _add_blacklist_arguments(blacklist):
     blacklist.add_argument(
         "-m", "--confidence_minimum",
         type=int,
@@ -175,31 +370,38 @@ def _parse_parameter():
         default=10000,
         help="limit the number of entries in the blacklist")
 
-    bulk_report = subparsers.add_parser(
-        "bulk_report", add_help=False,
-        usage="abusipdb bulk_report FILE")
+
+def _add_bulk_report_arguments(bulk_report):
     bulk_report.add_argument(
         "report_file",
         help="file containing the bulk report")
 
-    subparsers.add_parser(
-        "list_categories", add_help=False,
-        usage="abusipdb list_categories")
 
-    check = subparsers.add_parser(
-        "check", add_help=False,
-        usage="abusipdb check [{-d,--max-age-in-days] DAYS] IP_ADDRESS")
+def _add_batch_arguments(parser):
+    parser.add_argument(
+        "--from-file",
+        metavar="FILE",
+        help="read one IP address per line from this file, - for stdin, and print one JSON object per line")
+    parser.add_argument(
+        "-w", "--workers",
+        type=int,
+        default=10,
+        help="number of concurrent requests with --from-file")
+
+
+def _add_check_arguments(check):
     check.add_argument(
         "ip_address",
+        nargs="?",
         help="check or report IP address")
     check.add_argument(
         "-d", "--max-age-in-days",
         type=int,
         help="only consider reports up to this age during checks")
+    _add_batch_arguments(check)
+
 
-    check_block = subparsers.add_parser(
-        "check_block", add_help=False,
-        usage="abusipdb check_block [{-d,--max-age-in-days} DAYS] NETWORK")
+def _add_check_block_arguments(check_block):
     check_block.add_argument(
         "cidr_network",
         help="check CIDR network")
@@ -208,11 +410,37 @@ def _parse_parameter():
         type=int,
         help="only consider reports up to this age during checks")
 
-    report = subparsers.add_parser(
-        "report", add_help=False,
-        usage="abusipdb report {-c,--category} CATEGORY [{-c,--category} CATEGORY [...]] IP_ADDRESS [COMMENT]")
+
+def _add_export_arguments(export):
+    _add_blacklist_arguments(export)
+    export.add_argument(
+        "-t", "--firewall",
+        choices=("ipset", "nft"),
+        default="nft",
+        help="write commands for ipset restore or a script for nft -f (default: %(default)s)")
+    export.add_argument(
+        "-n", "--set-name",
+        default="abuseipdb",
+        help="name of the sets, _v4 and _v6 are appended (default: %(default)s)")
+    export.add_argument(
+        "-o", "--output",
+        metavar="FILE",
+        help="write to this file instead of stdout")
+    export.add_argument(
+        "--state-file",
+        metavar="FILE",
+        help="only write the changes since the export stored in this file and store the new state")
+    export.add_argument(
+        "--full",
+        action="store_true",
+        default=False,
+        help="replace the content of the sets, even if there is a state file")
+
+
+def _add_report_arguments(report):
     report.add_argument(
         "ip_address",
+        nargs="?",
         help="check or report IP address")
     report.add_argument(
         "-c", "--category",
@@ -224,9 +452,52 @@ def _parse_parameter():
         "comment",
         nargs=argparse.REMAINDER,
         help="comment for the report")
-
-    args = parser.parse_args()
-    return args
+    _add_batch_arguments(report)
+
+
+def _add_serve_arguments(serve):
+    from abuseipdb.daemon import FLUSH_INTERVAL, MAX_QUEUE
+    serve.add_argument(
+        "-i", "--flush-interval",
+        type=float,
+        default=FLUSH_INTERVAL,
+        help="upload the queued reports after this many seconds (default: %(default)s, "
+             "the free plan allows 5 bulk uploads a day)")
+    serve.add_argument(
+        "-b", "--max-batch",
+        type=int,
+        default=10000,
+        help="upload the queued reports as soon as this many are queued")
+    serve.add_argument(
+        "-q", "--max-queue",
+        type=int,
+        default=MAX_QUEUE,
+        help="refuse reports, while this many are queued (default: %(default)s)")
+
+
+_COMMAND_USAGES = (
+    ("blacklist", "abusipdb blacklist [{-l,--limit} LIMIT] [{-m,--confidence_minimum} MINIMUM]"),
+    ("bulk_report", "abusipdb bulk_report FILE"),
+    ("list_categories", "abusipdb list_categories"),
+    ("check", "abusipdb check [{-d,--max-age-in-days] DAYS] {IP_ADDRESS | --from-file FILE [{-w,--workers} N]}"),
+    ("check_block", "abusipdb check_block [{-d,--max-age-in-days} DAYS] NETWORK"),
+    ("export", "abusipdb export [{-t,--firewall} {ipset,nft}] [{-n,--set-name} NAME] [{-o,--output} FILE] "
+               "[--state-file FILE [--full]] [{-l,--limit} LIMIT] [{-m,--confidence_minimum} MINIMUM]"),
+    ("report", "abusipdb report {-c,--category} CATEGORY [{-c,--category} CATEGORY [...]] "
+               "{IP_ADDRESS [COMMENT] | --from-file FILE [{-w,--workers} N]}"),
+    ("serve", "abusipdb serve [{-i,--flush-interval} SECONDS] [{-b,--max-batch} REPORTS] "
+              "[{-q,--max-queue} REPORTS]"),
+)
+
+_COMMAND_ARGUMENTS = {
+    "blacklist": _add_blacklist_arguments,
+    "bulk_report": _add_bulk_report_arguments,
+    "check": _add_check_arguments,
+    "check_block": _add_check_block_arguments,
+    "export": _add_export_arguments,
+    "report": _add_report_arguments,
+    "serve": _add_serve_arguments,
+}
 
 
 description_text = """
@@ -251,6 +522,30 @@ description:
   There is no parameter to specify the API key, because it would show up in
   the global process list.  The configuration file must only be readable
   by the executing user.  This decision was made to protect the API key.
+
+  With --dedup-file repeated reports of an IP address within 15 minutes,
+  which the service would reject, are held.  Their categories and comments
+  are merged and sent as a single report by the first invocation after the
+  window has passed.
+
+  The serve command starts a daemon listening on the socket given with
+  --daemon-socket.  While it runs, the report command hands its report over
+  to the daemon.  The daemon uploads the queued reports in bulk.  With
+  --dedup-file only the reports sent after the window are handed over.
+
+  With --from-file the check and report commands read one IP address per
+  line from a file or, with -, from stdin.  For reports the rest of the
+  line is the comment.  The requests are sent by --workers concurrent
+  workers.  Each result is printed as a JSON object on a line of its own,
+  as soon as it is available.
+
+  The export command writes the blacklist as sets for the firewall.
+  Adjacent addresses are collapsed into CIDR networks, IPv4 and IPv6
+  networks go into separate sets.  Pipe it into "nft -f -" or
+  "ipset restore" to replace the content of the sets atomically.  With
+  --state-file only the networks added or removed since the last export
+  are written.  --full replaces the content of the sets nevertheless, e.g.
+  after loading the changes failed.
 """
 
 subparsers_description = """For an explanation of the commands please visit https://docs.abuseipdb.com/.
@@ -259,7 +554,13 @@ abusipdb blacklist [{-l,--limit} LIMIT] [{-m,--confidence_minimum} MINIMUM]
 abusipdb bulk_report FILE
 abusipdb list_categories
 abusipdb check [{-d,--max-age-in-days} DAYS] IP_ADDRESS
+abusipdb check [{-d,--max-age-in-days} DAYS] --from-file FILE [{-w,--workers} N]
 abusipdb check_block [{-d,--max-age-in-days} DAYS] NETWORK
+abusipdb export [{-t,--firewall} {ipset,nft}] [{-n,--set-name} NAME] [{-o,--output} FILE]
+                [--state-file FILE [--full]] [{-l,--limit} LIMIT] [{-m,--confidence_minimum} MINIMUM]
 abusipdb report {-c,--category} CATEGORY [{-c,--category} CATEGORY [...]]
                 IP_ADDRESS [COMMENT]
+abusipdb report {-c,--category} CATEGORY [{-c,--category} CATEGORY [...]]
+                --from-file FILE [{-w,--workers} N]
+abusipdb serve [{-i,--flush-interval} SECONDS] [{-b,--max-batch} REPORTS] [{-q,--max-queue} REPORTS]
 """
@@ -0,0 +1,69 @@
+"""JSON encoding and decoding with the fastest available library
+
+The responses of the API are decoded with orjson, if it is installed, and
+with the :mod:`json` module of the standard library otherwise.  Install it
+with ``pip install abuseipdb[fast]``.  orjson decodes the bytes of a
+response directly.  The standard library decodes them to text first, as
+Python 3.5 only accepts text.
+
+    data = codec.loads(response.content)
+    line = codec.dumps(data, sort_keys=True)
+
+``dumps`` returns compact JSON for machine consumers.  With ``indent`` it
+returns JSON for humans.  That is always written by the standard library,
+as orjson only indents by two spaces.
+"""
+import json
+
+
+class StdlibCodec(object):
+    name = 'json'
+
+    def loads(self, data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    def dumps(self, obj, indent=None, sort_keys=False):
+        if indent is None:
+            return json.dumps(obj, sort_keys=sort_keys, separators=(',', ':'))
+        return json.dumps(obj, indent=indent, sort_keys=sort_keys)
+
+
+class OrjsonCodec(StdlibCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._orjson = orjson
+        self._options = {False: 0, True: orjson.OPT_SORT_KEYS}
+
+    def loads(self, data):
+        return self._orjson.loads(data)
+
+    def dumps(self, obj, indent=None, sort_keys=False):
+        if indent is not None:
+            return super(OrjsonCodec, self).dumps(obj, indent, sort_keys)
+        return self._orjson.dumps(obj, option=self._options[bool(sort_keys)]).decode('utf-8')
+
+
+CODECS = {
+    StdlibCodec.name: StdlibCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+def get_codec(name=None):
+    """Return the codec of the given name or the fastest one installed"""
+    if name is not None:
+        return CODECS[name]()
+    try:
+        return OrjsonCodec()
+    except ImportError:
+        return StdlibCodec()
+
+
+_codec = get_codec()
+backend = _codec.name
+loads = _codec.loads
+dumps = _codec.dumps
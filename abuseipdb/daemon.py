@@ -0,0 +1,255 @@
+"""Daemon collecting reports and uploading them in bulk
+
+The daemon listens on a Unix socket and keeps a warm client.  Short-lived
+processes, like the command line interface started by fail2ban, hand their
+reports over with :func:`submit_report` instead of calling the API.  The
+daemon queues the reports and uploads them periodically with
+``bulk_report``.
+
+The protocol is one JSON object per line with the keys ``ip_address``,
+``categories`` and ``comment``.  The daemon answers each line with
+``{"queued": true}`` or ``{"error": "..."}``.
+"""
+import datetime
+import ipaddress
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = '/run/abuseipdb.sock'
+
+# The free plan allows 5 bulk uploads a day, so upload every 6 hours
+FLUSH_INTERVAL = 6 * 3600
+MAX_BACKOFF = 24 * 3600
+MAX_QUEUE = 100000
+
+# Uploads failing with these status codes are queued again
+TRANSIENT_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def submit_report(socket_path, ip_address, categories, comment='', timeout=1.0):
+    """Hand a report over to a running daemon
+
+    Returns the answer of the daemon.  Raises ``FileNotFoundError`` or
+    ``ConnectionRefusedError``, if no daemon listens on the socket.
+    """
+    report = {'ip_address': ip_address, 'categories': categories, 'comment': comment}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(timeout)
+        connection.connect(socket_path)
+        connection.sendall(json.dumps(report).encode('utf-8') + b'\n')
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile('rb') as answer:
+            line = answer.readline()
+    if not line:
+        raise ConnectionError('The daemon closed the connection without an answer')
+    return json.loads(line.decode('utf-8'))
+
+
+class _ReportHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                report = json.loads(line.decode('utf-8'))
+                self.server.report_daemon.submit(
+                    report['ip_address'], report['categories'], report.get('comment', ''))
+                answer = {'queued': True}
+            except (KeyError, TypeError, ValueError) as error:
+                answer = {'error': str(error)}
+            self.wfile.write(json.dumps(answer).encode('utf-8') + b'\n')
+
+
+class _ReportServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class ReportDaemon(object):
+    """Queue reports and upload them with ``bulk_report``
+
+    ``api`` is an :class:`abuseipdb.AbuseIpDb` instance.  The queue is
+    uploaded every ``flush_interval`` seconds, or as soon as it holds
+    ``max_batch`` reports.  Reports of uploads, that failed with an
+    exception, an exceeded rate limit or a server error, are queued again.
+    After an exceeded rate limit the uploads are paused, starting with
+    ``flush_interval`` and doubling up to ``MAX_BACKOFF`` seconds.  The
+    queue holds at most ``max_queue`` reports.  Further reports are refused
+    and the oldest ones are dropped, if failed uploads don't fit anymore.
+
+    The socket is only accessible by the owner of the daemon, as every
+    report is sent with its API key.
+    """
+
+    def __init__(self, api, socket_path=DEFAULT_SOCKET, flush_interval=FLUSH_INTERVAL, max_batch=10000,
+                 max_queue=MAX_QUEUE):
+        if flush_interval <= 0:
+            raise ValueError('Flush interval must be greater than 0')
+        if max_batch < 1:
+            raise ValueError('Maximum batch size must be greater than 0')
+        if max_queue < max_batch:
+            raise ValueError('Maximum queue size must not be less than the maximum batch size')
+        self.api = api
+        self.socket_path = socket_path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self._queue = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._server = None
+        self._backoff = 0
+        self._paused_until = 0
+        self.ready = threading.Event()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def submit(self, ip_address, categories, comment=''):
+        """Validate a report and queue it
+
+        Raises ``ValueError``, if the queue is full.
+        """
+        ipaddress.ip_address(ip_address)
+        categories = self.api._normalize_categories(categories)
+        report_date = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+        with self._lock:
+            if len(self._queue) >= self.max_queue:
+                raise ValueError('The queue of the daemon is full')
+            self._queue.append((ip_address, categories, report_date, str(comment)))
+            if len(self._queue) >= self.max_batch:
+                self._wakeup.set()
+
+    def _requeue(self, reports):
+        with self._lock:
+            self._queue[:0] = reports
+            dropped = len(self._queue) - self.max_queue
+            if dropped > 0:
+                del self._queue[:dropped]
+                logger.warning('Dropped the %d oldest reports, the queue is full', dropped)
+
+    def _pause(self):
+        self._backoff = min(max(self._backoff * 2, self.flush_interval), MAX_BACKOFF)
+        self._paused_until = time.monotonic() + self._backoff
+        logger.warning('Rate limit of bulk uploads exceeded, pausing uploads for %d seconds', self._backoff)
+
+    def flush(self):
+        """Upload all queued reports
+
+        Every call of ``bulk_report`` sends a single upload.  So only the
+        reports of failed uploads are queued again.  Returns the combined
+        result of the uploads or None, if the queue is empty.
+        """
+        from abuseipdb.bulk import split_reports
+        with self._lock:
+            batch, self._queue = self._queue, []
+        if not batch:
+            return None
+        limits = self.api.api.BULK_REPORT
+        uploads = split_reports(batch, limits.MAX_LINES, limits.MAX_BYTES)
+        result = {'savedReports': 0, 'invalidReports': [], 'uploads': []}
+        failed = []
+        rows_before = 0
+        for position, reports in enumerate(uploads):
+            try:
+                upload = self.api.bulk_report(reports)
+            except Exception:
+                self._requeue(failed + [report for reports in uploads[position:] for report in reports])
+                raise
+            rate_limited = self._merge_upload(result, upload, reports, rows_before, failed)
+            rows_before += len(reports)
+            if rate_limited:
+                failed.extend(report for reports in uploads[position + 1:] for report in reports)
+                self._pause()
+                break
+        else:
+            self._backoff = 0
+        self._requeue(failed)
+        logger.info('Uploaded %d reports, %d saved, %d rejected, %d queued again',
+                    len(batch) - len(failed), result['savedReports'], len(result['invalidReports']), len(failed))
+        return result
+
+    @staticmethod
+    def _merge_upload(result, upload, reports, rows_before, failed):
+        """Add the result of an upload and collect the reports of failed parts
+
+        Returns True, if the rate limit was exceeded.
+        """
+        result['savedReports'] += upload['savedReports']
+        for invalid_report in upload['invalidReports']:
+            invalid_report = dict(invalid_report)
+            invalid_report['rowNumber'] = invalid_report.get('rowNumber', 0) + rows_before
+            result['invalidReports'].append(invalid_report)
+        rate_limited = False
+        for part in upload['uploads']:
+            part = dict(part, firstRow=part['firstRow'] + rows_before, lastRow=part['lastRow'] + rows_before)
+            result['uploads'].append(part)
+            # Errors of the whole upload are returned as a list
+            if not isinstance(part['result'], list):
+                continue
+            statuses = set(error.get('status') for error in part['result'])
+            rows = reports[part['firstRow'] - rows_before - 1:part['lastRow'] - rows_before]
+            if statuses & set(TRANSIENT_STATUS_CODES):
+                failed.extend(rows)
+                rate_limited = rate_limited or 429 in statuses
+            else:
+                logger.error('Upload of %d reports rejected: %s', len(rows), part['result'])
+        return rate_limited
+
+    def _flush_periodically(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(max(self.flush_interval, self._paused_until - time.monotonic()))
+            self._wakeup.clear()
+            if self._stopped.is_set() or time.monotonic() < self._paused_until:
+                continue
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Uploading the queued reports failed')
+
+    def _bind(self):
+        try:
+            if stat.S_ISSOCK(os.stat(self.socket_path).st_mode):
+                os.unlink(self.socket_path)
+        except FileNotFoundError:
+            pass
+        server = _ReportServer(self.socket_path, _ReportHandler, bind_and_activate=False)
+        server.report_daemon = self
+        old_umask = os.umask(0o177)
+        try:
+            server.server_bind()
+        finally:
+            os.umask(old_umask)
+        server.server_activate()
+        return server
+
+    def serve_forever(self):
+        """Accept reports until :meth:`shutdown` is called
+
+        The remaining reports are uploaded before returning.
+        """
+        self._server = self._bind()
+        flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        flusher.start()
+        self.ready.set()
+        try:
+            self._server.serve_forever()
+        finally:
+            self.ready.clear()
+            self._stopped.set()
+            self._wakeup.set()
+            flusher.join()
+            self._server.server_close()
+            os.unlink(self.socket_path)
+            self.flush()
+
+    def shutdown(self):
+        """Stop :meth:`serve_forever` from another thread"""
+        self._server.shutdown()
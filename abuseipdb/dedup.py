@@ -0,0 +1,332 @@
+"""Deduplication of reports within the window of the service
+
+AbuseIpDb rejects reports of an IP address, that was reported by the same
+user within the last 15 minutes.  :class:`ReportDeduplicator` sends the
+first report of an IP address right away and holds all further reports
+until the window of 15 minutes has passed.  Their categories and comments
+are merged, and a single combined report is sent when the window closes.
+
+    dedup = ReportDeduplicator(abuse, store=SqliteReportStore('/var/cache/abuseipdb.dedup'))
+    dedup.report('192.0.2.123', 'SSH', 'Failed password for root')
+
+The windows are kept in memory, or in a SQLite database shared by several
+processes, like the command line interface started by fail2ban.  Held
+reports are sent by the next call of :meth:`ReportDeduplicator.report` or
+:meth:`ReportDeduplicator.flush` after their window closed.
+"""
+import ipaddress
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from abuseipdb.models import is_error
+
+logger = logging.getLogger(__name__)
+
+# Window of the service in seconds
+REPORT_WINDOW = 15 * 60
+
+# Maximum length of a comment accepted by the service
+MAX_COMMENT_LENGTH = 1000
+
+
+def merge_categories(categories, other):
+    """Merge two lists of categories as returned by ``_normalize_categories``"""
+    merged = set(categories.split(',')) | set(other.split(','))
+    merged.discard('')
+    return ','.join(sorted(merged))
+
+
+def merge_comments(comment, other):
+    """Append a comment, that is not yet part of the other one"""
+    if not comment or comment == other:
+        merged = other
+    elif not other or other in comment:
+        merged = comment
+    else:
+        merged = comment + '\n' + other
+    return merged[:MAX_COMMENT_LENGTH]
+
+
+def _merge(pending, categories, comment):
+    if pending is None:
+        return categories, comment
+    return merge_categories(pending[0], categories), merge_comments(pending[1], comment)
+
+
+class MemoryReportStore(object):
+    """Windows of at most ``maxsize`` IP addresses in memory
+
+    If more IP addresses are within their window, the oldest window is
+    dropped.  A report held in it is sent early.
+    """
+
+    def __init__(self, maxsize=10000):
+        if maxsize < 1:
+            raise ValueError('Maximum size must be greater than 0')
+        self.maxsize = maxsize
+        # IP address -> [opened at, held categories and comment or None]
+        # ordered by the time the window was opened
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._windows)
+
+    def claim(self, ip_address, categories, comment, now, window):
+        """Open a window or hold the report in the open one
+
+        Returns the reports to send now as a list of tuples with the IP
+        address, categories and comment.
+        """
+        with self._lock:
+            entry = self._windows.get(ip_address)
+            if entry is not None and entry[0] + window > now:
+                entry[1] = _merge(entry[1], categories, comment)
+                return []
+            # A report held in a closed window is sent together with this one
+            categories, comment = _merge(entry and entry[1], categories, comment)
+            self._windows.pop(ip_address, None)
+            self._windows[ip_address] = [now, None]
+            reports = [(ip_address, categories, comment)]
+            while len(self._windows) > self.maxsize:
+                evicted, (_, pending) = self._windows.popitem(last=False)
+                if pending is not None:
+                    reports.append((evicted,) + pending)
+            return reports
+
+    def release(self, ip_address):
+        """Close the window opened by a report, that could not be sent"""
+        with self._lock:
+            self._windows.pop(ip_address, None)
+
+    def due(self, now, window):
+        """Return the held reports of closed windows and open new windows for them"""
+        reports = []
+        with self._lock:
+            while self._windows:
+                ip_address, (opened_at, pending) = next(iter(self._windows.items()))
+                if opened_at + window > now:
+                    break
+                del self._windows[ip_address]
+                if pending is not None:
+                    reports.append((ip_address,) + pending)
+            for ip_address, _, _ in reports:
+                self._windows[ip_address] = [now, None]
+        return reports
+
+    def restore(self, ip_address, categories, comment, now, window):
+        """Hold a report, that could not be sent, in a closed window"""
+        with self._lock:
+            entry = self._windows.pop(ip_address, None)
+            self._windows[ip_address] = [now - window, _merge(entry and entry[1], categories, comment)]
+            self._windows.move_to_end(ip_address, last=False)
+
+    def close(self):
+        pass
+
+
+class SqliteReportStore(object):
+    """Windows of at most ``maxsize`` IP addresses in a SQLite database
+
+    The database is shared by several processes.  Each change is a single
+    transaction, so concurrent processes never send the same report twice.
+    """
+
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS windows ('
+        ' ip_address TEXT PRIMARY KEY,'
+        ' opened_at REAL NOT NULL,'
+        ' categories TEXT,'
+        ' comment TEXT)',
+        'CREATE INDEX IF NOT EXISTS windows_opened_at ON windows (opened_at)',
+    )
+
+    def __init__(self, file_name, maxsize=10000, timeout=5.0):
+        if maxsize < 1:
+            raise ValueError('Maximum size must be greater than 0')
+        self.file_name = file_name
+        self.maxsize = maxsize
+        self._timeout = timeout
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute('SELECT COUNT(*) FROM windows').fetchone()[0]
+
+    def _connect(self):
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.file_name, timeout=self._timeout, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            self._connection = connection
+        return self._connection
+
+    def _transaction(self, change, *args):
+        with self._lock:
+            connection = self._connect()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = change(connection, *args)
+                connection.execute('COMMIT')
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            return result
+
+    @staticmethod
+    def _pending(row):
+        if row is None or row[1] is None:
+            return None
+        return row[1], row[2]
+
+    def claim(self, ip_address, categories, comment, now, window):
+        """Open a window or hold the report in the open one
+
+        Returns the reports to send now as a list of tuples with the IP
+        address, categories and comment.
+        """
+        return self._transaction(self._claim, ip_address, categories, comment, now, window)
+
+    def _claim(self, connection, ip_address, categories, comment, now, window):
+        row = connection.execute(
+            'SELECT opened_at, categories, comment FROM windows WHERE ip_address = ?',
+            (ip_address,)).fetchone()
+        if row is not None and row[0] + window > now:
+            categories, comment = _merge(self._pending(row), categories, comment)
+            connection.execute(
+                'UPDATE windows SET categories = ?, comment = ? WHERE ip_address = ?',
+                (categories, comment, ip_address))
+            return []
+        categories, comment = _merge(self._pending(row), categories, comment)
+        connection.execute(
+            'INSERT OR REPLACE INTO windows (ip_address, opened_at, categories, comment) VALUES (?, ?, NULL, NULL)',
+            (ip_address, now))
+        reports = [(ip_address, categories, comment)]
+        evicted = connection.execute(
+            'SELECT ip_address, categories, comment FROM windows '
+            'ORDER BY opened_at DESC LIMIT -1 OFFSET ?', (self.maxsize,)).fetchall()
+        for row in evicted:
+            connection.execute('DELETE FROM windows WHERE ip_address = ?', (row[0],))
+            if row[1] is not None:
+                reports.append(tuple(row))
+        return reports
+
+    def release(self, ip_address):
+        """Close the window opened by a report, that could not be sent"""
+        with self._lock:
+            self._connect().execute('DELETE FROM windows WHERE ip_address = ?', (ip_address,))
+
+    def due(self, now, window):
+        """Return the held reports of closed windows and open new windows for them"""
+        return self._transaction(self._due, now, window)
+
+    def _due(self, connection, now, window):
+        reports = connection.execute(
+            'SELECT ip_address, categories, comment FROM windows '
+            'WHERE opened_at <= ? AND categories IS NOT NULL', (now - window,)).fetchall()
+        connection.execute('DELETE FROM windows WHERE opened_at <= ? AND categories IS NULL', (now - window,))
+        connection.execute(
+            'UPDATE windows SET opened_at = ?, categories = NULL, comment = NULL WHERE opened_at <= ?',
+            (now, now - window))
+        return [tuple(row) for row in reports]
+
+    def restore(self, ip_address, categories, comment, now, window):
+        """Hold a report, that could not be sent, in a closed window"""
+        self._transaction(self._restore, ip_address, categories, comment, now, window)
+
+    def _restore(self, connection, ip_address, categories, comment, now, window):
+        row = connection.execute(
+            'SELECT opened_at, categories, comment FROM windows WHERE ip_address = ?',
+            (ip_address,)).fetchone()
+        categories, comment = _merge(self._pending(row), categories, comment)
+        connection.execute(
+            'INSERT OR REPLACE INTO windows (ip_address, opened_at, categories, comment) VALUES (?, ?, ?, ?)',
+            (ip_address, now - window, categories, comment))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class ReportDeduplicator(object):
+    """Send at most one report per IP address and window
+
+    ``api`` is an :class:`abuseipdb.AbuseIpDb` instance.  The categories of
+    held reports are normalized and merged, their comments are joined by
+    line breaks up to the limit of 1000 characters.  ``store`` defaults to
+    a :class:`MemoryReportStore`.
+    """
+
+    def __init__(self, api, window=REPORT_WINDOW, store=None, clock=time.time):
+        if window <= 0:
+            raise ValueError('Window must be greater than 0')
+        self.api = api
+        self.window = window
+        self.store = store if store is not None else MemoryReportStore()
+        self._clock = clock
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.store.close()
+
+    def report(self, ip_address, categories, comment=''):
+        """Report an IP address, unless it was reported within the window
+
+        Returns the result of the report or, if it is held, a dictionary
+        with the IP address and ``held`` set to True.
+        """
+        ipaddress.ip_address(ip_address)
+        categories = self.api._normalize_categories(categories)
+        comment = str(comment or '')[:MAX_COMMENT_LENGTH]
+        self.flush()
+        reports = self.store.claim(ip_address, categories, comment, self._clock(), self.window)
+        if not reports:
+            return {'ipAddress': ip_address, 'held': True}
+        try:
+            result = self.api.report(*reports[0])
+        except Exception:
+            self.store.release(ip_address)
+            raise
+        if is_error(result):
+            # E.g. an exceeded rate limit, the report was not accepted
+            self.store.release(ip_address)
+            return result
+        # Reports of evicted windows
+        self._send(reports[1:])
+        return result
+
+    def flush(self):
+        """Send the held reports of all closed windows
+
+        Returns a list of tuples with the IP address and the result, or the
+        exception raised while reporting.  Failed reports, also those
+        answered with a list of errors, are held again.
+        """
+        return self._send(self.store.due(self._clock(), self.window))
+
+    def _send(self, reports):
+        results = []
+        for ip_address, categories, comment in reports:
+            try:
+                result = self.api.report(ip_address, categories, comment)
+            except Exception as error:
+                result = error
+            if isinstance(result, Exception) or is_error(result):
+                logger.warning('Sending the held report of %s failed: %s', ip_address, result)
+                self.store.restore(ip_address, categories, comment, self._clock(), self.window)
+            results.append((ip_address, result))
+        return results
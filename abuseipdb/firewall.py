@@ -0,0 +1,377 @@
+"""Firewall sets from the blacklist
+
+Turns the blacklisted IP addresses into input for ``ipset restore`` or
+``nft -f``.  Adjacent addresses are collapsed into the fewest CIDR networks
+and IPv4 and IPv6 networks go into separate sets.
+
+    with open('/run/abuseipdb.nft', 'w') as output:
+        output.writelines(abuse.export_firewall('nft'))
+
+On the command line:
+
+    abuseipdb export --firewall nft | nft -f -
+    abuseipdb export --firewall ipset | ipset restore
+
+The nftables script replaces the elements of both sets in the single
+transaction ``nft -f`` runs.  The ipset script fills temporary sets and
+swaps them with the live ones, which the kernel does atomically.  Either
+way there is no moment without the blacklist in force.
+
+With a state file only the networks added to or removed from the
+blacklist since the last export are written.  Call ``commit()`` after
+applying the lines to store the new state:
+
+    export = abuse.export_firewall('nft', state_file='/run/abuseipdb.state')
+    ...
+    export.commit()
+
+The state holds the sorted networks of the last export in fixed size
+binary records, all numbers are little-endian:
+
+    header     magic "ABIPDBFW", format version (uint16), length of the
+               target (uint16), number of networks (uint64), followed by
+               the target, e.g. "nft inet abuseipdb abuseipdb", in UTF-8
+    records    IP version (uint8), prefix length (uint8), high and low
+               half of the first address (uint64 each)
+
+Without a state for the same target, e.g. after a reboot cleared the sets
+and a state in /run, or with ``full`` the sets are replaced as a whole.
+"""
+import ipaddress
+import os
+import struct
+import tempfile
+from collections import namedtuple
+
+from abuseipdb.blacklist import entry_key
+
+_ADDRESS_CLASSES = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+_ADDRESS_BITS = {4: 32, 6: 128}
+
+ADDED = 'add'
+REMOVED = 'del'
+
+STATE_MAGIC = b'ABIPDBFW'
+STATE_FORMAT_VERSION = 1
+STATE_HEADER = struct.Struct('<8sHHQ')
+STATE_RECORD = struct.Struct('<BBQQ')
+
+
+class Network(namedtuple('Network', ('version', 'key', 'prefixlen'))):
+    """CIDR network with the integer value of its first address
+
+    Networks sort by version and address, like the keys of a
+    :class:`abuseipdb.blacklist.BlacklistIndex`.
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        address = str(_ADDRESS_CLASSES[self.version](self.key))
+        if self.prefixlen == _ADDRESS_BITS[self.version]:
+            return address
+        return '{}/{}'.format(address, self.prefixlen)
+
+
+def _range_networks(version, start, end):
+    """Yield the fewest networks covering the addresses from start to end"""
+    bits = _ADDRESS_BITS[version]
+    while start <= end:
+        # The largest block aligned at start, that does not go beyond end
+        size = (start & -start).bit_length() - 1 if start else bits
+        size = min(size, (end - start + 1).bit_length() - 1)
+        yield Network(version, start, bits - size)
+        start += 1 << size
+
+
+def collapse_addresses(entries):
+    """Collapse IP addresses into the fewest CIDR networks
+
+    ``entries`` are IP addresses, blacklist entries or
+    :class:`abuseipdb.models.BlacklistEntry` objects.  Returns a dictionary
+    with the sorted networks of each IP version.
+    """
+    keys = {4: set(), 6: set()}
+    for entry in entries:
+        version, key = entry_key(entry)
+        keys[version].add(key)
+    networks = {}
+    for version in (4, 6):
+        networks[version] = result = []
+        start = end = None
+        for key in sorted(keys[version]):
+            if end is not None and key == end + 1:
+                end = key
+                continue
+            if start is not None:
+                result.extend(_range_networks(version, start, end))
+            start = end = key
+        if start is not None:
+            result.extend(_range_networks(version, start, end))
+        keys[version] = None
+    return networks
+
+
+def diff_networks(old, new):
+    """Yield ``(action, network)`` tuples turning the old networks into the new ones
+
+    Both are sorted iterables of :class:`Network`, so this is a single merge
+    pass over both.  ``action`` is ``ADDED`` or ``REMOVED``.
+    """
+    old = iter(old)
+    new = iter(new)
+    old_network = next(old, None)
+    new_network = next(new, None)
+    while old_network is not None or new_network is not None:
+        if new_network is None or (old_network is not None and old_network < new_network):
+            yield REMOVED, old_network
+            old_network = next(old, None)
+        elif old_network is None or new_network < old_network:
+            yield ADDED, new_network
+            new_network = next(new, None)
+        else:
+            old_network = next(old, None)
+            new_network = next(new, None)
+
+
+class FirewallState(object):
+    """Networks of the last export, stored sorted in a file
+
+    The networks are read in chunks of ``CHUNK_RECORDS`` records, so the
+    memory needed is independent of the size of the state.
+    """
+    CHUNK_RECORDS = 4096
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def load(self, target):
+        """Return an iterator of the stored networks
+
+        Returns None, if there is no state or it belongs to another target.
+        """
+        try:
+            state = open(self.file_name, 'rb')
+        except FileNotFoundError:
+            return None
+        header = state.read(STATE_HEADER.size)
+        if len(header) == STATE_HEADER.size:
+            magic, format_version, target_length, count = STATE_HEADER.unpack(header)
+            if (magic, format_version) == (STATE_MAGIC, STATE_FORMAT_VERSION) \
+                    and state.read(target_length) == target.encode('utf-8'):
+                return self._read_networks(state)
+        state.close()
+        return None
+
+    def _read_networks(self, state):
+        with state:
+            while True:
+                chunk = state.read(STATE_RECORD.size * self.CHUNK_RECORDS)
+                if len(chunk) % STATE_RECORD.size:
+                    raise ValueError('{} is truncated'.format(self.file_name))
+                if not chunk:
+                    return
+                for version, prefixlen, high, low in STATE_RECORD.iter_unpack(chunk):
+                    yield Network(version, high << 64 | low, prefixlen)
+
+    def save(self, target, networks):
+        """Store the networks of both IP versions for the target
+
+        The file is replaced atomically.
+        """
+        target = target.encode('utf-8')
+        directory = os.path.dirname(os.path.abspath(self.file_name))
+        descriptor, temporary_name = tempfile.mkstemp(dir=directory, prefix='.firewall-')
+        try:
+            with os.fdopen(descriptor, 'wb') as state:
+                state.write(STATE_HEADER.pack(
+                    STATE_MAGIC, STATE_FORMAT_VERSION, len(target), len(networks[4]) + len(networks[6])))
+                state.write(target)
+                pack = STATE_RECORD.pack
+                for version in (4, 6):
+                    for network in networks[version]:
+                        high, low = network.key >> 64, network.key & 0xffffffffffffffff
+                        state.write(pack(version, network.prefixlen, high, low))
+            os.replace(temporary_name, self.file_name)
+        except BaseException:
+            os.unlink(temporary_name)
+            raise
+
+
+class FirewallFormat(object):
+    """Base class of the formats of the firewall sets
+
+    The sets are named after ``set_name`` with ``_v4`` and ``_v6`` appended.
+    """
+    name = None
+
+    def __init__(self, set_name='abuseipdb'):
+        self.set_name = set_name
+
+    def set_names(self):
+        """Return the names of the sets by IP version"""
+        return {version: '{}_v{}'.format(self.set_name, version) for version in (4, 6)}
+
+    def target(self):
+        """Return a text identifying the sets, that is kept with the state"""
+        return '{} {}'.format(self.name, self.set_name)
+
+    def replace(self, networks):
+        """Yield the lines replacing the content of both sets"""
+        raise NotImplementedError()
+
+    def update(self, changes):
+        """Yield the lines applying the ``(action, network)`` changes to both sets
+
+        All removals come first, so no added network overlaps one that is
+        still in a set.
+        """
+        removed = {4: [], 6: []}
+        added = {4: [], 6: []}
+        for action, network in changes:
+            (added if action == ADDED else removed)[network.version].append(network)
+        return self._update(removed, added)
+
+    def _update(self, removed, added):
+        raise NotImplementedError()
+
+
+class IpsetFormat(FirewallFormat):
+    """Commands for ``ipset restore``
+
+    The sets are of type ``hash:net`` and hold up to ``maxelem`` networks.
+    It must not change between runs, as ``create`` only ignores existing
+    sets with the same parameters.
+    """
+    name = 'ipset'
+    FAMILIES = {4: 'inet', 6: 'inet6'}
+
+    def __init__(self, set_name='abuseipdb', maxelem=1048576):
+        super(IpsetFormat, self).__init__(set_name)
+        self.maxelem = maxelem
+
+    def _create(self, name, version):
+        return 'create {} hash:net family {} maxelem {} -exist\n'.format(name, self.FAMILIES[version], self.maxelem)
+
+    def replace(self, networks):
+        """Yield the lines replacing the content of both sets"""
+        for version, name in sorted(self.set_names().items()):
+            temporary = name + '_tmp'
+            yield self._create(name, version)
+            yield self._create(temporary, version)
+            yield 'flush {}\n'.format(temporary)
+            for network in networks[version]:
+                yield 'add {} {}\n'.format(temporary, network)
+            yield 'swap {} {}\n'.format(temporary, name)
+            yield 'destroy {}\n'.format(temporary)
+
+    def _update(self, removed, added):
+        names = sorted(self.set_names().items())
+        for changes, command in ((removed, 'del'), (added, 'add')):
+            for version, name in names:
+                for network in changes[version]:
+                    yield '{} {} {} -exist\n'.format(command, name, network)
+
+
+class NftFormat(FirewallFormat):
+    """Script for ``nft -f``
+
+    Both sets are interval sets in ``table``.  The elements are added
+    by statements of up to ``CHUNK_SIZE`` elements, as the whole script is
+    a single transaction anyway.
+    """
+    name = 'nft'
+    TYPES = {4: 'ipv4_addr', 6: 'ipv6_addr'}
+    CHUNK_SIZE = 1000
+
+    def __init__(self, set_name='abuseipdb', table='abuseipdb', family='inet'):
+        super(NftFormat, self).__init__(set_name)
+        self.table = table
+        self.family = family
+
+    def target(self):
+        """Return a text identifying the sets, that is kept with the state"""
+        return '{} {} {} {}'.format(self.name, self.family, self.table, self.set_name)
+
+    def _declare(self):
+        yield 'table {} {} {{\n'.format(self.family, self.table)
+        for version, name in sorted(self.set_names().items()):
+            yield '\tset {} {{\n'.format(name)
+            yield '\t\ttype {}\n'.format(self.TYPES[version])
+            yield '\t\tflags interval\n'
+            yield '\t}\n'
+        yield '}\n'
+
+    def _elements(self, statement, name, networks):
+        for start in range(0, len(networks), self.CHUNK_SIZE):
+            yield '{} element {} {} {} {{ {} }}\n'.format(
+                statement, self.family, self.table, name,
+                ', '.join(str(network) for network in networks[start:start + self.CHUNK_SIZE]))
+
+    def replace(self, networks):
+        """Yield the lines replacing the content of both sets"""
+        for line in self._declare():
+            yield line
+        names = sorted(self.set_names().items())
+        for version, name in names:
+            yield 'flush set {} {} {}\n'.format(self.family, self.table, name)
+        for version, name in names:
+            for line in self._elements('add', name, networks[version]):
+                yield line
+
+    def _update(self, removed, added):
+        names = sorted(self.set_names().items())
+        for changes, statement in ((removed, 'delete'), (added, 'add')):
+            for version, name in names:
+                for line in self._elements(statement, name, changes[version]):
+                    yield line
+
+
+FORMATS = {
+    IpsetFormat.name: IpsetFormat,
+    NftFormat.name: NftFormat,
+}
+
+
+class FirewallExport(object):
+    """Lines loading the blacklisted addresses into the firewall sets
+
+    Iterate over it to get the lines.  With the state of a previous export
+    for the same sets only the changes are written, otherwise, or with
+    ``full``, the sets are replaced.  Call :meth:`commit` once the lines
+    are applied.
+    """
+
+    def __init__(self, entries, firewall_format, state=None, full=False):
+        self.format = firewall_format
+        self.state = state
+        self.networks = collapse_addresses(entries)
+        previous = None if state is None or full else state.load(firewall_format.target())
+        self.full = previous is None
+        self.changes = []
+        if not self.full:
+            new = (network for version in (4, 6) for network in self.networks[version])
+            self.changes = list(diff_networks(previous, new))
+        self.added = sum(1 for action, network in self.changes if action == ADDED)
+        self.removed = len(self.changes) - self.added
+
+    def __iter__(self):
+        if self.full:
+            return self.format.replace(self.networks)
+        return self.format.update(self.changes)
+
+    def commit(self):
+        """Store the networks as the state for the next export"""
+        if self.state is not None:
+            self.state.save(self.format.target(), self.networks)
+
+
+def export_firewall(entries, firewall='nft', set_name='abuseipdb', state_file=None, full=False):
+    """Return the :class:`FirewallExport` of the blacklisted addresses
+
+    ``firewall`` is ``nft`` or ``ipset``.  ``state_file`` keeps the networks
+    between exports.
+    """
+    if firewall not in FORMATS:
+        raise ValueError('Unknown firewall "{}", choose one of {}'.format(firewall, ', '.join(sorted(FORMATS))))
+    state = None if state_file is None else FirewallState(state_file)
+    return FirewallExport(entries, FORMATS[firewall](set_name), state, full)
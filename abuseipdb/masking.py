@@ -0,0 +1,120 @@
+"""Masking of sensitive data in the comments of reports
+
+Comments are often copied from log files.  :class:`SensitiveDataMasker`
+replaces email addresses, the names and addresses of this host and the
+names of local users before they are sent to AbuseIpDb.
+
+    masker = SensitiveDataMasker()
+    masker.mask('Failed password for root from 192.0.2.123 on myhost')
+    # 'Failed password for *user* from 192.0.2.123 on *host*'
+
+Collecting the users can take seconds on hosts with users from a directory
+service.  The masker collects them once and refreshes them after ``ttl``
+seconds, so keep the instance around for many comments.
+"""
+import ipaddress
+import pwd
+import re
+import socket
+import time
+
+EMAIL_PATTERN = r'[a-zA-Z0-9.+-]*\w@\w[a-zA-Z0-9.:+-]*\.\w+'
+
+# Host names, user names and IP addresses are made of these characters.
+# Dots, colons and hyphens at the start or end of a token are punctuation.
+TOKEN_PATTERN = r'[\w.:-]+'
+PUNCTUATION = '.:-'
+
+# Names and addresses of every host, that are no secret
+PUBLIC_HOST_ALIASES = frozenset(('localhost', 'localhost.localdomain', 'localhost6', 'ip6-localhost'))
+
+
+def _is_public_alias(alias):
+    if alias in PUBLIC_HOST_ALIASES:
+        return True
+    try:
+        address = ipaddress.ip_address(alias)
+    except ValueError:
+        return False
+    return address.is_loopback or address.is_unspecified
+
+
+class SensitiveDataMasker(object):
+    """Mask email addresses, aliases of this host and user names
+
+    The aliases of the host are its name, its fully qualified name and its
+    IP addresses.  They are replaced by ``*host*``, user names by
+    ``*user*`` and email addresses by ``*email*``.  Names are compared
+    case-insensitively and also found inside words, as long as they are
+    delimited, e.g. in ``root@myhost``, but not in ``notmyhost``.
+
+    The text is scanned only once.  The cost of looking up a token does not
+    depend on the number of users.
+    """
+
+    EMAIL_MASK = '*email*'
+    HOST_MASK = '*host*'
+    USER_MASK = '*user*'
+
+    _WITH_EMAILS = re.compile('(?P<email>{})|{}'.format(EMAIL_PATTERN, TOKEN_PATTERN))
+    _WITHOUT_EMAILS = re.compile(TOKEN_PATTERN)
+
+    def __init__(self, ttl=300, clock=time.monotonic):
+        self.ttl = ttl
+        self._clock = clock
+        self._expires = None
+        self._replacements = {}
+
+    def _users(self):
+        return {user[0].lower() for user in pwd.getpwall()}
+
+    def _host_aliases(self):
+        hostname = socket.gethostname()
+        aliases = {hostname, socket.getfqdn(hostname)}
+        try:
+            name, names, addresses = socket.gethostbyname_ex(hostname)
+            aliases.update([name] + names + addresses)
+        except OSError:
+            pass
+        try:
+            for info in socket.getaddrinfo(hostname, None):
+                # Strip the scope of link-local IPv6 addresses
+                aliases.add(info[4][0].split('%')[0])
+        except OSError:
+            pass
+        aliases = {alias.lower() for alias in aliases if alias}
+        return {alias for alias in aliases if not _is_public_alias(alias)}
+
+    def refresh(self):
+        """Collect the users and the aliases of the host again"""
+        replacements = dict.fromkeys(self._users(), self.USER_MASK)
+        replacements.update(dict.fromkeys(self._host_aliases(), self.HOST_MASK))
+        self._replacements = replacements
+        self._expires = self._clock() + self.ttl
+
+    def _replace(self, match):
+        if match.lastgroup == 'email':
+            return self.EMAIL_MASK
+        token = match.group()
+        core = token.strip(PUNCTUATION)
+        replacement = self._replacements.get(core.lower())
+        if replacement is None:
+            if ':' not in core:
+                return token
+            # Not an IPv6 address of the host, but maybe "myhost:22"
+            parts = core.split(':')
+            masked = [self._replacements.get(part.lower(), part) for part in parts]
+            if masked == parts:
+                return token
+            replacement = ':'.join(masked)
+        start = token.index(core)
+        return token[:start] + replacement + token[start + len(core):]
+
+    def mask(self, text):
+        """Return the text with all sensitive data replaced"""
+        if self._expires is None or self._clock() >= self._expires:
+            self.refresh()
+        # Most comments don't contain an email address.  Those are scanned
+        # with the simpler pattern.
+        pattern = self._WITH_EMAILS if '@' in text else self._WITHOUT_EMAILS
+        return pattern.sub(self._replace, text)
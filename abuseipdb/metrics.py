@@ -0,0 +1,251 @@
+"""Instrumentation of the requests to the API
+
+Pass an :class:`Instrumentation` to the client with the ``instrumentation``
+parameter.  Its hooks are called before and after every request, for every
+retry and for every lookup in the cache.  Without instrumentation no time
+is measured and no hook is called.
+
+:class:`MetricsRegistry` is the built-in instrumentation.  It counts the
+requests by endpoint and status code, records the latency and the size of
+the responses in histograms and keeps the remaining quota of each endpoint.
+Export the metrics in the Prometheus text format:
+
+    metrics = MetricsRegistry()
+    abuse = AbuseIpDb(api_key, instrumentation=metrics)
+    ...
+    print(metrics.prometheus_text())
+
+To add hooks of your own, subclass :class:`Instrumentation` and combine it
+with the registry with :class:`InstrumentationChain`.
+"""
+import bisect
+import threading
+
+# Buckets of the request latency in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Buckets of the response size in bytes, from 256 bytes to 64 MB
+SIZE_BUCKETS = tuple(256 * 4 ** exponent for exponent in range(10))
+
+
+class Instrumentation(object):
+    """Hooks called by the client, that do nothing
+
+    ``after_request`` is called for every request, that
+    ``before_request`` was called for.  ``status_code`` is None, if the
+    request failed without a response.  Then ``error`` is the exception.
+    ``elapsed`` is the time in seconds until the headers of the response
+    arrived.  ``response_size`` is the number of bytes received, if known.
+    """
+
+    def before_request(self, endpoint, method):
+        pass
+
+    def after_request(self, endpoint, method, status_code, elapsed, response_size=None, headers=None,
+                      error=None):
+        pass
+
+    def request_retried(self, endpoint, attempt):
+        pass
+
+    def cache_lookup(self, endpoint, hit):
+        pass
+
+
+class InstrumentationChain(Instrumentation):
+    """Call the hooks of several instrumentations in order"""
+
+    def __init__(self, *instrumentations):
+        self.instrumentations = instrumentations
+
+    def before_request(self, endpoint, method):
+        for instrumentation in self.instrumentations:
+            instrumentation.before_request(endpoint, method)
+
+    def after_request(self, endpoint, method, status_code, elapsed, response_size=None, headers=None,
+                      error=None):
+        for instrumentation in self.instrumentations:
+            instrumentation.after_request(
+                endpoint, method, status_code, elapsed, response_size=response_size, headers=headers,
+                error=error)
+
+    def request_retried(self, endpoint, attempt):
+        for instrumentation in self.instrumentations:
+            instrumentation.request_retried(endpoint, attempt)
+
+    def cache_lookup(self, endpoint, hit):
+        for instrumentation in self.instrumentations:
+            instrumentation.cache_lookup(endpoint, hit)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{{{}}}'.format(','.join('{}="{}"'.format(name, _escape(value)) for name, value in pairs))
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class Metric(object):
+    """A metric with values for each combination of labels"""
+
+    TYPE = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames):
+            raise ValueError('{} needs the labels {}'.format(self.name, ', '.join(self.labelnames)))
+        return tuple(str(label) for label in labels)
+
+    def samples(self):
+        """Return ``(name, label values, extra labels, value)`` tuples"""
+        raise NotImplementedError
+
+    def exposition(self):
+        lines = [
+            '# HELP {} {}'.format(self.name, self.help_text),
+            '# TYPE {} {}'.format(self.name, self.TYPE),
+        ]
+        for name, labels, extra, value in self.samples():
+            lines.append('{}{} {}'.format(name, _format_labels(self.labelnames, labels, extra), _format_value(value)))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    TYPE = 'counter'
+
+    def inc(self, *labels, amount=1):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+
+class Gauge(Metric):
+    TYPE = 'gauge'
+
+    def set(self, *labels, value):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, *labels):
+        return self._values.get(self._key(labels))
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram(Metric):
+    """Counts of the observed values in cumulative buckets, their sum and count"""
+
+    TYPE = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super(Histogram, self).__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                # Counts per bucket and above the last bucket, the sum
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, *labels):
+        entry = self._values.get(self._key(labels))
+        return 0 if entry is None else sum(entry[0])
+
+    def sum(self, *labels):
+        entry = self._values.get(self._key(labels))
+        return 0 if entry is None else entry[1]
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += count
+                    samples.append((self.name + '_bucket', key, (('le', _format_value(float(bound))),), cumulative))
+                samples.append((self.name + '_sum', key, (), total))
+                samples.append((self.name + '_count', key, (), cumulative))
+        return samples
+
+
+class MetricsRegistry(Instrumentation):
+    """Metrics of the requests, retries and cache lookups of a client
+
+    The registry can be shared by several clients and threads.
+    """
+
+    def __init__(self, prefix='abuseipdb'):
+        self.requests = Counter(
+            prefix + '_requests_total', 'Requests sent to the API by endpoint and status code.',
+            ('endpoint', 'status'))
+        self.latency = Histogram(
+            prefix + '_request_duration_seconds', 'Time until the response headers arrived.',
+            ('endpoint',), LATENCY_BUCKETS)
+        self.response_size = Histogram(
+            prefix + '_response_size_bytes', 'Size of the response bodies as received.',
+            ('endpoint',), SIZE_BUCKETS)
+        self.retries = Counter(
+            prefix + '_retries_total', 'Requests retried after a transient failure.', ('endpoint',))
+        self.cache_lookups = Counter(
+            prefix + '_cache_lookups_total', 'Lookups in the cache by result.', ('endpoint', 'result'))
+        self.quota_remaining = Gauge(
+            prefix + '_rate_limit_remaining', 'Requests remaining in the daily quota.', ('endpoint',))
+        self.metrics = (
+            self.requests, self.latency, self.response_size, self.retries, self.cache_lookups,
+            self.quota_remaining)
+
+    def after_request(self, endpoint, method, status_code, elapsed, response_size=None, headers=None,
+                      error=None):
+        self.requests.inc(endpoint, 'error' if status_code is None else status_code)
+        self.latency.observe(endpoint, value=elapsed)
+        if response_size is not None:
+            self.response_size.observe(endpoint, value=response_size)
+        remaining = headers.get('X-RateLimit-Remaining') if headers is not None else None
+        if remaining is not None:
+            try:
+                self.quota_remaining.set(endpoint, value=int(remaining))
+            except ValueError:
+                pass
+
+    def request_retried(self, endpoint, attempt):
+        self.retries.inc(endpoint)
+
+    def cache_lookup(self, endpoint, hit):
+        self.cache_lookups.inc(endpoint, 'hit' if hit else 'miss')
+
+    def prometheus_text(self):
+        """Return the metrics in the Prometheus text exposition format"""
+        return '\n'.join(metric.exposition() for metric in self.metrics) + '\n'
@@ -0,0 +1,270 @@
+"""Compact result classes for the responses of the API
+
+By default the client returns the data of the responses as dictionaries.
+With ``AbuseIpDb(api_key, models=True)`` it returns these classes instead:
+
+    abuse = AbuseIpDb(api_key, models=True)
+    result = abuse.check('192.0.2.123')
+    if result.abuse_confidence_score > 50 and result.last_reported_at.year == 2026:
+        ...
+
+The classes use ``__slots__``.  IP addresses are kept as integers and
+timestamps as seconds since the epoch, which is much smaller than the
+strings of a dictionary.  They are converted to :mod:`ipaddress` and
+:mod:`datetime` objects only when the properties ``ip_address``,
+``network`` and ``*_at`` are read.  ``to_dict()`` returns the data in
+the format of the API again, with all timestamps in UTC.
+"""
+import datetime
+import ipaddress
+import sys
+
+from abuseipdb.blacklist import address_key, parse_timestamp
+
+
+def _ip_address(version, key):
+    if version == 4:
+        return ipaddress.IPv4Address(key)
+    return ipaddress.IPv6Address(key)
+
+
+def _datetime(timestamp):
+    if timestamp is None:
+        return None
+    return datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc)
+
+
+def _isoformat(timestamp):
+    if timestamp is None:
+        return None
+    return _datetime(timestamp).isoformat()
+
+
+def _intern(value):
+    # Country codes repeat a lot, keep a single string for each
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class Model(object):
+    """Equality and representation based on the slots"""
+
+    __slots__ = ()
+
+    def _values(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self._values() == other._values()
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join('{}={!r}'.format(name, getattr(self, name)) for name in self.__slots__)
+        return '{}({})'.format(type(self).__name__, fields)
+
+
+class BlacklistEntry(Model):
+    """An entry of the blacklist"""
+
+    __slots__ = ('version', 'key', 'abuse_confidence_score', 'country_code', 'last_reported')
+
+    def __init__(self, version, key, abuse_confidence_score, country_code=None, last_reported=None):
+        self.version = version
+        self.key = key
+        self.abuse_confidence_score = abuse_confidence_score
+        self.country_code = country_code
+        self.last_reported = last_reported
+
+    @classmethod
+    def from_dict(cls, data):
+        version, key = address_key(data['ipAddress'])
+        return cls(
+            version, key, data.get('abuseConfidenceScore'), _intern(data.get('countryCode')),
+            parse_timestamp(data.get('lastReportedAt')))
+
+    @property
+    def ip_address(self):
+        return _ip_address(self.version, self.key)
+
+    @property
+    def last_reported_at(self):
+        return _datetime(self.last_reported)
+
+    def to_dict(self):
+        return {
+            'ipAddress': str(self.ip_address),
+            'abuseConfidenceScore': self.abuse_confidence_score,
+            'countryCode': self.country_code,
+            'lastReportedAt': _isoformat(self.last_reported),
+        }
+
+
+class CheckResult(Model):
+    """The result of checking a single IP address
+
+    Fields, that are not known yet, are kept in ``extra``.
+    """
+
+    __slots__ = (
+        'version', 'key', 'is_public', 'is_whitelisted', 'abuse_confidence_score', 'country_code',
+        'usage_type', 'isp', 'domain', 'hostnames', 'total_reports', 'num_distinct_users', 'last_reported',
+        'extra')
+
+    KEYS = frozenset((
+        'ipAddress', 'ipVersion', 'isPublic', 'isWhitelisted', 'abuseConfidenceScore', 'countryCode',
+        'usageType', 'isp', 'domain', 'hostnames', 'totalReports', 'numDistinctUsers', 'lastReportedAt'))
+
+    def __init__(self, version, key, abuse_confidence_score, is_public=None, is_whitelisted=None,
+                 country_code=None, usage_type=None, isp=None, domain=None, hostnames=None, total_reports=None,
+                 num_distinct_users=None, last_reported=None, extra=None):
+        self.version = version
+        self.key = key
+        self.is_public = is_public
+        self.is_whitelisted = is_whitelisted
+        self.abuse_confidence_score = abuse_confidence_score
+        self.country_code = country_code
+        self.usage_type = usage_type
+        self.isp = isp
+        self.domain = domain
+        self.hostnames = hostnames
+        self.total_reports = total_reports
+        self.num_distinct_users = num_distinct_users
+        self.last_reported = last_reported
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, data):
+        version, key = address_key(data['ipAddress'])
+        extra = {name: value for name, value in data.items() if name not in cls.KEYS} or None
+        return cls(
+            version, key, data.get('abuseConfidenceScore'),
+            is_public=data.get('isPublic'),
+            is_whitelisted=data.get('isWhitelisted'),
+            country_code=_intern(data.get('countryCode')),
+            usage_type=data.get('usageType'),
+            isp=data.get('isp'),
+            domain=data.get('domain'),
+            hostnames=data.get('hostnames'),
+            total_reports=data.get('totalReports'),
+            num_distinct_users=data.get('numDistinctUsers'),
+            last_reported=parse_timestamp(data.get('lastReportedAt')),
+            extra=extra)
+
+    @property
+    def ip_address(self):
+        return _ip_address(self.version, self.key)
+
+    @property
+    def last_reported_at(self):
+        return _datetime(self.last_reported)
+
+    def to_dict(self):
+        data = {
+            'ipAddress': str(self.ip_address),
+            'ipVersion': self.version,
+            'isPublic': self.is_public,
+            'isWhitelisted': self.is_whitelisted,
+            'abuseConfidenceScore': self.abuse_confidence_score,
+            'countryCode': self.country_code,
+            'usageType': self.usage_type,
+            'isp': self.isp,
+            'domain': self.domain,
+            'hostnames': self.hostnames,
+            'totalReports': self.total_reports,
+            'numDistinctUsers': self.num_distinct_users,
+            'lastReportedAt': _isoformat(self.last_reported),
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class ReportedAddress(Model):
+    """A reported address of a network block"""
+
+    __slots__ = ('version', 'key', 'num_reports', 'most_recent_report', 'abuse_confidence_score', 'country_code')
+
+    def __init__(self, version, key, num_reports, most_recent_report=None, abuse_confidence_score=None,
+                 country_code=None):
+        self.version = version
+        self.key = key
+        self.num_reports = num_reports
+        self.most_recent_report = most_recent_report
+        self.abuse_confidence_score = abuse_confidence_score
+        self.country_code = country_code
+
+    @classmethod
+    def from_dict(cls, data):
+        version, key = address_key(data['ipAddress'])
+        return cls(
+            version, key, data.get('numReports'), parse_timestamp(data.get('mostRecentReport')),
+            data.get('abuseConfidenceScore'), _intern(data.get('countryCode')))
+
+    @property
+    def ip_address(self):
+        return _ip_address(self.version, self.key)
+
+    @property
+    def most_recent_report_at(self):
+        return _datetime(self.most_recent_report)
+
+    def to_dict(self):
+        return {
+            'ipAddress': str(self.ip_address),
+            'numReports': self.num_reports,
+            'mostRecentReport': _isoformat(self.most_recent_report),
+            'abuseConfidenceScore': self.abuse_confidence_score,
+            'countryCode': self.country_code,
+        }
+
+
+class BlockResult(Model):
+    """The result of checking a network block"""
+
+    __slots__ = ('version', 'key', 'prefixlen', 'num_possible_hosts', 'address_space_desc', 'reported_addresses')
+
+    def __init__(self, version, key, prefixlen, num_possible_hosts=None, address_space_desc=None,
+                 reported_addresses=()):
+        self.version = version
+        self.key = key
+        self.prefixlen = prefixlen
+        self.num_possible_hosts = num_possible_hosts
+        self.address_space_desc = address_space_desc
+        self.reported_addresses = list(reported_addresses)
+
+    @classmethod
+    def from_dict(cls, data):
+        version, key = address_key(data['networkAddress'])
+        prefixlen = bin(address_key(data['netmask'])[1]).count('1')
+        reported_addresses = [ReportedAddress.from_dict(entry) for entry in data.get('reportedAddress') or []]
+        return cls(
+            version, key, prefixlen, data.get('numPossibleHosts'), data.get('addressSpaceDesc'),
+            reported_addresses)
+
+    @property
+    def network(self):
+        return ipaddress.ip_network((_ip_address(self.version, self.key), self.prefixlen))
+
+    def to_dict(self):
+        network = self.network
+        first, last = network.network_address, network.broadcast_address
+        if network.version == 4 and network.prefixlen < 31:
+            # Like the API, leave out the network and broadcast addresses
+            first, last = first + 1, last - 1
+        return {
+            'networkAddress': str(network.network_address),
+            'netmask': str(network.netmask),
+            'minAddress': str(first),
+            'maxAddress': str(last),
+            'numPossibleHosts': self.num_possible_hosts,
+            'addressSpaceDesc': self.address_space_desc,
+            'reportedAddress': [entry.to_dict() for entry in self.reported_addresses],
+        }
+
+
+def is_error(result):
+    """Return whether the API returned a list of errors instead of data"""
+    return isinstance(result, list) and bool(result) and isinstance(result[0], dict) and 'detail' in result[0]
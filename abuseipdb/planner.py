@@ -0,0 +1,110 @@
+"""Answer many checks of single IP addresses with few checks of blocks
+
+Suspicious addresses often cluster in a few networks.  One ``check_block``
+call returns every reported address of a /24 IPv4 or /64 IPv6 network, so
+it can answer the checks of all addresses in that network at once.
+
+:class:`CheckPlanner` groups the addresses into these blocks and decides
+for each block, whether one ``check_block`` call is cheaper than a
+``check`` call per address.  Pass it to
+:meth:`abuseipdb.AbuseIpDb.check_many`:
+
+    for ip_address, result in abuse.check_many(addresses, planner=CheckPlanner()):
+        ...
+"""
+import ipaddress
+
+# Size of the blocks the addresses are grouped into
+BLOCK_PREFIXLEN = {4: 24, 6: 64}
+
+
+class CheckPlan(object):
+    """Addresses to check one by one and blocks to check as a whole
+
+    ``blocks`` is a list of tuples with the network and the addresses in it.
+    """
+
+    def __init__(self, checks, blocks, cost):
+        self.checks = checks
+        self.blocks = blocks
+        self.cost = cost
+
+    def __len__(self):
+        """Return the number of requests"""
+        return len(self.checks) + len(self.blocks)
+
+
+class CheckPlanner(object):
+    """Choose between ``check`` and ``check_block`` by the cost of the requests
+
+    The costs default to the reciprocal daily limits of the free plan,
+    which allows 1000 checks, but only 100 block checks per day.  So a block
+    is checked as a whole, if more than 10 of its addresses are asked for.
+    Set both costs to 1 to minimize the number of requests instead.
+    """
+
+    def __init__(self, check_cost=1.0, block_cost=10.0):
+        if check_cost <= 0 or block_cost <= 0:
+            raise ValueError('Costs must be greater than 0')
+        self.check_cost = check_cost
+        self.block_cost = block_cost
+
+    def plan(self, ip_addresses):
+        """Group the addresses and return the cheapest :class:`CheckPlan`
+
+        Invalid addresses are checked one by one, so they fail like in
+        ``check_many``.
+        """
+        checks = []
+        blocks = {}
+        for ip_address in ip_addresses:
+            try:
+                address = ipaddress.ip_address(ip_address)
+            except ValueError:
+                checks.append(ip_address)
+                continue
+            network = ipaddress.ip_network((address, BLOCK_PREFIXLEN[address.version]), strict=False)
+            blocks.setdefault(network, []).append(ip_address)
+        cost = len(checks) * self.check_cost
+        planned_blocks = []
+        for network, members in blocks.items():
+            if len(members) * self.check_cost > self.block_cost:
+                planned_blocks.append((network, members))
+                cost += self.block_cost
+            else:
+                checks.extend(members)
+                cost += len(members) * self.check_cost
+        return CheckPlan(checks, planned_blocks, cost)
+
+
+def block_entry_to_check_result(ip_address, entry):
+    """Convert an entry of ``reportedAddress`` into the result of ``check``
+
+    The block contains only some fields of a check.  Addresses, which are
+    not listed, were not reported.
+    """
+    if entry is None:
+        entry = {}
+    return {
+        'ipAddress': str(ip_address),
+        'abuseConfidenceScore': entry.get('abuseConfidenceScore', 0),
+        'countryCode': entry.get('countryCode'),
+        'lastReportedAt': entry.get('mostRecentReport'),
+        'totalReports': entry.get('numReports', 0),
+    }
+
+
+def answer_from_block(members, data):
+    """Return ``(ip_address, result)`` tuples for the addresses of a block
+
+    Errors returned for the block are returned for each address.
+    """
+    if not isinstance(data, dict):
+        return [(ip_address, data) for ip_address in members]
+    reported = {}
+    for entry in data.get('reportedAddress') or []:
+        reported[ipaddress.ip_address(entry['ipAddress'])] = entry
+    return [
+        (ip_address, block_entry_to_check_result(ip_address, reported.get(ipaddress.ip_address(ip_address))))
+        for ip_address in members
+    ]
@@ -0,0 +1,165 @@
+"""Client-side rate limiting driven by the rate limit headers of the API
+
+AbuseIpDb returns the state of the daily limit of each endpoint with every
+response:
+
+    X-RateLimit-Limit      number of requests per day
+    X-RateLimit-Remaining  requests left until the reset
+    X-RateLimit-Reset      time of the reset in seconds since the epoch
+    Retry-After            seconds to wait, only sent with status 429
+
+Pass a :class:`RateLimiter` to the client with the ``rate_limiter``
+parameter.  It keeps a token bucket per endpoint, that is seeded from these
+headers.  It does not spread the requests over the day: requests use up
+the remaining quota, then wait until the reset or fail with
+:class:`RateLimitExceeded`, so the API never needs to answer with 429.
+The daily reset can be hours away, so by default waits longer than
+``MAX_WAIT`` seconds fail.
+
+See https://docs.abuseipdb.com/#api-daily-rate-limits for documentation.
+"""
+import asyncio
+import threading
+import time
+
+# Seconds a request waits for a token at most by default
+MAX_WAIT = 15 * 60
+
+
+class RateLimitExceeded(Exception):
+    """No request is possible until ``retry_after`` seconds have passed"""
+
+    def __init__(self, endpoint, retry_after):
+        msg = 'Rate limit of endpoint "{}" exceeded, retry after {:.0f} seconds'
+        super(RateLimitExceeded, self).__init__(msg.format(endpoint, retry_after))
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def _header(headers, name, convert=int):
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return convert(value)
+    except ValueError:
+        return None
+
+
+class TokenBucket(object):
+    """Tokens for the requests to a single endpoint
+
+    Until the first response arrives, the number of tokens is unknown and
+    requests are not limited.  Requests still in flight are not yet
+    counted in the remaining requests of a response.  So they are taken off.
+    """
+
+    # Time to wait, if there are no tokens left, but the reset is unknown
+    UNKNOWN_RESET_WAIT = 60
+
+    def __init__(self):
+        self.limit = None
+        self.tokens = None
+        self.reset_at = None
+        self.blocked_until = 0
+        self.in_flight = 0
+
+    def reserve(self, now):
+        """Take a token and return 0, or the seconds to wait for one"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens is not None and self.tokens <= 0:
+            if self.reset_at is None:
+                return self.UNKNOWN_RESET_WAIT
+            if now < self.reset_at:
+                return self.reset_at - now
+            # The bucket is full again.  The next response corrects it.
+            self.tokens = self.limit
+            self.reset_at = None
+        if self.tokens is not None:
+            self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def release(self):
+        """Give up a reserved token without a response"""
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def update(self, now, status_code, headers):
+        self.release()
+        limit = _header(headers, 'X-RateLimit-Limit')
+        remaining = _header(headers, 'X-RateLimit-Remaining')
+        reset_at = _header(headers, 'X-RateLimit-Reset', float)
+        retry_after = _header(headers, 'Retry-After', float)
+        if limit is not None:
+            self.limit = limit
+        if remaining is not None:
+            self.tokens = remaining - self.in_flight
+        if reset_at is not None:
+            self.reset_at = reset_at
+        if status_code == 429:
+            self.tokens = 0
+            if retry_after is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after)
+                self.reset_at = max(self.reset_at or 0, self.blocked_until)
+
+
+class RateLimiter(object):
+    """Token bucket rate limiter for every endpoint
+
+    If no token is available, :meth:`acquire` blocks until the reset of the
+    rate limit.  With ``block=False`` it raises :class:`RateLimitExceeded`
+    instead.  The same happens, if the wait would take longer than
+    ``max_wait`` seconds.  Pass ``max_wait=None`` to sleep until the daily
+    reset, however long it takes.
+
+    A rate limiter can be shared by several threads and asyncio tasks.
+    """
+
+    def __init__(self, block=True, max_wait=MAX_WAIT, clock=time.time, sleep=time.sleep):
+        self.block = block
+        self.max_wait = max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint):
+        with self._lock:
+            if endpoint not in self._buckets:
+                self._buckets[endpoint] = TokenBucket()
+            return self._buckets[endpoint]
+
+    def _reserve(self, endpoint):
+        bucket = self.bucket(endpoint)
+        with self._lock:
+            wait = bucket.reserve(self._clock())
+        if wait > 0 and (not self.block or (self.max_wait is not None and wait > self.max_wait)):
+            raise RateLimitExceeded(endpoint, wait)
+        return wait
+
+    def acquire(self, endpoint):
+        """Wait until a request to the endpoint is possible"""
+        wait = self._reserve(endpoint)
+        while wait > 0:
+            self._sleep(wait)
+            wait = self._reserve(endpoint)
+
+    async def acquire_async(self, endpoint):
+        """Wait until a request to the endpoint is possible without blocking the event loop"""
+        wait = self._reserve(endpoint)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            wait = self._reserve(endpoint)
+
+    def release(self, endpoint):
+        """Give up an acquired request, that failed without a response"""
+        bucket = self.bucket(endpoint)
+        with self._lock:
+            bucket.release()
+
+    def update(self, endpoint, status_code, headers):
+        """Update the tokens of the endpoint from the headers of a response"""
+        bucket = self.bucket(endpoint)
+        with self._lock:
+            bucket.update(self._clock(), status_code, headers)
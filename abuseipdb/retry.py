@@ -0,0 +1,120 @@
+"""Retries and a circuit breaker for transient failures of the API
+
+Pass a :class:`RetryPolicy` to the client with the ``retry_policy``
+parameter.  Requests to the read-only endpoints ``blacklist``, ``check``
+and ``check-block`` are retried after connection errors and 5xx responses.
+The wait between the attempts grows exponentially up to ``max_backoff`` and
+is randomized ("full jitter"), so clients don't retry in lockstep.
+Reports are never retried, as they might have been saved already.
+
+An optional :class:`CircuitBreaker` counts the failures of all endpoints.
+During an outage it fails requests immediately with
+:class:`CircuitOpenError`, instead of letting every caller wait for the
+timeouts and retries.
+
+    policy = RetryPolicy(max_retries=3, circuit_breaker=CircuitBreaker())
+    abuse = AbuseIpDb(api_key, retry_policy=policy)
+"""
+import random
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """The API failed repeatedly, no request is sent for ``retry_after`` seconds"""
+
+    def __init__(self, retry_after):
+        msg = 'The API is unavailable, retry after {:.0f} seconds'
+        super(CircuitOpenError, self).__init__(msg.format(retry_after))
+        self.retry_after = retry_after
+
+
+class CircuitBreaker(object):
+    """Stop sending requests after ``failure_threshold`` failures in a row
+
+    When open, every request fails until ``reset_timeout`` seconds have
+    passed.  Then a single request is let through.  If it succeeds, the
+    circuit is closed again.  Otherwise it stays open for another
+    ``reset_timeout`` seconds.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError('Failure threshold must be greater than 0')
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = None
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """Raise :class:`CircuitOpenError`, unless a request may be sent"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            now = self._clock()
+            remaining = self._opened_at + self.reset_timeout - now
+            if remaining > 0:
+                raise CircuitOpenError(remaining)
+            # Let this request through as a probe.  The others keep failing
+            # until it succeeds, or until the next timeout, if it never ends.
+            self.state = self.HALF_OPEN
+            self._opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+
+
+class RetryPolicy(object):
+    """Retry requests to idempotent endpoints after transient failures
+
+    An attempt fails with a connection error, a timeout or a response with
+    one of ``status_codes``.  Before attempt ``n + 1`` the client waits a
+    random time between 0 and ``min(max_backoff, backoff_factor * 2 ** n)``
+    seconds.
+    """
+
+    STATUS_CODES = (500, 502, 503, 504)
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30.0, status_codes=STATUS_CODES,
+                 circuit_breaker=None, random=random.random, sleep=time.sleep):
+        if max_retries < 0:
+            raise ValueError('Maximum retries must not be negative')
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.status_codes = frozenset(status_codes)
+        self.circuit_breaker = circuit_breaker
+        self._random = random
+        self.sleep = sleep
+
+    def backoff(self, attempt):
+        """Return the seconds to wait after the failed attempt, counted from 0"""
+        return self._random() * min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+
+    def before_request(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.before_request()
+
+    def record_success(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_success()
+
+    def record_failure(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure()
@@ -0,0 +1,188 @@
+"""Binary snapshots of the blacklist, that are shared by several processes
+
+A snapshot is written once from the result of
+:meth:`abuseipdb.AbuseIpDb.blacklist` and memory-mapped read-only by any
+number of processes.  Loading only parses the header, so it takes
+milliseconds.  All lookups read directly from the mapping, and the pages
+are shared through the page cache.
+
+    write_snapshot('/var/lib/abuseipdb/blacklist.snapshot', abuse.blacklist())
+
+    with BlacklistSnapshot('/var/lib/abuseipdb/blacklist.snapshot') as snapshot:
+        snapshot.contains('192.0.2.123')
+
+File format, all numbers are little-endian:
+
+    header     magic "ABIPDBSN", format version (uint16), reserved (uint16),
+               reserved (uint32), number of IPv4 entries (uint64), number
+               of IPv6 entries (uint64), creation time (int64), padded to
+               64 bytes
+    columns    IPv4 keys (uint32), IPv6 keys (pairs of uint64 with the high
+               and low half), IPv4 scores (uint8), IPv6 scores (uint8),
+               IPv4 last reported times (uint32), IPv6 last reported times
+               (uint32)
+
+Keys are sorted in ascending order.  Every column starts at a multiple of
+8 bytes.  Times are seconds since the epoch.
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from abuseipdb.blacklist import BlacklistIndex
+
+MAGIC = b'ABIPDBSN'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHHIQQq')
+HEADER_SIZE = 64
+
+# Typecodes with exactly the size of the columns on this platform
+UINT32 = 'I' if array('I').itemsize == 4 else 'L'
+UINT64 = 'Q'
+
+
+def _padding(size):
+    return -size % 8
+
+
+def _columns(ipv4_count, ipv6_count):
+    """Return the typecode, offset and length of each column"""
+    layout = (
+        ('ipv4_keys', UINT32, ipv4_count, 4),
+        ('ipv6_keys', UINT64, ipv6_count * 2, 8),
+        ('ipv4_scores', 'B', ipv4_count, 1),
+        ('ipv6_scores', 'B', ipv6_count, 1),
+        ('ipv4_last_reported', UINT32, ipv4_count, 4),
+        ('ipv6_last_reported', UINT32, ipv6_count, 4),
+    )
+    offset = HEADER_SIZE
+    columns = {}
+    for name, typecode, length, size in layout:
+        columns[name] = (typecode, offset, length)
+        offset += length * size
+        offset += _padding(offset)
+    return columns, offset
+
+
+def write_snapshot(file_name, entries):
+    """Write a snapshot of the blacklist
+
+    ``entries`` is either a :class:`abuseipdb.blacklist.BlacklistIndex` or
+    the list returned by ``blacklist()``.  The file is replaced atomically,
+    so processes never see a partially written snapshot.  Processes that
+    still map the previous file keep their view of it.
+    """
+    index = entries if isinstance(entries, BlacklistIndex) else BlacklistIndex(entries)
+    ipv6_keys = array(UINT64)
+    for key in index._keys[6]:
+        ipv6_keys.append(key >> 64)
+        ipv6_keys.append(key & 0xffffffffffffffff)
+    data = [
+        array(UINT32, index._keys[4]),
+        ipv6_keys,
+        index._scores[4],
+        index._scores[6],
+        array(UINT32, index._last_reported[4]),
+        array(UINT32, index._last_reported[6]),
+    ]
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0, len(index._keys[4]), len(index._keys[6]), int(time.time()))
+    directory = os.path.dirname(os.path.abspath(file_name))
+    descriptor, temporary_name = tempfile.mkstemp(dir=directory, prefix='.snapshot-')
+    try:
+        with os.fdopen(descriptor, 'wb') as snapshot:
+            snapshot.write(header.ljust(HEADER_SIZE, b'\0'))
+            for column in data:
+                if sys.byteorder == 'big':
+                    column = array(column.typecode, column)
+                    column.byteswap()
+                column.tofile(snapshot)
+                snapshot.write(b'\0' * _padding(snapshot.tell()))
+        os.chmod(temporary_name, 0o644)
+        os.replace(temporary_name, file_name)
+    except BaseException:
+        os.unlink(temporary_name)
+        raise
+
+
+class _Ipv6Keys(object):
+    """Sequence of 128 bit keys stored as pairs of 64 bit halves"""
+
+    def __init__(self, halves):
+        self._halves = halves
+
+    def __len__(self):
+        return len(self._halves) // 2
+
+    def __getitem__(self, position):
+        if position < 0 or position >= len(self):
+            raise IndexError(position)
+        return self._halves[2 * position] << 64 | self._halves[2 * position + 1]
+
+
+class BlacklistSnapshot(BlacklistIndex):
+    """Read-only blacklist index on top of a memory-mapped snapshot
+
+    Provides the same lookups as :class:`abuseipdb.blacklist.BlacklistIndex`.
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, 'rb') as snapshot:
+            self._mmap = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._load()
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _load(self):
+        if len(self._mmap) < HEADER_SIZE:
+            raise ValueError('{} is not a blacklist snapshot'.format(self.file_name))
+        magic, version, _, _, ipv4_count, ipv6_count, created = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError('{} is not a blacklist snapshot'.format(self.file_name))
+        if version != FORMAT_VERSION:
+            msg = 'Snapshot format version {} of {} is not supported'
+            raise ValueError(msg.format(version, self.file_name))
+        columns, size = _columns(ipv4_count, ipv6_count)
+        if len(self._mmap) < size:
+            raise ValueError('{} is truncated'.format(self.file_name))
+        self.created = created
+        self._views.append(memoryview(self._mmap))
+        view = {name: self._view(*column) for name, column in columns.items()}
+        self._keys = {4: view['ipv4_keys'], 6: _Ipv6Keys(view['ipv6_keys'])}
+        self._scores = {4: view['ipv4_scores'], 6: view['ipv6_scores']}
+        self._last_reported = {4: view['ipv4_last_reported'], 6: view['ipv6_last_reported']}
+
+    def _view(self, typecode, offset, length):
+        size = array(typecode).itemsize
+        if sys.byteorder == 'big':
+            # Lookups need native byte order.  This copies the column.
+            column = array(typecode, self._mmap[offset:offset + length * size])
+            column.byteswap()
+            return column
+        # The first view covers the whole mapping.  All others are derived.
+        view = self._views[0][offset:offset + length * size].cast(typecode)
+        self._views.append(view)
+        return view
+
+    def close(self):
+        """Unmap the snapshot
+
+        The snapshot can't be used afterwards.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
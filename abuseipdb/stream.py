@@ -0,0 +1,97 @@
+"""Incremental parsing of large JSON responses"""
+import codecs
+import json
+from json.decoder import WHITESPACE
+
+
+class _Buffer(object):
+    """Text buffer filled from an iterator of byte chunks"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = ''
+        self.position = 0
+        self.exhausted = False
+
+    def fill(self):
+        """Append the next chunk and drop the consumed text
+
+        Returns False, if there is no more data.
+        """
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.text = self.text[self.position:] + text
+                self.position = 0
+                return True
+        if not self.exhausted:
+            self.exhausted = True
+            text = self._decoder.decode(b'', final=True)
+            self.text = self.text[self.position:] + text
+            self.position = 0
+            return bool(text)
+        return False
+
+    def peek(self):
+        """Return the next character, that is not whitespace, or '' at the end"""
+        while True:
+            self.position = WHITESPACE.match(self.text, self.position).end()
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                return ''
+
+    def expect(self, characters):
+        character = self.peek()
+        if not character or character not in characters:
+            msg = 'Expected one of "{}" at position {}, got "{}"'
+            raise ValueError(msg.format(characters, self.position, character))
+        self.position += 1
+        return character
+
+    def decode(self, decoder):
+        """Decode the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.text, self.position)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # A number at the end of the buffer might continue in the next chunk
+            if end < len(self.text) or not self.fill():
+                self.position = end
+                return value
+
+
+def iter_json_array(chunks, key='data'):
+    """Yield the items of an array in a JSON object one at a time
+
+    ``chunks`` is an iterator over the encoded response body, like
+    ``Response.iter_content()``.  Only the item currently parsed is held in
+    memory, so the peak memory is independent of the size of the array.
+    All other members of the object are skipped.
+    """
+    decoder = json.JSONDecoder()
+    buffer = _Buffer(chunks)
+    buffer.expect('{')
+    if buffer.peek() == '}':
+        return
+    while True:
+        name = buffer.decode(decoder)
+        buffer.expect(':')
+        if name == key:
+            buffer.expect('[')
+            if buffer.peek() != ']':
+                while True:
+                    yield buffer.decode(decoder)
+                    if buffer.expect(',]') == ']':
+                        break
+            else:
+                buffer.expect(']')
+        else:
+            buffer.decode(decoder)
+        if buffer.expect(',}') == '}':
+            return
@@ -0,0 +1,66 @@
+"""Check networks larger than the blocks accepted by check-block
+
+The check-block endpoint only accepts networks up to a limited size, e.g.
+a /24 IPv4 network without a subscription.  :func:`sweep_network` splits a
+larger network into the largest accepted blocks, checks them concurrently
+and yields the reported addresses of all blocks sorted by address:
+
+    for entry in abuse.sweep_network('198.51.100.0/22'):
+        print(entry['ipAddress'], entry['abuseConfidenceScore'])
+"""
+import ipaddress
+from contextlib import closing
+
+from abuseipdb.workers import imap_unordered
+
+
+class BlockCheckError(Exception):
+    """The API returned errors for a block of the network"""
+
+    def __init__(self, network, errors):
+        details = '; '.join(str(error.get('detail', error)) for error in errors)
+        super(BlockCheckError, self).__init__('Checking {} failed: {}'.format(network, details))
+        self.network = network
+        self.errors = errors
+
+
+def split_network(network, prefixlen):
+    """Yield the blocks of at most ``prefixlen`` covering the network"""
+    if network.prefixlen >= prefixlen:
+        return iter([network])
+    return network.subnets(new_prefix=prefixlen)
+
+
+def sweep_network(check_block, network, prefixlen, concurrency=10):
+    """Yield the ``reportedAddress`` entries of all blocks sorted by address
+
+    ``check_block`` is called with the string of each block.  Blocks
+    completed out of order are held until the blocks before them are
+    yielded.  Failed requests are raised as soon as the blocks before them
+    are yielded, errors returned by the API as :class:`BlockCheckError`.
+    """
+    def check(item):
+        return check_block(str(item[1]))
+    blocks = enumerate(split_network(network, prefixlen))
+    return _in_order(imap_unordered(check, blocks, concurrency))
+
+
+def _sorted_entries(block, data):
+    if isinstance(data, Exception):
+        raise data
+    if not isinstance(data, dict):
+        raise BlockCheckError(block, data)
+    entries = data.get('reportedAddress') or []
+    return sorted(entries, key=lambda entry: ipaddress.ip_address(entry['ipAddress']))
+
+
+def _in_order(results):
+    completed = {}
+    next_index = 0
+    with closing(results):
+        for (index, block), data in results:
+            completed[index] = (block, data)
+            while next_index in completed:
+                for entry in _sorted_entries(*completed.pop(next_index)):
+                    yield entry
+                next_index += 1
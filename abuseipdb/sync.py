@@ -0,0 +1,144 @@
+"""Incremental synchronization of the blacklist
+
+:class:`BlacklistSync` keeps the last downloaded blacklist as a snapshot on
+disk.  Each sync downloads the current blacklist and yields only the
+entries, that were added, removed or changed their score since the
+previous sync.  The snapshot is only replaced, when the delta is
+committed after the changes were applied.
+
+    sync = BlacklistSync(abuse, '/var/lib/abuseipdb/blacklist.snapshot')
+    delta = sync.sync()
+    for change in delta:
+        if change.action == 'remove':
+            ...
+    delta.commit()
+"""
+import ipaddress
+import os
+import time
+from collections import namedtuple
+
+from abuseipdb.blacklist import BlacklistIndex
+from abuseipdb.snapshot import BlacklistSnapshot, write_snapshot
+
+BlacklistChange = namedtuple('BlacklistChange', ('action', 'ip_address', 'score', 'last_reported_at'))
+
+ADDED = 'add'
+REMOVED = 'remove'
+CHANGED = 'change'
+
+_ADDRESS_CLASSES = {4: ipaddress.IPv4Address, 6: ipaddress.IPv6Address}
+
+
+def _change(action, record):
+    version, key, score, last_reported_at = record
+    return BlacklistChange(action, str(_ADDRESS_CLASSES[version](key)), score, last_reported_at)
+
+
+def diff_blacklists(old, new):
+    """Yield the changes between two blacklist indexes
+
+    Both are :class:`abuseipdb.blacklist.BlacklistIndex` instances or
+    snapshots.  As their records are sorted, this is a single merge pass
+    over both.  A change of only the last reported time is not a change.
+    """
+    old_records = old.records()
+    new_records = new.records()
+    old_record = next(old_records, None)
+    new_record = next(new_records, None)
+    while old_record is not None or new_record is not None:
+        if new_record is None or (old_record is not None and old_record[:2] < new_record[:2]):
+            yield _change(REMOVED, old_record)
+            old_record = next(old_records, None)
+        elif old_record is None or new_record[:2] < old_record[:2]:
+            yield _change(ADDED, new_record)
+            new_record = next(new_records, None)
+        else:
+            if old_record[2] != new_record[2]:
+                yield _change(CHANGED, new_record)
+            old_record = next(old_records, None)
+            new_record = next(new_records, None)
+
+
+class BlacklistDelta(object):
+    """Changes found by a sync
+
+    Iterate over it to get the :class:`BlacklistChange` tuples.  They are
+    compared while iterating, so ``added``, ``removed`` and ``changed`` are
+    counted once the iteration is complete.  Call :meth:`commit` once the
+    changes are applied to store the blacklist as the state for the next
+    sync.
+    """
+
+    def __init__(self, sync, current):
+        self.sync = sync
+        self.current = current
+        self.added = 0
+        self.removed = 0
+        self.changed = 0
+
+    def __iter__(self):
+        counts = {ADDED: 0, REMOVED: 0, CHANGED: 0}
+        seconds = 0.0
+        previous = self.sync._load_state()
+        try:
+            start = time.perf_counter()
+            for change in diff_blacklists(previous, self.current):
+                counts[change.action] += 1
+                seconds += time.perf_counter() - start
+                yield change
+                start = time.perf_counter()
+            seconds += time.perf_counter() - start
+        finally:
+            if isinstance(previous, BlacklistSnapshot):
+                previous.close()
+        self.added, self.removed, self.changed = counts[ADDED], counts[REMOVED], counts[CHANGED]
+        self.sync.metrics.update(added=self.added, removed=self.removed, changed=self.changed, diff_seconds=seconds)
+        self.sync.metrics['total_seconds'] += seconds
+
+    def commit(self):
+        """Store the blacklist as the state for the next sync"""
+        start = time.perf_counter()
+        write_snapshot(self.sync.file_name, self.current)
+        seconds = time.perf_counter() - start
+        self.sync.metrics['persist_seconds'] = seconds
+        self.sync.metrics['total_seconds'] += seconds
+
+
+class BlacklistSync(object):
+    """Download the blacklist and compute the changes since the last sync
+
+    The state is the snapshot of the blacklist from the last committed
+    sync.  It is stored in ``file_name``.  Without a previous state every
+    entry is reported as added.  Until :meth:`BlacklistDelta.commit` is
+    called, the next sync compares against the same state again.
+
+    ``metrics`` holds the number of entries and changes, and the time in
+    seconds spent for downloading, comparing and storing.  The changes and
+    the time spent comparing are added once the delta was iterated, the
+    time spent storing once it was committed.
+    """
+
+    def __init__(self, api, file_name, confidence_minimum=None, limit=None):
+        self.api = api
+        self.file_name = file_name
+        self.confidence_minimum = confidence_minimum
+        self.limit = limit
+        self.metrics = {}
+
+    def _load_state(self):
+        if not os.path.exists(self.file_name):
+            return BlacklistIndex([])
+        return BlacklistSnapshot(self.file_name)
+
+    def sync(self):
+        """Download the blacklist and return the :class:`BlacklistDelta` to the state"""
+        start = time.perf_counter()
+        current = BlacklistIndex(self.api.iter_blacklist(self.confidence_minimum, self.limit))
+        fetched = time.perf_counter() - start
+        self.metrics = {
+            'entries': len(current),
+            'fetch_seconds': fetched,
+            'total_seconds': fetched,
+        }
+        return BlacklistDelta(self, current)
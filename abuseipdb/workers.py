@@ -0,0 +1,35 @@
+"""Helpers to call the API concurrently from a thread pool"""
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def imap_unordered(func, items, workers):
+    """Call ``func`` for each item using a pool of ``workers`` threads
+
+    Yields ``(item, result)`` tuples in the order the calls complete.  If a
+    call raises an exception, the exception is yielded as its result.
+
+    The items are consumed lazily.  Only a small multiple of ``workers``
+    calls are pending at any time, so memory stays flat for large inputs.
+    """
+    if workers < 1:
+        raise ValueError('The number of workers must be greater than 0')
+    return _imap_unordered(func, iter(items), workers)
+
+
+def _imap_unordered(func, items, workers):
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def submit(batch):
+            for item in batch:
+                pending[executor.submit(func, item)] = item
+
+        submit(itertools.islice(items, workers * 2))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, future.result() if error is None else error
+            submit(itertools.islice(items, len(done)))
@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+"""Measure the client against a local stand-in for the AbuseIPDB API
+
+For every endpoint and concurrency level this measures the throughput and
+the median and 99th percentile latency of AbuseIpDbV2.  For the blacklist
+it measures the time and the peak memory of parsing a large response, as a
+whole and streamed.
+
+Run from the repository root:
+
+    python benchmarks/bench_api.py [--concurrency 1,4,16] [--output results.json]
+
+The results are written as JSON, so they can be compared between commits.
+Use ``--latency`` to simulate the round trip to the API and
+``--rate-limit-every`` to answer every n-th request with 429.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer  # noqa: E402 isort:skip
+
+from abuseipdb import __version__  # noqa: E402 isort:skip
+from abuseipdb.api_v2 import AbuseIpDbV2  # noqa: E402 isort:skip
+
+# IP addresses from TEST-NET-1 according to RFC 5737
+TEST_IP_ADDRESS = '192.0.2.123'
+TEST_NETWORK = '192.0.2.0/24'
+
+BULK_REPORTS = [('192.0.2.{}'.format(number), '18,22', '', 'benchmark') for number in range(1, 101)]
+
+ENDPOINTS = {
+    'blacklist': lambda api: api.blacklist(),
+    'bulk-report': lambda api: api.bulk_report(BULK_REPORTS),
+    'check': lambda api: api.check(TEST_IP_ADDRESS),
+    'check-block': lambda api: api.check_block(TEST_NETWORK),
+    'report': lambda api: api.report(TEST_IP_ADDRESS, '18,22', 'benchmark'),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Return the value below which the fraction of the values falls"""
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def is_api_error(result):
+    """Return whether the API returned errors, like an exceeded rate limit"""
+    if isinstance(result, dict) and 'uploads' in result:
+        return any(is_api_error(upload['result']) for upload in result['uploads'])
+    # The blacklist is a list as well, but its entries have no details
+    return isinstance(result, list) and bool(result) and 'detail' in result[0]
+
+
+def timed_call(call, api):
+    start = time.perf_counter()
+    try:
+        result = call(api)
+    except Exception:
+        return time.perf_counter() - start, 'error'
+    return time.perf_counter() - start, 'api_error' if is_api_error(result) else 'ok'
+
+
+def measure_endpoint(base_url, call, concurrency, count):
+    with AbuseIpDbV2('benchmark', base_url=base_url, pool_maxsize=concurrency) as api:
+        # Open the connections before measuring
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: timed_call(call, api), range(concurrency)))
+            start = time.perf_counter()
+            results = list(executor.map(lambda _: timed_call(call, api), range(count)))
+            elapsed = time.perf_counter() - start
+    latencies = sorted(latency for latency, _ in results)
+    outcomes = [outcome for _, outcome in results]
+    return {
+        'concurrency': concurrency,
+        'requests': count,
+        'throughput': round(count / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'api_errors': outcomes.count('api_error'),
+        'errors': outcomes.count('error'),
+    }
+
+
+def consume(result):
+    if isinstance(result, list):
+        return len(result)
+    return sum(1 for _ in result)
+
+
+def measure_blacklist(base_url, entries):
+    parsers = {
+        'json': lambda api: api.blacklist(limit=entries),
+        'stream': lambda api: api.iter_blacklist(limit=entries),
+        'stream_plaintext': lambda api: api.iter_blacklist(limit=entries, plaintext=True),
+    }
+    results = {}
+    with AbuseIpDbV2('benchmark', base_url=base_url, subscriber=True) as api:
+        for name, parse in sorted(parsers.items()):
+            start = time.perf_counter()
+            count = consume(parse(api))
+            elapsed = time.perf_counter() - start
+            # Tracing slows down the parsing, so the memory is measured apart
+            tracemalloc.start()
+            consume(parse(api))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[name] = {'entries': count, 'seconds': round(elapsed, 4), 'peak_bytes': peak}
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--concurrency', default='1,4,16',
+                        help='comma separated concurrency levels (default: %(default)s)')
+    parser.add_argument('--requests', type=int, default=200,
+                        help='requests per endpoint and concurrency level (default: %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.0, metavar='MILLISECONDS',
+                        help='delay of every response (default: %(default)s)')
+    parser.add_argument('--block-size', type=int, default=20,
+                        help='reported addresses per check-block response (default: %(default)s)')
+    parser.add_argument('--blacklist-size', type=int, default=1000,
+                        help='entries of the blacklist endpoint (default: %(default)s)')
+    parser.add_argument('--blacklist-parse-size', type=int, default=100000,
+                        help='entries of the blacklist parsed for time and memory (default: %(default)s)')
+    parser.add_argument('--rate-limit-every', type=int, default=0, metavar='N',
+                        help='answer every n-th request with 429 (default: never)')
+    parser.add_argument('--endpoints', default=','.join(sorted(ENDPOINTS)),
+                        help='comma separated endpoints (default: all)')
+    parser.add_argument('--output', help='write the results to this file instead of stdout')
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.concurrency.split(',')]
+    endpoints = args.endpoints.split(',')
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error('Unknown endpoints: {}'.format(', '.join(sorted(unknown))))
+
+    report = {
+        'version': __version__,
+        'python': platform.python_version(),
+        'parameters': {
+            'latency_ms': args.latency,
+            'block_size': args.block_size,
+            'blacklist_size': args.blacklist_size,
+            'rate_limit_every': args.rate_limit_every,
+        },
+        'endpoints': {},
+    }
+    with StubServer(latency=args.latency / 1000, block_size=args.block_size,
+                    blacklist_size=args.blacklist_size, rate_limit_every=args.rate_limit_every) as server:
+        for endpoint in endpoints:
+            report['endpoints'][endpoint] = [
+                measure_endpoint(server.base_url, ENDPOINTS[endpoint], level, args.requests)
+                for level in levels]
+            for result in report['endpoints'][endpoint]:
+                print('{:12} {:4} workers {:9.1f}/s p50 {:8.3f} ms p99 {:8.3f} ms'.format(
+                    endpoint, result['concurrency'], result['throughput'], result['p50_ms'], result['p99_ms']),
+                    file=sys.stderr)
+    with StubServer(blacklist_size=args.blacklist_parse_size) as server:
+        report['blacklist_parse'] = measure_blacklist(server.base_url, args.blacklist_parse_size)
+        for name, result in sorted(report['blacklist_parse'].items()):
+            print('blacklist {:16} {:8.3f} s {:10} bytes peak'.format(name, result['seconds'], result['peak_bytes']),
+                  file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+            output.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write('\n')
+
+
+if __name__ == '__main__':
+    main()
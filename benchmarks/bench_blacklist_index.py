@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+"""Measure membership queries against a BlacklistIndex
+
+Run from the repository root:
+
+    python benchmarks/bench_blacklist_index.py [NUMBER_OF_ENTRIES]
+"""
+import ipaddress
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from abuseipdb.blacklist import BlacklistIndex  # noqa: E402 isort:skip
+
+
+def generate_blacklist(count, seed=42):
+    generator = random.Random(seed)
+    entries = []
+    for number in range(count):
+        if number % 10:
+            address = ipaddress.IPv4Address(generator.getrandbits(32))
+        else:
+            address = ipaddress.IPv6Address(generator.getrandbits(128))
+        entries.append({
+            'ipAddress': str(address),
+            'abuseConfidenceScore': generator.randint(25, 100),
+            'lastReportedAt': '2020-01-31T12:00:00+00:00',
+        })
+    return entries
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    entries = generate_blacklist(count)
+    start = time.perf_counter()
+    index = BlacklistIndex(entries)
+    print('build            {:10.3f} ms for {} entries'.format((time.perf_counter() - start) * 1000, count))
+
+    queries = [entry['ipAddress'] for entry in entries[::2]]
+    queries += [str(ipaddress.IPv4Address(random.getrandbits(32))) for _ in range(len(queries))]
+    random.shuffle(queries)
+    rounds = max(1, 1000000 // len(queries))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        index.contains_many(queries)
+    elapsed = time.perf_counter() - start
+    print('contains_many    {:10.0f} queries/s'.format(rounds * len(queries) / elapsed))
+
+    integers = [int(ipaddress.ip_address(query)) for query in queries if ':' not in query]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        index.contains_many(integers)
+    elapsed = time.perf_counter() - start
+    print('contains_many    {:10.0f} queries/s (IPv4 as integers)'.format(rounds * len(integers) / elapsed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+"""Compare the JSON backends on blacklist-sized payloads
+
+Decodes a blacklist response the way ``response.json()`` of requests did,
+by decoding the bytes to text first, and straight from the bytes with each
+backend of :mod:`abuseipdb.codec`.  Then encodes the result indented for
+humans and compact for machine consumers.
+
+Run from the repository root:
+
+    python benchmarks/bench_codec.py [NUMBER_OF_ENTRIES]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import blacklist_body  # noqa: E402 isort:skip
+
+from abuseipdb.codec import CODECS, get_codec  # noqa: E402 isort:skip
+
+
+def measure(function, runs=5):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    body = blacklist_body(count)
+    data = json.loads(body)
+    print('{} entries, {} bytes of JSON'.format(count, len(body)))
+    print('{:28} {:8.1f} ms'.format('decode text (response.json)', measure(lambda: json.loads(body.decode('utf-8')))))
+    for name in sorted(CODECS):
+        try:
+            codec = get_codec(name)
+        except ImportError:
+            print('{:28} not installed'.format(name))
+            continue
+        print('{:28} {:8.1f} ms'.format(name + ' decode bytes', measure(lambda: codec.loads(body))))
+        print('{:28} {:8.1f} ms'.format(name + ' encode indented', measure(
+            lambda: codec.dumps(data, indent=4, sort_keys=True))))
+        print('{:28} {:8.1f} ms'.format(name + ' encode compact', measure(lambda: codec.dumps(data, sort_keys=True))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""Compare the word-by-word masking with SensitiveDataMasker
+
+Masks log excerpts of several kilobytes on a host with many users, like
+hosts with users from a directory service.
+
+Run from the repository root:
+
+    python benchmarks/bench_masking.py [NUMBER_OF_USERS] [SIZE_OF_COMMENT]
+"""
+import os
+import pwd
+import random
+import re
+import socket
+import sys
+import time
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from abuseipdb.masking import SensitiveDataMasker  # noqa: E402 isort:skip
+
+LOG_LINES = (
+    'Feb  7 09:23:34 {host} sshd[{pid}]: Failed password for invalid user {user} from 192.0.2.{octet} port 5{pid}',
+    'Feb  7 09:23:35 {host} postfix/smtpd[{pid}]: NOQUEUE: reject: RCPT from unknown[198.51.100.{octet}]: '
+    '554 5.7.1 <{user}@example.com>: Relay access denied; from=<spam@example.org> to=<{user}@{host}>',
+    'Feb  7 09:23:36 {host} dovecot: imap-login: Disconnected (auth failed, 3 attempts): user=<{user}>, '
+    'rip=203.0.113.{octet}, lip=192.0.2.1, session=<{pid}>',
+)
+
+
+def word_by_word(comment):
+    """The masking of the command line interface before SensitiveDataMasker"""
+    filtered = []
+    hostname = socket.gethostname()
+    users = [user[0].lower() for user in pwd.getpwall()]
+    pattern = re.compile(r'[a-zA-Z0-9.+-]*\w@\w[a-zA-Z0-9.:+-]*\.\w+')
+    for word in comment.split():
+        if word.lower() == hostname.lower():
+            filtered.append('*host*')
+        elif word.lower() in users:
+            filtered.append('*user*')
+        elif '@' in word:
+            filtered.append('*email*'.join(re.split(pattern, word)))
+        else:
+            filtered.append(word)
+    return ' '.join(filtered)
+
+
+def generate_comment(size, users, rng):
+    lines = []
+    length = 0
+    while length < size:
+        line = rng.choice(LOG_LINES).format(
+            host='mail', pid=rng.randint(1000, 9999), user=rng.choice(users), octet=rng.randint(1, 254))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+def measure(function, comments):
+    start = time.perf_counter()
+    for comment in comments:
+        function(comment)
+    return (time.perf_counter() - start) / len(comments) * 1000
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 8192
+    rng = random.Random(42)
+    users = ['user{:05d}'.format(number) for number in range(user_count)]
+    comments = [generate_comment(size, users, rng) for _ in range(20)]
+    passwd = [(user,) for user in users]
+
+    with patch('pwd.getpwall', return_value=passwd), patch('socket.gethostname', return_value='mail'):
+        print('{} users, comments of {} bytes'.format(user_count, size))
+        print('word by word       {:10.3f} ms per comment'.format(measure(word_by_word, comments[:3])))
+
+        masker = SensitiveDataMasker()
+        start = time.perf_counter()
+        masker.refresh()
+        print('masker refresh     {:10.3f} ms'.format((time.perf_counter() - start) * 1000))
+        print('masker             {:10.3f} ms per comment'.format(measure(masker.mask, comments)))
+        text = comments[0].replace('@', ' ')
+        print('masker, no emails  {:10.3f} ms per comment'.format(measure(masker.mask, [text] * 20)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""Compare the dictionaries of a large blacklist with BlacklistEntry objects
+
+Measures the memory kept by the parsed blacklist, the time to build it from
+the JSON response and the time of a typical consumer, that selects the
+addresses reported within the last day.
+
+Run from the repository root:
+
+    python benchmarks/bench_models.py [NUMBER_OF_ENTRIES]
+"""
+import datetime
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import blacklist_body  # noqa: E402 isort:skip
+
+from abuseipdb.models import BlacklistEntry, parse_timestamp  # noqa: E402 isort:skip
+
+SINCE = datetime.datetime(2026, 9, 30, 12, tzinfo=datetime.timezone.utc)
+
+
+def parse_dicts(body):
+    return json.loads(body.decode('utf-8'))['data']
+
+
+def parse_models(body):
+    return [BlacklistEntry.from_dict(entry) for entry in json.loads(body.decode('utf-8'))['data']]
+
+
+def recent_dicts(entries):
+    since = SINCE.timestamp()
+    return [entry['ipAddress'] for entry in entries if parse_timestamp(entry['lastReportedAt']) >= since]
+
+
+def recent_models(entries):
+    since = SINCE.timestamp()
+    return [entry.key for entry in entries if entry.last_reported >= since]
+
+
+def retained_memory(parse, body):
+    gc.collect()
+    tracemalloc.start()
+    entries = parse(body)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return current, peak
+
+
+def measure(function, argument, runs=3):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    body = blacklist_body(count)
+    print('{} entries, {} bytes of JSON'.format(count, len(body)))
+    for name, parse, recent in (('dicts', parse_dicts, recent_dicts), ('models', parse_models, recent_models)):
+        current, peak = retained_memory(parse, body)
+        entries = parse(body)
+        print('{:7} retained {:8.1f} MB  peak {:8.1f} MB  parse {:8.1f} ms  recent {:8.1f} ms'.format(
+            name, current / 2 ** 20, peak / 2 ** 20, measure(parse, body), measure(recent, entries)))
+
+
+if __name__ == '__main__':
+    main()
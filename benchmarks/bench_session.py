@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+"""Compare one-shot requests with the pooled session of AbuseIpDbV2
+
+Run from the repository root:
+
+    python benchmarks/bench_session.py [NUMBER_OF_REQUESTS]
+
+The stub server is plain HTTP on the loopback interface.  Against the real
+API the difference is larger, because every new connection also needs a DNS
+lookup and a TLS handshake.
+"""
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_server import StubServer  # noqa: E402 isort:skip
+
+from abuseipdb.api_v2 import AbuseIpDbV2  # noqa: E402 isort:skip
+
+TEST_IP_ADDRESS = '192.0.2.123'
+
+
+def one_shot(base_url, count):
+    # This is what AbuseIpDbV2 did before it kept a pool of connections
+    url = base_url.format(endpoint='check')
+    headers = {'Key': 'benchmark', 'Accept': 'application/json', 'Connection': 'close'}
+    for _ in range(count):
+        requests.request(method='GET', url=url, headers=headers,
+                         params={'ipAddress': TEST_IP_ADDRESS}).json()
+
+
+def pooled(base_url, count):
+    with AbuseIpDbV2('benchmark', base_url=base_url) as api:
+        for _ in range(count):
+            api.check(TEST_IP_ADDRESS)
+
+
+def measure(func, base_url, count):
+    start = time.perf_counter()
+    func(base_url, count)
+    return (time.perf_counter() - start) / count * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with StubServer() as server:
+        for func in (one_shot, pooled):
+            latency = measure(func, server.base_url, count)
+            print('{:10} {:8.3f} ms/request'.format(func.__name__, latency))
+
+
+if __name__ == '__main__':
+    main()
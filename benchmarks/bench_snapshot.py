@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Compare building a BlacklistIndex with loading a memory-mapped snapshot
+
+Run from the repository root:
+
+    python benchmarks/bench_snapshot.py [NUMBER_OF_ENTRIES]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_blacklist_index import generate_blacklist  # noqa: E402 isort:skip
+
+from abuseipdb.blacklist import BlacklistIndex  # noqa: E402 isort:skip
+from abuseipdb.snapshot import BlacklistSnapshot, write_snapshot  # noqa: E402 isort:skip
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    entries = generate_blacklist(count)
+    queries = [entry['ipAddress'] for entry in entries[:100000]]
+
+    start = time.perf_counter()
+    index = BlacklistIndex(entries)
+    print('build index      {:10.3f} ms for {} entries'.format((time.perf_counter() - start) * 1000, count))
+
+    with tempfile.TemporaryDirectory() as directory:
+        file_name = os.path.join(directory, 'blacklist.snapshot')
+        start = time.perf_counter()
+        write_snapshot(file_name, index)
+        print('write snapshot   {:10.3f} ms, {} bytes'.format(
+            (time.perf_counter() - start) * 1000, os.path.getsize(file_name)))
+
+        start = time.perf_counter()
+        snapshot = BlacklistSnapshot(file_name)
+        print('load snapshot    {:10.3f} ms'.format((time.perf_counter() - start) * 1000))
+
+        for name, lookups in (('index', index), ('snapshot', snapshot)):
+            start = time.perf_counter()
+            assert all(lookups.contains_many(queries))
+            elapsed = time.perf_counter() - start
+            print('{:16} {:10.0f} queries/s'.format(name, len(queries) / elapsed))
+        snapshot.close()
+
+
+if __name__ == '__main__':
+    main()
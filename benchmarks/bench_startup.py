@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Measure the cold start of the command line interface
+
+fail2ban starts the command line interface for every ban.  This measures
+the import time of ``abuseipdb.cli`` with ``-X importtime`` and the wall
+time of ``python -m abuseipdb list_categories`` above the bare interpreter.
+
+Run from the repository root:
+
+    python benchmarks/bench_startup.py [--runs RUNS] [--threshold MILLISECONDS]
+
+Exits with status 1, if the import time or the startup overhead exceed the
+threshold.  The bytecode is cached in a temporary directory, like in an
+installed package.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules, that the startup path should not load
+HEAVY_MODULES = ('requests', 'sqlite3', 'concurrent.futures', 'socketserver', 'aiohttp')
+
+MODULES_CODE = """
+import sys
+from abuseipdb.cli import main
+sys.argv = ['abuseipdb', '-f', {config!r}] + {argv!r}
+main()
+print(' '.join(sorted(module for module in {heavy!r} if module in sys.modules)))
+"""
+
+
+def run(env, *args):
+    return subprocess.run(
+        (sys.executable,) + args, cwd=ROOT, env=env, check=True,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def import_time(env, module):
+    """Return the cumulative import time of the module in milliseconds"""
+    result = run(env, '-X', 'importtime', '-c', 'import {}'.format(module))
+    for line in result.stderr.splitlines():
+        if line.rstrip().endswith('| {}'.format(module)):
+            return int(line.split('|')[1]) / 1000
+    raise RuntimeError('No import time reported for {}'.format(module))
+
+
+def wall_time(env, runs, *args):
+    """Return the median wall time of running the interpreter in milliseconds"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run(env, *args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--threshold', type=float, default=50, metavar='MILLISECONDS')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = os.path.join(directory, 'abuseipdb')
+        with open(config, 'w') as config_file:
+            config_file.write('[AbuseIPDB]\napi_key = benchmark\n')
+        os.chmod(config, 0o600)
+        env = dict(os.environ, PYTHONPATH=ROOT, PYTHONPYCACHEPREFIX=os.path.join(directory, 'pycache'))
+        env.pop('PYTHONDONTWRITEBYTECODE', None)
+        # Fill the bytecode cache
+        run(env, '-c', 'import abuseipdb.cli, abuseipdb.api_v2')
+
+        failed = False
+        cli_import = statistics.median(import_time(env, 'abuseipdb.cli') for _ in range(args.runs))
+        print('import abuseipdb.cli     {:8.2f} ms'.format(cli_import))
+        failed |= cli_import > args.threshold
+
+        interpreter = wall_time(env, args.runs, '-c', 'pass')
+        list_categories = wall_time(env, args.runs, '-m', 'abuseipdb', '-f', config, 'list_categories')
+        overhead = list_categories - interpreter
+        print('python -c pass           {:8.2f} ms'.format(interpreter))
+        print('list_categories          {:8.2f} ms ({:+.2f} ms)'.format(list_categories, overhead))
+        failed |= overhead > args.threshold
+
+        code = MODULES_CODE.format(config=config, argv=['list_categories'], heavy=HEAVY_MODULES)
+        loaded = run(env, '-c', code).stdout.splitlines()[-1].split()
+        print('heavy modules loaded     {}'.format(' '.join(loaded) or '-'))
+        failed |= 'requests' in loaded
+
+    if failed:
+        print('Startup exceeds the threshold of {} ms'.format(args.threshold))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Local stand-in for the AbuseIPDB API used by the benchmarks
+
+The server speaks plain HTTP/1.1 with keep-alive on the loopback interface.
+Point a client at it with ``base_url=server.base_url``.
+
+It answers ``blacklist``, ``bulk-report``, ``check``, ``check-block`` and
+``report`` with responses shaped like those of the API:
+
+    with StubServer(latency=0.02, blacklist_size=100000, rate_limit_every=50) as server:
+        api = AbuseIpDbV2('benchmark', base_url=server.base_url)
+
+``latency`` delays every response by that many seconds, ``block_size`` and
+``blacklist_size`` set the number of entries of check-block and blacklist,
+and every ``rate_limit_every`` request is answered with 429.
+"""
+import ipaddress
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlsplit
+
+REPORT_DATE = '2026-10-01T12:00:00+00:00'
+
+# First address of TEST-NET-3 according to RFC 5737
+FIRST_ADDRESS = int(ipaddress.ip_address('203.0.113.0'))
+
+
+def check_data(ip_address):
+    return {
+        'ipAddress': ip_address,
+        'isPublic': True,
+        'ipVersion': ipaddress.ip_address(ip_address).version,
+        'isWhitelisted': False,
+        'abuseConfidenceScore': 75,
+        'countryCode': 'US',
+        'usageType': 'Data Center/Web Hosting/Transit',
+        'isp': 'Example Hosting',
+        'domain': 'example.com',
+        'hostnames': ['host.example.com'],
+        'totalReports': 12,
+        'numDistinctUsers': 4,
+        'lastReportedAt': REPORT_DATE,
+    }
+
+
+def check_block_data(network, size):
+    network = ipaddress.ip_network(network, strict=False)
+    hosts = min(size, network.num_addresses)
+    return {
+        'networkAddress': str(network.network_address),
+        'netmask': str(network.netmask),
+        'minAddress': str(network.network_address),
+        'maxAddress': str(network.broadcast_address),
+        'numPossibleHosts': network.num_addresses,
+        'addressSpaceDesc': 'Internet',
+        'reportedAddress': [{
+            'ipAddress': str(network.network_address + number),
+            'numReports': 3,
+            'mostRecentReport': REPORT_DATE,
+            'abuseConfidenceScore': 50,
+            'countryCode': 'US',
+        } for number in range(hosts)],
+    }
+
+
+def blacklist_addresses(size):
+    return [str(ipaddress.ip_address((FIRST_ADDRESS + number) % 2 ** 32)) for number in range(size)]
+
+
+def blacklist_body(size):
+    entries = [{
+        'ipAddress': ip_address,
+        'countryCode': 'US',
+        'abuseConfidenceScore': 100,
+        'lastReportedAt': REPORT_DATE,
+    } for ip_address in blacklist_addresses(size)]
+    return json.dumps({'meta': {'generatedAt': REPORT_DATE}, 'data': entries}).encode('utf-8')
+
+
+def count_csv_rows(body):
+    """Return the number of reports in the multipart body of a bulk report"""
+    rows = 0
+    in_csv = False
+    for line in body.split(b'\r\n'):
+        if line.startswith(b'IP,'):
+            in_csv = True
+        elif line.startswith(b'--'):
+            in_csv = False
+        elif in_csv and line:
+            rows += 1
+    return rows
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately.  Without this, Nagle's
+    # algorithm and delayed ACKs add 40 ms to every keep-alive response.
+    disable_nagle_algorithm = True
+
+    def _send_body(self, status, body, content_type='application/json', headers=()):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('X-RateLimit-Limit', '1000')
+        self.send_header('X-RateLimit-Remaining', '999')
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload, headers=()):
+        self._send_body(status, json.dumps(payload).encode('utf-8'), headers=headers)
+
+    def _read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b''.join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+    def _respond(self, body):
+        url = urlsplit(self.path)
+        endpoint = url.path.rsplit('/', 1)[-1]
+        query = {name: values[-1] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        if server.is_rate_limited():
+            self._send_json(429, {'errors': [{
+                'detail': 'Daily rate limit of 1000 requests exceeded for this endpoint.',
+                'status': 429,
+            }]}, headers=[('Retry-After', str(server.retry_after))])
+        elif endpoint == 'check':
+            self._send_json(200, {'data': check_data(query.get('ipAddress', '192.0.2.123'))})
+        elif endpoint == 'check-block':
+            self._send_json(200, {'data': check_block_data(query.get('network', '192.0.2.0/24'), server.block_size)})
+        elif endpoint == 'report':
+            self._send_json(200, {'data': {'ipAddress': query.get('ip'), 'abuseConfidenceScore': 52}})
+        elif endpoint == 'bulk-report':
+            self._send_json(200, {'data': {'savedReports': count_csv_rows(body), 'invalidReports': []}})
+        elif endpoint == 'blacklist' and 'plaintext' in query:
+            self._send_body(200, server.blacklist_plaintext(), content_type='text/plain')
+        elif endpoint == 'blacklist':
+            self._send_body(200, server.blacklist_json())
+        else:
+            self._send_json(404, {'errors': [{'detail': 'Unknown endpoint', 'status': 404}]})
+
+    def do_GET(self):
+        self._respond(b'')
+
+    def do_POST(self):
+        self._respond(self._read_body())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler=StubRequestHandler, latency=0.0, block_size=20, blacklist_size=1000,
+                 rate_limit_every=0, retry_after=1):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.latency = latency
+        self.block_size = block_size
+        self.blacklist_size = blacklist_size
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._blacklist_json = None
+        self._blacklist_plaintext = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}/api/v2/{{endpoint}}'.format(self.server_address[1])
+
+    def is_rate_limited(self):
+        """Count the request and return whether it exceeds the rate limit"""
+        with self._lock:
+            self.requests += 1
+            return bool(self.rate_limit_every) and self.requests % self.rate_limit_every == 0
+
+    def blacklist_json(self):
+        with self._lock:
+            if self._blacklist_json is None:
+                self._blacklist_json = blacklist_body(self.blacklist_size)
+            return self._blacklist_json
+
+    def blacklist_plaintext(self):
+        with self._lock:
+            if self._blacklist_plaintext is None:
+                lines = blacklist_addresses(self.blacklist_size)
+                self._blacklist_plaintext = '\n'.join(lines).encode('ascii')
+            return self._blacklist_plaintext
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
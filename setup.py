@@ -173,6 +173,8 @@ setup(
     # Similar to `install_requires` above, these must be valid existing
     # projects.
     extras_require={  # Optional
+        'async': ['aiohttp'],
+        'fast': ['orjson'],
         'dev': ['check-manifest'],
         'test': ['coverage'],
     },
@@ -0,0 +1,16 @@
+"""Helpers shared by the test modules"""
+
+
+class FakeClock(object):
+    """Clock and sleep function, that only advance when told to"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
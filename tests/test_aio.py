@@ -0,0 +1,332 @@
+import asyncio
+import json
+from unittest import TestCase, skipIf
+from unittest.mock import MagicMock, patch
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def fake_response(status=200, payload=None, headers=None):
+    async def read():
+        return json.dumps(payload).encode('utf-8')
+
+    response = MagicMock(status=status, headers=headers or {}, content_length=None)
+    response.read = read
+    context = MagicMock()
+
+    async def aenter(*args):
+        return response
+
+    async def aexit(*args):
+        return False
+
+    context.__aenter__ = aenter
+    context.__aexit__ = aexit
+    return context
+
+
+@skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncApiV2TestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.123'
+    TEST_CIDR_NETWORK = '192.0.2.0/24'
+
+    def get_api(self, **kwargs):
+        from abuseipdb.aio import AsyncAbuseIpDbV2
+        kwargs['api_key'] = 'some_API_key'
+        return AsyncAbuseIpDbV2(**kwargs)
+
+    def call(self, method, *args, **kwargs):
+        async def call():
+            async with self.get_api() as abuse:
+                return await getattr(abuse, method)(*args, **kwargs)
+        return run(call())
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(payload={'data': {'ipAddress': '192.0.2.123'}}))
+    def test_check(self, mock):
+        result = self.call('check', ip_address=self.TEST_IP_ADDRESS)
+        assert result == {'ipAddress': self.TEST_IP_ADDRESS}
+        mock.assert_called_once_with(
+            method='GET',
+            headers={'Key': 'some_API_key', 'Accept': 'application/json'},
+            params={'ipAddress': self.TEST_IP_ADDRESS, 'maxAgeInDays': '30'},
+            url='https://api.abuseipdb.com/api/v2/check')
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(payload={'data': {}}))
+    def test_check_block(self, mock):
+        self.call('check_block', cidr_network=self.TEST_CIDR_NETWORK, max_age_in_days='90')
+        mock.assert_called_once_with(
+            method='GET',
+            headers={'Key': 'some_API_key', 'Accept': 'application/json'},
+            params={'network': self.TEST_CIDR_NETWORK, 'maxAgeInDays': '90'},
+            url='https://api.abuseipdb.com/api/v2/check-block')
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(payload={'data': {}}))
+    def test_report(self, mock):
+        self.call('report', ip_address=self.TEST_IP_ADDRESS, categories='22', comment='Some comment')
+        mock.assert_called_once_with(
+            method='POST',
+            headers={'Key': 'some_API_key', 'Accept': 'application/json'},
+            params={'ip': self.TEST_IP_ADDRESS, 'categories': '22', 'comment': 'Some comment'},
+            url='https://api.abuseipdb.com/api/v2/report')
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(payload={'data': []}))
+    def test_blacklist(self, mock):
+        self.call('blacklist', limit=123)
+        mock.assert_called_once_with(
+            method='GET',
+            headers={'Key': 'some_API_key', 'Accept': 'application/json'},
+            params={'limit': '123'},
+            url='https://api.abuseipdb.com/api/v2/blacklist')
+
+    @patch('aiohttp.ClientSession.request')
+    def test_blacklist__with_too_low_limit(self, mock):
+        with self.assertRaises(ValueError):
+            self.call('blacklist', limit=0)
+        mock.assert_not_called()
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(429, {'errors': [{'status': 429}]}))
+    def test_rate_limit_errors_are_returned(self, mock):
+        result = self.call('check', ip_address=self.TEST_IP_ADDRESS)
+        assert result == [{'status': 429}]
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(422, {'errors': [{'status': 422}]}))
+    def test_validation_errors_are_returned(self, mock):
+        result = self.call('check', ip_address=self.TEST_IP_ADDRESS)
+        assert result == [{'status': 422}]
+
+    def test_max_concurrency_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.get_api(max_concurrency=0)
+
+    def test_synchronous_context_manager_is_refused(self):
+        with self.assertRaises(TypeError):
+            with self.get_api():
+                pass
+
+    def test_concurrency_is_bounded(self):
+        state = {'active': 0, 'maximum': 0}
+
+        async def fake_get_response(abuse):
+            # Replaces the HTTP request, but keeps the semaphore
+            abuse._get_session()
+            async with abuse._semaphore:
+                state['active'] += 1
+                state['maximum'] = max(state['maximum'], state['active'])
+                await asyncio.sleep(0.01)
+                state['active'] -= 1
+
+        async def call():
+            async with self.get_api(max_concurrency=3) as abuse:
+                await asyncio.gather(*[fake_get_response(abuse) for _ in range(10)])
+
+        run(call())
+        assert state['maximum'] == 3
+
+    def test_connection_errors_are_retried(self):
+        from abuseipdb.retry import RetryPolicy
+        responses = [aiohttp.ClientConnectionError(), fake_response(payload={'data': {}})]
+
+        async def call():
+            async with self.get_api(retry_policy=RetryPolicy(backoff_factor=0)) as abuse:
+                return await abuse.check(self.TEST_IP_ADDRESS)
+
+        with patch('aiohttp.ClientSession.request', side_effect=responses) as mock:
+            assert run(call()) == {}
+        assert mock.call_count == 2
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(
+        429, {'errors': [{'status': 429}]}, {'Retry-After': '3600'}))
+    def test_errors_of_the_client_do_not_open_the_circuit(self, mock):
+        from abuseipdb.ratelimit import RateLimiter, RateLimitExceeded
+        from abuseipdb.retry import CircuitBreaker, RetryPolicy
+        policy = RetryPolicy(backoff_factor=0, circuit_breaker=CircuitBreaker(failure_threshold=2))
+
+        async def call():
+            async with self.get_api(rate_limiter=RateLimiter(block=False), retry_policy=policy) as abuse:
+                await abuse.check(self.TEST_IP_ADDRESS)
+                for _ in range(3):
+                    with self.assertRaises(RateLimitExceeded):
+                        await abuse.check(self.TEST_IP_ADDRESS)
+
+        run(call())
+        assert policy.circuit_breaker.state == policy.circuit_breaker.CLOSED
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(
+        429, {'errors': [{'status': 429}]}, {'Retry-After': '3600'}))
+    def test_rate_limiter_fails_fast(self, mock):
+        from abuseipdb.ratelimit import RateLimiter, RateLimitExceeded
+        limiter = RateLimiter(block=False)
+
+        async def call():
+            async with self.get_api(rate_limiter=limiter) as abuse:
+                await abuse.check(self.TEST_IP_ADDRESS)
+                await abuse.check(self.TEST_IP_ADDRESS)
+
+        with self.assertRaises(RateLimitExceeded):
+            run(call())
+        assert mock.call_count == 1
+        assert limiter.bucket('check').in_flight == 0
+
+    def test_instrumentation(self):
+        from abuseipdb.metrics import MetricsRegistry
+        from abuseipdb.retry import RetryPolicy
+        metrics = MetricsRegistry()
+        response = fake_response(payload={'data': {}}, headers={'X-RateLimit-Remaining': '42'})
+        responses = [aiohttp.ClientConnectionError(), response]
+
+        async def call():
+            async with self.get_api(retry_policy=RetryPolicy(backoff_factor=0), instrumentation=metrics) as abuse:
+                return await abuse.check(self.TEST_IP_ADDRESS)
+
+        with patch('aiohttp.ClientSession.request', side_effect=responses):
+            run(call())
+        assert metrics.requests.value('check', 'error') == 1
+        assert metrics.requests.value('check', '200') == 1
+        assert metrics.retries.value('check') == 1
+        assert metrics.quota_remaining.value('check') == 42
+
+    def test_bulk_report(self):
+        from abuseipdb.api_v2 import AbuseIpDbV2
+        bodies = []
+
+        async def get_response(endpoint, query, data=None, content_type=None):
+            body = b''
+            async for chunk in data:
+                body += chunk
+            bodies.append(body)
+            return {'savedReports': 1, 'invalidReports': [{'rowNumber': 1, 'error': 'Duplicate'}]}
+
+        async def call():
+            async with self.get_api() as abuse:
+                with patch.object(abuse, '_get_response', side_effect=get_response):
+                    reports = [('192.0.2.{}'.format(number), '22', None, '') for number in range(1, 4)]
+                    return await abuse.bulk_report(reports)
+
+        with patch.object(AbuseIpDbV2.BULK_REPORT, 'MAX_LINES', 3):
+            result = run(call())
+        assert [body.count(b'192.0.2.') for body in bodies] == [2, 1]
+        assert result['savedReports'] == 2
+        assert [report['rowNumber'] for report in result['invalidReports']] == [1, 3]
+        assert [(upload['firstRow'], upload['lastRow']) for upload in result['uploads']] == [(1, 2), (3, 3)]
+
+    @patch('aiohttp.ClientSession.request', return_value=fake_response(
+        payload={'data': {'savedReports': 1, 'invalidReports': []}}))
+    def test_bulk_report__body_is_streamed(self, mock):
+        self.call('bulk_report', [(self.TEST_IP_ADDRESS, '22', None, '')])
+        kwargs = mock.call_args[1]
+        assert kwargs['method'] == 'POST'
+        assert kwargs['url'] == 'https://api.abuseipdb.com/api/v2/bulk-report'
+        assert kwargs['headers']['Content-Type'].startswith('multipart/form-data; boundary=')
+        assert hasattr(kwargs['data'], '__aiter__')
+
+
+@skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncApiTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.123'
+    TEST_CIDR_NETWORK = '192.0.2.0/24'
+
+    def call(self, method, *args, **kwargs):
+        from abuseipdb.aio import AsyncAbuseIpDb
+
+        async def call():
+            async with AsyncAbuseIpDb('some_API_key') as abuse:
+                with patch.object(abuse.api, method, new_callable=MagicMock) as mock:
+                    future = asyncio.Future()
+                    future.set_result(None)
+                    mock.return_value = future
+                    await getattr(abuse, method)(*args, **kwargs)
+                return mock
+        return run(call())
+
+    def test_creating_api(self):
+        from abuseipdb.aio import AsyncAbuseIpDb, AsyncAbuseIpDbV2
+        abuse = AsyncAbuseIpDb('some_API_key')
+        assert type(abuse.api) == AsyncAbuseIpDbV2
+
+    def test_check__no_valid_ip_address_provided(self):
+        with self.assertRaises(ValueError):
+            self.call('check', ip_address='malformed.ip.address')
+
+    def test_check_block__no_valid_cidr_network_provided(self):
+        with self.assertRaises(ValueError):
+            self.call('check_block', cidr_network='malformed.cidr.network')
+
+    def test_report__no_valid_categories_provided(self):
+        with self.assertRaises(ValueError):
+            self.call('report', ip_address=self.TEST_IP_ADDRESS, categories='invalid')
+
+    def test_report__categories_are_normalized(self):
+        mock = self.call('report', self.TEST_IP_ADDRESS, ('HACKING', 'SSH'))
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, '15,22', '')
+
+    def test_check(self):
+        mock = self.call('check', self.TEST_IP_ADDRESS)
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, None)
+
+    def test_blacklist(self):
+        mock = self.call('blacklist')
+        mock.assert_called_once_with(None, None)
+
+    def test_check_is_cached(self):
+        from abuseipdb.aio import AsyncAbuseIpDb
+        from abuseipdb.cache import LookupCache
+
+        async def call():
+            async with AsyncAbuseIpDb('some_API_key', cache=LookupCache()) as abuse:
+                with patch.object(abuse.api, 'check', new_callable=MagicMock) as mock:
+                    future = asyncio.Future()
+                    future.set_result({'ipAddress': self.TEST_IP_ADDRESS})
+                    mock.return_value = future
+                    await abuse.check(self.TEST_IP_ADDRESS)
+                    result = await abuse.check(self.TEST_IP_ADDRESS)
+                return mock, result
+        mock, result = run(call())
+        assert result == {'ipAddress': self.TEST_IP_ADDRESS}
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, None)
+
+    def test_models(self):
+        from abuseipdb.aio import AsyncAbuseIpDb
+        from abuseipdb.models import CheckResult
+
+        async def call():
+            async with AsyncAbuseIpDb('some_API_key', models=True) as abuse:
+                with patch.object(abuse.api, 'check', new_callable=MagicMock) as mock:
+                    future = asyncio.Future()
+                    future.set_result({'ipAddress': self.TEST_IP_ADDRESS, 'abuseConfidenceScore': 10})
+                    mock.return_value = future
+                    return await abuse.check(self.TEST_IP_ADDRESS)
+        result = run(call())
+        assert isinstance(result, CheckResult)
+        assert str(result.ip_address) == self.TEST_IP_ADDRESS
+
+    def test_bulk_report__categories_are_normalized(self):
+        mock = self.call('bulk_report', [(self.TEST_IP_ADDRESS, 'SSH,HACKING', None, 'Some comment')])
+        reports = list(mock.call_args[0][0])
+        assert [report[:2] for report in reports] == [[self.TEST_IP_ADDRESS, '15,22']]
+
+    def test_synchronous_helpers_are_not_available(self):
+        from abuseipdb.aio import AsyncAbuseIpDb
+        abuse = AsyncAbuseIpDb('some_API_key')
+        with self.assertRaises(TypeError):
+            abuse.check_many([self.TEST_IP_ADDRESS])
+        with self.assertRaises(TypeError):
+            abuse.sweep_network('192.0.2.0/22')
+        with self.assertRaises(TypeError):
+            abuse.export_firewall()
+        with self.assertRaises(TypeError):
+            abuse.iter_blacklist()
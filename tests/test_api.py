@@ -1,3 +1,5 @@
+import os
+import tempfile
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -7,7 +9,7 @@ from abuseipdb import AbuseIpDb
 from abuseipdb.api_v2 import AbuseIpDbV2
 
 
-@patch('requests.request')
+@patch('requests.Session.request')
 class ApiParameterValidationTestCase(TestCase):
     # Testing the parameter validation independent from the used API version
 
@@ -203,7 +205,7 @@ class ApiReturnValueTestCase(TestCase):
         self.assert_response_contains(result, 'ipAddress', self.TEST_IP_ADDRESS)
 
 
-@patch('requests.request', side_effect=HTTPError)
+@patch('requests.Session.request', side_effect=HTTPError)
 class NetworkFailureTestCase(TestCase):
     # Actually we do not really test the invocation of
     # Response.raise_for_status, but we need to prevent any real network calls.
@@ -261,8 +263,28 @@ class GenericApiV2TestCase(TestCase):
     @patch('abuseipdb.api_v2.AbuseIpDbV2.bulk_report')
     def test_bulk_report(self, mock):
         abuse = self.get_api()
-        abuse.bulk_report('some_file.vsv')
-        mock.assert_called_once_with('some_file.vsv')
+        abuse.bulk_report([(self.TEST_IP_ADDRESS, 'ssh, hacking', '2020-01-31T12:00:00+00:00', 'Some comment')])
+        reports = list(mock.call_args[0][0])
+        assert reports == [[self.TEST_IP_ADDRESS, '15,22', '2020-01-31T12:00:00+00:00', 'Some comment']]
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.bulk_report')
+    def test_bulk_report__unknown_categories_are_passed_on(self, mock):
+        abuse = self.get_api()
+        abuse.bulk_report([(self.TEST_IP_ADDRESS, 'invalid', '2020-01-31T12:00:00+00:00')])
+        reports = list(mock.call_args[0][0])
+        assert reports == [[self.TEST_IP_ADDRESS, 'invalid', '2020-01-31T12:00:00+00:00', '']]
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.bulk_report')
+    def test_bulk_report__from_file(self, mock):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'report.csv')
+            with open(file_name, 'w') as report:
+                report.write('IP,Categories,ReportDate,Comment\n')
+                report.write('{},"18,SSH",2020-01-31T12:00:00+00:00,Some comment\n'.format(self.TEST_IP_ADDRESS))
+            abuse = self.get_api()
+            abuse.bulk_report(file_name)
+            reports = list(mock.call_args[0][0])
+        assert reports == [[self.TEST_IP_ADDRESS, '18,22', '2020-01-31T12:00:00+00:00', 'Some comment']]
 
     @patch('abuseipdb.api_v2.AbuseIpDbV2.check')
     def test_check(self, mock):
@@ -276,8 +298,76 @@ class GenericApiV2TestCase(TestCase):
         abuse.check_block(self.TEST_CIDR_NETWORK)
         mock.assert_called_once_with(self.TEST_CIDR_NETWORK, None)
 
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist')
+    def test_iter_blacklist(self, mock):
+        abuse = self.get_api()
+        abuse.iter_blacklist(plaintext=True)
+        mock.assert_called_once_with(None, None, True)
+
     @patch('abuseipdb.api_v2.AbuseIpDbV2.report')
     def test_report(self, mock):
         abuse = self.get_api()
         abuse.report(self.TEST_IP_ADDRESS, '22')
         mock.assert_called_once_with(self.TEST_IP_ADDRESS, '22', '')
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.close')
+    def test_close(self, mock):
+        abuse = self.get_api()
+        abuse.close()
+        mock.assert_called_once_with()
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.close')
+    def test_context_manager(self, mock):
+        with self.get_api() as abuse:
+            assert type(abuse) == AbuseIpDb
+        mock.assert_called_once_with()
+
+    def test_pool_parameters_are_passed_on(self):
+        abuse = AbuseIpDb('some_API_key', pool_maxsize=42)
+        assert abuse.api._pool_maxsize == 42
+
+
+class CheckManyTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESSES = ['192.0.2.1', '192.0.2.2', '192.0.2.3']
+
+    def get_api(self):
+        return AbuseIpDb('some_API_key')
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', side_effect=lambda ip, days: {'ipAddress': ip})
+    def test_all_addresses_are_checked(self, mock):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(self.TEST_IP_ADDRESSES))
+        assert result == {ip: {'ipAddress': ip} for ip in self.TEST_IP_ADDRESSES}
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check')
+    def test_max_age_in_days_is_passed_on(self, mock):
+        abuse = self.get_api()
+        list(abuse.check_many(self.TEST_IP_ADDRESSES[:1], max_age_in_days=90))
+        mock.assert_called_once_with(self.TEST_IP_ADDRESSES[0], 90)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check')
+    def test_duplicates_are_checked_once(self, mock):
+        abuse = self.get_api()
+        result = list(abuse.check_many(['2001:db8::1', '192.0.2.1', '2001:DB8:0::1', '192.0.2.1']))
+        assert [ip for ip, _ in sorted(result)] == ['192.0.2.1', '2001:db8::1']
+        assert mock.call_count == 2
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check')
+    def test_invalid_addresses_yield_an_error(self, mock):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(['malformed.ip.address', 'malformed.ip.address']))
+        assert isinstance(result['malformed.ip.address'], ValueError)
+        mock.assert_not_called()
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', side_effect=HTTPError)
+    def test_network_errors_are_yielded(self, mock):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(self.TEST_IP_ADDRESSES))
+        assert all(isinstance(error, HTTPError) for error in result.values())
+
+    def test_invalid_concurrency(self):
+        abuse = self.get_api()
+        with self.assertRaises(ValueError):
+            abuse.check_many(self.TEST_IP_ADDRESSES, concurrency=0)
@@ -1,10 +1,17 @@
+import json
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
+
+from requests import HTTPError
 
 from abuseipdb.api_v2 import AbuseIpDbV2
 
 
-@patch('requests.request')
+def json_response(payload, status_code=200):
+    return MagicMock(status_code=status_code, content=json.dumps(payload).encode('utf-8'))
+
+
+@patch('requests.Session.request', return_value=json_response({'data': {}}))
 class ApiV2TestCase(TestCase):
 
     # IP addresses from TEST-NET-1 according to RFC 5737
@@ -90,11 +97,6 @@ class ApiV2TestCase(TestCase):
             params={'limit': '1234567890'},
             url='https://api.abuseipdb.com/api/v2/blacklist')
 
-    def test_bulk_report_is_not_implemented_yet(self, mock):
-        abuse = self.get_api()
-        with self.assertRaises(NotImplementedError):
-            abuse.bulk_report('some_file.csv')
-
     def test_check(self, mock):
         abuse = self.get_api()
         abuse.check(ip_address=self.TEST_IP_ADDRESS)
@@ -148,3 +150,220 @@ class ApiV2TestCase(TestCase):
             headers={'Key': 'some_API_key', 'Accept': 'application/json'},
             params={'ip': self.TEST_IP_ADDRESS, 'categories': '22', 'comment': 'Some comment'},
             url='https://api.abuseipdb.com/api/v2/report')
+
+
+class ApiV2SessionTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.123'
+
+    def get_api(self, **kwargs):
+        kwargs['api_key'] = 'some_API_key'
+        return AbuseIpDbV2(**kwargs)
+
+    def test_session_is_created_lazily(self):
+        abuse = self.get_api()
+        assert abuse._session is None
+
+    @patch('requests.Session.request', return_value=json_response({'data': {}}))
+    def test_session_is_reused_between_requests(self, mock):
+        abuse = self.get_api()
+        abuse.check(self.TEST_IP_ADDRESS)
+        session = abuse._session
+        abuse.check(self.TEST_IP_ADDRESS)
+        assert abuse._session is session
+        assert mock.call_count == 2
+
+    def test_pool_is_configured(self):
+        abuse = self.get_api(pool_maxsize=32, pool_block=True)
+        adapter = abuse._get_session().get_adapter('https://api.abuseipdb.com/')
+        assert adapter._pool_maxsize == 32
+        assert adapter._pool_block is True
+
+    def test_pool_size_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            self.get_api(pool_maxsize=0)
+
+    def test_gzip_is_negotiated_by_default(self):
+        abuse = self.get_api()
+        assert abuse._get_session().headers['Accept-Encoding'] == 'gzip, deflate'
+
+    def test_gzip_can_be_disabled(self):
+        abuse = self.get_api(gzip=False)
+        assert abuse._get_session().headers['Accept-Encoding'] == 'identity'
+
+    def test_keep_alive_can_be_disabled(self):
+        abuse = self.get_api(keep_alive=False)
+        assert abuse._get_session().headers['Connection'] == 'close'
+
+    @patch('requests.Session.request', return_value=json_response({'data': {}}))
+    def test_base_url_can_be_changed(self, mock):
+        abuse = self.get_api(base_url='http://127.0.0.1:8080/api/v2/{endpoint}')
+        abuse.check(self.TEST_IP_ADDRESS)
+        assert mock.call_args[1]['url'] == 'http://127.0.0.1:8080/api/v2/check'
+
+    @patch('requests.Session.close')
+    def test_close_releases_the_session(self, mock):
+        abuse = self.get_api()
+        abuse._get_session()
+        abuse.close()
+        mock.assert_called_once_with()
+        assert abuse._session is None
+
+    def test_close_without_session(self):
+        abuse = self.get_api()
+        abuse.close()
+        assert abuse._session is None
+
+    @patch('requests.Session.close')
+    def test_context_manager_closes_the_session(self, mock):
+        with self.get_api() as abuse:
+            abuse._get_session()
+        mock.assert_called_once_with()
+
+
+class ApiV2StreamingTestCase(TestCase):
+
+    def get_api(self, **kwargs):
+        kwargs['api_key'] = 'some_API_key'
+        return AbuseIpDbV2(**kwargs)
+
+    def fake_response(self, status_code=200, body=b''):
+        response = MagicMock(status_code=status_code)
+        response.iter_content.return_value = [body[:10], body[10:]]
+        response.iter_lines.return_value = body.decode('utf-8').splitlines()
+        if status_code >= 400:
+            response.raise_for_status.side_effect = HTTPError(response=response)
+        return response
+
+    @patch('requests.Session.request')
+    def test_iter_blacklist(self, mock):
+        mock.return_value = self.fake_response(
+            body=b'{"meta": {}, "data": [{"ipAddress": "192.0.2.123"}, {"ipAddress": "2001:db8::1"}]}')
+        abuse = self.get_api()
+        result = list(abuse.iter_blacklist(limit=2))
+        assert result == [{'ipAddress': '192.0.2.123'}, {'ipAddress': '2001:db8::1'}]
+        mock.assert_called_once_with(
+            method='GET',
+            headers={'Key': 'some_API_key', 'Accept': 'application/json'},
+            params={'limit': '2'}, stream=True,
+            url='https://api.abuseipdb.com/api/v2/blacklist')
+        mock.return_value.close.assert_called_once_with()
+
+    @patch('requests.Session.request')
+    def test_iter_blacklist__plaintext(self, mock):
+        mock.return_value = self.fake_response(body=b'192.0.2.123\n\n2001:db8::1\n')
+        abuse = self.get_api()
+        result = list(abuse.iter_blacklist(plaintext=True))
+        assert result == ['192.0.2.123', '2001:db8::1']
+        mock.assert_called_once_with(
+            method='GET',
+            headers={'Key': 'some_API_key', 'Accept': 'text/plain'},
+            params={'plaintext': ''}, stream=True,
+            url='https://api.abuseipdb.com/api/v2/blacklist')
+
+    @patch('requests.Session.request')
+    def test_iter_blacklist__errors_are_raised(self, mock):
+        mock.return_value = self.fake_response(status_code=429, body=b'{"errors": []}')
+        abuse = self.get_api()
+        with self.assertRaises(HTTPError):
+            abuse.iter_blacklist()
+        mock.return_value.close.assert_called_once_with()
+
+    @patch('requests.Session.request')
+    def test_iter_blacklist__parameters_are_validated(self, mock):
+        abuse = self.get_api()
+        with self.assertRaises(ValueError):
+            abuse.iter_blacklist(limit=0)
+        mock.assert_not_called()
+
+
+class ApiV2BulkReportTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.{}'
+    REPORT_DATE = '2020-01-31T12:00:00+00:00'
+
+    def get_api(self, max_lines=10000, max_bytes=2 * 1024 * 1024):
+        abuse = AbuseIpDbV2(api_key='some_API_key')
+        abuse.BULK_REPORT = type('BULK_REPORT', (object,), {'MAX_LINES': max_lines, 'MAX_BYTES': max_bytes})
+        return abuse
+
+    def get_reports(self, count):
+        return [(self.TEST_IP_ADDRESS.format(number), '18,22', self.REPORT_DATE, 'Some comment')
+                for number in range(1, count + 1)]
+
+    def upload(self, abuse, reports, responses=None):
+        uploads = []
+        responses = list(responses or [])
+
+        def request(**kwargs):
+            # Consume the streamed body like requests does
+            uploads.append((kwargs, b''.join(kwargs.pop('data'))))
+            data = responses.pop(0) if responses else {'savedReports': 0, 'invalidReports': []}
+            return json_response({'data': data})
+
+        with patch('requests.Session.request', side_effect=request):
+            result = abuse.bulk_report(reports)
+        return result, uploads
+
+    def test_single_upload(self):
+        result, uploads = self.upload(self.get_api(), self.get_reports(2), [{'savedReports': 2, 'invalidReports': []}])
+        assert len(uploads) == 1
+        kwargs, body = uploads[0]
+        assert kwargs['method'] == 'POST'
+        assert kwargs['url'] == 'https://api.abuseipdb.com/api/v2/bulk-report'
+        assert kwargs['params'] == {}
+        content_type = kwargs['headers']['Content-Type']
+        assert content_type.startswith('multipart/form-data; boundary=')
+        boundary = content_type.split('=', 1)[1].encode('ascii')
+        assert body.startswith(b'--' + boundary + b'\r\n')
+        assert body.endswith(b'\r\n--' + boundary + b'--\r\n')
+        assert b'name="csv"' in body
+        assert (b'IP,Categories,ReportDate,Comment\r\n'
+                b'192.0.2.1,"18,22",2020-01-31T12:00:00+00:00,Some comment\r\n'
+                b'192.0.2.2,"18,22",2020-01-31T12:00:00+00:00,Some comment\r\n') in body
+        assert result['savedReports'] == 2
+        assert result['uploads'] == [{'firstRow': 1, 'lastRow': 2, 'result': {'savedReports': 2, 'invalidReports': []}}]
+
+    def test_split_at_line_limit(self):
+        responses = [
+            {'savedReports': 2, 'invalidReports': [{'error': 'Duplicate IP', 'input': '192.0.2.1', 'rowNumber': 1}]},
+            {'savedReports': 2, 'invalidReports': [{'error': 'Duplicate IP', 'input': '192.0.2.4', 'rowNumber': 1}]},
+            {'savedReports': 1, 'invalidReports': []},
+        ]
+        result, uploads = self.upload(self.get_api(max_lines=4), self.get_reports(7), responses)
+        assert [body.count(b'\r\n192.0.2.') for _, body in uploads] == [3, 3, 1]
+        assert result['savedReports'] == 5
+        assert result['invalidReports'] == [
+            {'error': 'Duplicate IP', 'input': '192.0.2.1', 'rowNumber': 1},
+            {'error': 'Duplicate IP', 'input': '192.0.2.4', 'rowNumber': 4},
+        ]
+        assert [(upload['firstRow'], upload['lastRow']) for upload in result['uploads']] == [(1, 3), (4, 6), (7, 7)]
+
+    def test_split_at_size_limit(self):
+        result, uploads = self.upload(self.get_api(max_bytes=210), self.get_reports(5))
+        assert [body.count(b'\r\n192.0.2.') for _, body in uploads] == [3, 2]
+
+    def test_errors_of_an_upload_are_kept(self):
+        def request(**kwargs):
+            b''.join(kwargs['data'])
+            return json_response({'errors': [{'status': 429}]}, status_code=429)
+
+        with patch('requests.Session.request', side_effect=request):
+            result = self.get_api(max_lines=2).bulk_report(self.get_reports(2))
+        assert result['savedReports'] == 0
+        assert result['uploads'] == [
+            {'firstRow': 1, 'lastRow': 1, 'result': [{'status': 429}]},
+            {'firstRow': 2, 'lastRow': 2, 'result': [{'status': 429}]},
+        ]
+
+    def test_no_reports(self):
+        result, uploads = self.upload(self.get_api(), [])
+        assert uploads == []
+        assert result == {'savedReports': 0, 'invalidReports': [], 'uploads': []}
+
+    @patch('requests.Session.request', return_value=json_response({'data': {}}))
+    def test_body_not_sent(self, mock):
+        result = self.get_api().bulk_report(self.get_reports(2))
+        assert len(result['uploads']) == 1
@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+from abuseipdb.blacklist import (BlacklistIndex, BlacklistMatch, address_key,
+                                 entry_key, parse_timestamp)
+from abuseipdb.models import BlacklistEntry
+
+# IP addresses from the documentation ranges according to RFC 5737 and RFC 3849
+BLACKLIST = [
+    {'ipAddress': '198.51.100.7', 'abuseConfidenceScore': 100, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.123', 'abuseConfidenceScore': 90, 'lastReportedAt': '2020-01-31T12:00:00+01:00'},
+    {'ipAddress': '2001:db8::1', 'abuseConfidenceScore': 75, 'lastReportedAt': '2020-01-31T11:00:00+00:00'},
+    {'ipAddress': '203.0.113.5', 'abuseConfidenceScore': 100, 'lastReportedAt': None},
+]
+
+
+class ParseTimestampTestCase(TestCase):
+
+    def test_utc(self):
+        assert parse_timestamp('2020-01-31T12:00:00+00:00') == 1580472000
+
+    def test_positive_offset(self):
+        assert parse_timestamp('2020-01-31T13:00:00+01:00') == 1580472000
+
+    def test_negative_offset(self):
+        assert parse_timestamp('2020-01-31T07:30:00-04:30') == 1580472000
+
+    def test_fraction_and_zulu(self):
+        assert parse_timestamp('2020-01-31T12:00:00.123456Z') == 1580472000
+
+    def test_without_offset(self):
+        assert parse_timestamp('2020-01-31T12:00:00') == 1580472000
+
+    def test_empty(self):
+        assert parse_timestamp(None) is None
+        assert parse_timestamp('') is None
+
+
+class AddressKeyTestCase(TestCase):
+
+    def test_ipv4(self):
+        assert address_key('192.0.2.1') == (4, 0xc0000201)
+
+    def test_ipv6(self):
+        assert address_key('2001:db8::1') == (6, 0x20010db8000000000000000000000001)
+
+    def test_integer(self):
+        assert address_key(0xc0000201) == (4, 0xc0000201)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            address_key('malformed.ip.address')
+
+
+class EntryKeyTestCase(TestCase):
+
+    def test_entries(self):
+        expected = (4, 0xc000027b)
+        assert entry_key('192.0.2.123') == expected
+        assert entry_key({'ipAddress': '192.0.2.123'}) == expected
+        assert entry_key(BlacklistEntry.from_dict({'ipAddress': '192.0.2.123'})) == expected
+        assert entry_key(0xc000027b) == expected
+
+
+class BlacklistIndexTestCase(TestCase):
+
+    def get_index(self):
+        return BlacklistIndex(BLACKLIST)
+
+    def test_length(self):
+        assert len(self.get_index()) == 4
+
+    def test_contains(self):
+        index = self.get_index()
+        assert index.contains('192.0.2.123')
+        assert index.contains('2001:DB8:0::1')
+        assert not index.contains('192.0.2.124')
+        assert not index.contains('2001:db8::2')
+        assert '198.51.100.7' in index
+
+    def test_contains_many(self):
+        index = self.get_index()
+        result = index.contains_many(['192.0.2.123', '192.0.2.1', '2001:db8::1', '255.255.255.255', '::'])
+        assert result == [True, False, True, False, False]
+
+    def test_lookup(self):
+        index = self.get_index()
+        assert index.lookup('198.51.100.7') == BlacklistMatch(100, 1580472000)
+        assert index.lookup('192.0.2.123') == BlacklistMatch(90, 1580468400)
+        assert index.lookup('2001:db8::1') == (75, 1580468400)
+
+    def test_lookup_without_timestamp(self):
+        assert self.get_index().lookup('203.0.113.5') == (100, 0)
+
+    def test_lookup_unknown_address(self):
+        assert self.get_index().lookup('192.0.2.1') is None
+
+    def test_duplicates_are_merged(self):
+        index = BlacklistIndex(BLACKLIST + [{'ipAddress': '192.0.2.123', 'abuseConfidenceScore': 95}])
+        assert len(index) == 4
+        assert index.lookup('192.0.2.123').score == 95
+
+    def test_invalid_address(self):
+        with self.assertRaises(ValueError):
+            self.get_index().contains('malformed.ip.address')
+
+    def test_empty(self):
+        index = BlacklistIndex([])
+        assert len(index) == 0
+        assert not index.contains('192.0.2.123')
+
+    def test_records_are_sorted(self):
+        records = list(self.get_index().records())
+        assert [record[:2] for record in records] == [
+            (4, 0xc000027b), (4, 0xc6336407), (4, 0xcb007105), (6, 0x20010db8000000000000000000000001)]
+        assert records[0][2:] == (90, 1580468400)
+
+    def test_models(self):
+        index = BlacklistIndex(BlacklistEntry.from_dict(entry) for entry in BLACKLIST)
+        assert list(index.records()) == list(self.get_index().records())
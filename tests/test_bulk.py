@@ -0,0 +1,59 @@
+import datetime
+import os
+import tempfile
+from unittest import TestCase
+
+from abuseipdb.bulk import BulkReportChunker, normalize_report, read_reports
+
+
+class NormalizeReportTestCase(TestCase):
+
+    def test_tuple(self):
+        report = normalize_report(('192.0.2.1', '18,22', '2020-01-31T12:00:00+00:00', 'Some comment'))
+        assert report == ('192.0.2.1', '18,22', '2020-01-31T12:00:00+00:00', 'Some comment')
+
+    def test_dictionary(self):
+        report = normalize_report({'ip_address': '192.0.2.1', 'categories': [18, 22], 'comment': 'Some comment',
+                                   'report_date': datetime.datetime(2020, 1, 31, 12, tzinfo=datetime.timezone.utc)})
+        assert report == ('192.0.2.1', '18,22', '2020-01-31T12:00:00+00:00', 'Some comment')
+
+    def test_report_date_defaults_to_now(self):
+        report = normalize_report(('192.0.2.1', 22))
+        assert report[1:2] == ('22',)
+        assert report[2].endswith('+00:00')
+        assert report[3] == ''
+
+
+class ReadReportsTestCase(TestCase):
+
+    def test_header_and_empty_lines_are_skipped(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'report.csv')
+            with open(file_name, 'w') as report:
+                report.write('IP,Categories,ReportDate,Comment\n\n')
+                report.write('192.0.2.1,"18,22",2020-01-31T12:00:00+00:00,"Multi\nline"\n')
+            assert list(read_reports(file_name)) == [
+                ['192.0.2.1', '18,22', '2020-01-31T12:00:00+00:00', 'Multi\nline']]
+
+
+class BulkReportChunkerTestCase(TestCase):
+
+    def test_single_report_above_size_limit_is_sent(self):
+        chunker = BulkReportChunker([('192.0.2.1', '22', '2020-01-31T12:00:00+00:00', 'x' * 100)], 10, 50)
+        assert chunker.has_reports()
+        body = b''.join(chunker.body())
+        assert b'x' * 100 in body
+        assert not chunker.has_reports()
+
+    def test_reports_are_consumed_lazily(self):
+        consumed = []
+
+        def reports():
+            for number in range(100):
+                consumed.append(number)
+                yield ('192.0.2.{}'.format(number), '22', '2020-01-31T12:00:00+00:00', '')
+
+        chunker = BulkReportChunker(reports(), 3, 1024)
+        b''.join(chunker.body())
+        assert len(consumed) == 2
+        assert chunker.rows_sent == 2
@@ -0,0 +1,188 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from helpers import FakeClock
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.cache import LookupCache, SqliteLookupCache
+
+
+class LookupCacheTestCase(TestCase):
+
+    def get_cache(self, **kwargs):
+        self.clock = FakeClock(1000.0)
+        return LookupCache(clock=self.clock, **kwargs)
+
+    def test_miss(self):
+        cache = self.get_cache()
+        assert cache.get('key') is None
+        assert cache.stats() == {'entries': 0, 'evictions': 0, 'hits': 0, 'misses': 1}
+
+    def test_hit(self):
+        cache = self.get_cache()
+        cache.set('key', {'some': 'value'})
+        assert cache.get('key') == {'some': 'value'}
+        assert cache.stats() == {'entries': 1, 'evictions': 0, 'hits': 1, 'misses': 0}
+
+    def test_entries_expire(self):
+        cache = self.get_cache(ttl=10)
+        cache.set('key', {'some': 'value'})
+        self.clock.now += 10
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = self.get_cache(maxsize=2)
+        cache.set('first', 1)
+        cache.set('second', 2)
+        cache.get('first')
+        cache.set('third', 3)
+        assert cache.get('second') is None
+        assert cache.get('first') == 1
+        assert cache.get('third') == 3
+        assert cache.evictions == 1
+
+    def test_clear(self):
+        cache = self.get_cache()
+        cache.set('key', 1)
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            LookupCache(maxsize=0)
+
+    def test_invalid_ttl(self):
+        with self.assertRaises(ValueError):
+            LookupCache(ttl=0)
+
+
+class CachedApiTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.123'
+    TEST_CIDR_NETWORK = '192.0.2.0/24'
+
+    def get_api(self):
+        return AbuseIpDb('some_API_key', cache=LookupCache())
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value={'ipAddress': '192.0.2.123'})
+    def test_check_is_cached(self, mock):
+        abuse = self.get_api()
+        abuse.check(self.TEST_IP_ADDRESS)
+        result = abuse.check(self.TEST_IP_ADDRESS, max_age_in_days=30)
+        assert result == {'ipAddress': self.TEST_IP_ADDRESS}
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, None)
+        assert abuse.cache.hits == 1
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value={'ipAddress': '2001:db8::1'})
+    def test_check_key_is_normalized(self, mock):
+        abuse = self.get_api()
+        abuse.check('2001:DB8::1')
+        abuse.check('2001:db8:0::1')
+        assert mock.call_count == 1
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value={})
+    def test_check_with_different_max_age_is_not_shared(self, mock):
+        abuse = self.get_api()
+        abuse.check(self.TEST_IP_ADDRESS, max_age_in_days=30)
+        abuse.check(self.TEST_IP_ADDRESS, max_age_in_days=90)
+        assert mock.call_count == 2
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value=[{'status': 429}])
+    def test_errors_are_not_cached(self, mock):
+        abuse = self.get_api()
+        abuse.check(self.TEST_IP_ADDRESS)
+        abuse.check(self.TEST_IP_ADDRESS)
+        assert mock.call_count == 2
+        assert len(abuse.cache) == 0
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value={'networkAddress': '192.0.2.0'})
+    def test_check_block_is_cached(self, mock):
+        abuse = self.get_api()
+        abuse.check_block(self.TEST_CIDR_NETWORK)
+        abuse.check_block(self.TEST_CIDR_NETWORK)
+        mock.assert_called_once_with(self.TEST_CIDR_NETWORK, None)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value={})
+    def test_without_cache(self, mock):
+        abuse = AbuseIpDb('some_API_key')
+        abuse.check(self.TEST_IP_ADDRESS)
+        abuse.check(self.TEST_IP_ADDRESS)
+        assert mock.call_count == 2
+
+
+class SqliteLookupCacheTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, 'cache.sqlite')
+        self.clock = FakeClock(1000.0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def get_cache(self, **kwargs):
+        cache = SqliteLookupCache(self.file_name, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_miss(self):
+        cache = self.get_cache()
+        assert cache.get(('check', '192.0.2.123', 30)) is None
+        assert cache.stats() == {'entries': 0, 'evictions': 0, 'hits': 0, 'misses': 1}
+
+    def test_hit(self):
+        cache = self.get_cache()
+        cache.set(('check', '192.0.2.123', 30), {'some': 'value'})
+        assert cache.get(('check', '192.0.2.123', 30)) == {'some': 'value'}
+        assert cache.hits == 1
+
+    def test_entries_are_shared_between_instances(self):
+        self.get_cache().set(('check', '192.0.2.123', 30), {'some': 'value'})
+        assert self.get_cache().get(('check', '192.0.2.123', 30)) == {'some': 'value'}
+
+    def test_entries_expire(self):
+        cache = self.get_cache(ttl=10)
+        cache.set('key', {'some': 'value'})
+        self.clock.now += 10
+        assert cache.get('key') is None
+
+    def test_expired_entries_are_removed(self):
+        cache = self.get_cache(ttl=10)
+        cache.set('first', 1)
+        self.clock.now += 10
+        cache.set('second', 2)
+        assert len(cache) == 1
+
+    def test_size_is_bounded(self):
+        cache = self.get_cache(maxsize=2)
+        for value in range(3):
+            cache.set(str(value), value)
+            self.clock.now += 1
+        assert len(cache) == 2
+        assert cache.get('0') is None
+        assert cache.evictions == 1
+
+    def test_clear(self):
+        cache = self.get_cache()
+        cache.set('key', 1)
+        cache.clear()
+        assert len(cache) == 0
+
+    def test_invalid_maxsize(self):
+        with self.assertRaises(ValueError):
+            SqliteLookupCache(self.file_name, maxsize=0)
+
+    def test_invalid_ttl(self):
+        with self.assertRaises(ValueError):
+            SqliteLookupCache(self.file_name, ttl=0)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value={'ipAddress': '192.0.2.123'})
+    def test_check_is_cached(self, mock):
+        AbuseIpDb('some_API_key', cache=self.get_cache()).check('192.0.2.123')
+        result = AbuseIpDb('some_API_key', cache=self.get_cache()).check('192.0.2.123')
+        assert result == {'ipAddress': '192.0.2.123'}
+        mock.assert_called_once_with('192.0.2.123', None)
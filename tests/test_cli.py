@@ -1,7 +1,14 @@
+import io
+import json
+import os
+import socket
+import tempfile
 from argparse import Namespace
 from unittest import TestCase
 from unittest.mock import patch
 
+from abuseipdb.cache import SqliteLookupCache
+from abuseipdb.cli import _create_api
 from abuseipdb.cli import main as abuseipdb_cli
 
 
@@ -20,7 +27,13 @@ class CommandLineTestHelper(object):
         """
         defaults = dict(
             api_version=2,
+            cache_file=None,
+            cache_ttl=3600,
             config_file="/etc/abiseipdb",
+            compact=False,
+            daemon_socket='',
+            dedup_file=None,
+            dedup_window=None,
         )
         defaults.update(**kwargs)
         with patch('pwd.getpwall', return_value=[(username,)]):
@@ -63,12 +76,14 @@ class CommandLineTestCase(CommandLineTestHelper, TestCase):
     def test_bulk_report__without_any_optional_parameter(self, api_key_mock):
         mock = self.call_command(
             action='bulk_report', report_file='report.csv')
-        mock.assert_called_once_with(file_name='report.csv')
+        mock.assert_called_once_with(reports='report.csv')
 
     def test_categories(self, api_key_mock):
         defaults = dict(
             action='list_categories',
             api_version=2,
+            cache_file=None,
+            cache_ttl=3600,
             config_file="/etc/abiseipdb",
         )
         with patch('abuseipdb.cli._parse_parameter', return_value=Namespace(**defaults)):
@@ -132,6 +147,173 @@ class CommandLineTestCase(CommandLineTestHelper, TestCase):
         mock.assert_called_once_with(ip_address=self.TEST_IP_ADDRESS, categories='15,SSH', comment=long_comm + '\n...')
 
 
+@patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+class CommandLineCacheTestCase(TestCase):
+
+    def test_without_cache_file(self, api_key_mock):
+        api = _create_api(Namespace(api_version=2, config_file="/etc/abiseipdb", cache_file=None, cache_ttl=3600))
+        assert api.cache is None
+
+    def test_with_cache_file(self, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_file = os.path.join(directory, 'cache.sqlite')
+            api = _create_api(Namespace(api_version=2, config_file="/etc/abiseipdb", cache_file=cache_file, cache_ttl=60))
+            assert type(api.cache) == SqliteLookupCache
+            assert api.cache.file_name == cache_file
+            assert api.cache.ttl == 60
+
+
+@patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+class CommandLineDaemonTestCase(CommandLineTestHelper, TestCase):
+
+    @patch('abuseipdb.daemon.submit_report', return_value={'queued': True})
+    def test_report_is_handed_over_to_daemon(self, submit_mock, api_key_mock):
+        mock = self.call_command(
+            action='report', ip_address=self.TEST_IP_ADDRESS, categories=[15, 'SSH'], comment=['a', 'comment'],
+            daemon_socket='/run/abuseipdb.sock')
+        mock.assert_not_called()
+        submit_mock.assert_called_once_with(
+            '/run/abuseipdb.sock', ip_address=self.TEST_IP_ADDRESS, categories='15,SSH', comment='a comment')
+
+    @patch('abuseipdb.daemon.submit_report', side_effect=FileNotFoundError)
+    def test_report_without_daemon(self, submit_mock, api_key_mock):
+        mock = self.call_command(
+            action='report', ip_address=self.TEST_IP_ADDRESS, categories=[15, 'SSH'],
+            daemon_socket='/run/abuseipdb.sock')
+        mock.assert_called_once_with(ip_address=self.TEST_IP_ADDRESS, categories='15,SSH')
+
+    @patch('abuseipdb.daemon.submit_report', side_effect=socket.timeout)
+    def test_report_is_not_sent_twice_after_timeout(self, submit_mock, api_key_mock):
+        # The daemon may have queued the report before the timeout
+        with self.assertRaises(socket.timeout):
+            self.call_command(
+                action='report', ip_address=self.TEST_IP_ADDRESS, categories=[15],
+                daemon_socket='/run/abuseipdb.sock')
+        submit_mock.assert_called_once_with('/run/abuseipdb.sock', ip_address=self.TEST_IP_ADDRESS, categories='15')
+
+    @patch('abuseipdb.daemon.submit_report', return_value={'queued': True})
+    def test_deduplicated_report_is_handed_over(self, submit_mock, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            dedup_file = os.path.join(directory, 'dedup.sqlite')
+            for comment in ('first', 'second'):
+                mock = self.call_command(
+                    action='report', ip_address=self.TEST_IP_ADDRESS, categories=['SSH'], comment=[comment],
+                    daemon_socket='/run/abuseipdb.sock', dedup_file=dedup_file)
+                mock.assert_not_called()
+        submit_mock.assert_called_once_with(
+            '/run/abuseipdb.sock', ip_address=self.TEST_IP_ADDRESS, categories='22', comment='first')
+
+    @patch('abuseipdb.daemon.submit_report', return_value={'error': 'Unknown categories "invalid"'})
+    def test_report_refused_by_daemon(self, submit_mock, api_key_mock):
+        with self.assertRaises(ValueError):
+            self.call_command(
+                action='report', ip_address=self.TEST_IP_ADDRESS, categories=['invalid'],
+                daemon_socket='/run/abuseipdb.sock')
+
+    @patch('abuseipdb.daemon.submit_report', return_value={'queued': True})
+    def test_report_is_handed_over_to_default_socket(self, submit_mock, api_key_mock):
+        self.call_command(
+            action='report', ip_address=self.TEST_IP_ADDRESS, categories=[15], daemon_socket=None)
+        submit_mock.assert_called_once_with(
+            '/run/abuseipdb.sock', ip_address=self.TEST_IP_ADDRESS, categories='15')
+
+    @patch('abuseipdb.daemon.submit_report')
+    def test_check_is_not_handed_over(self, submit_mock, api_key_mock):
+        self.call_command(action='check', ip_address=self.TEST_IP_ADDRESS, daemon_socket='/run/abuseipdb.sock')
+        submit_mock.assert_not_called()
+
+    @patch('abuseipdb.daemon.ReportDaemon.serve_forever', side_effect=KeyboardInterrupt)
+    def test_serve(self, serve_mock, api_key_mock):
+        args = Namespace(action='serve', api_version=2, cache_file=None, cache_ttl=3600,
+                         config_file="/etc/abiseipdb", daemon_socket='/run/abuseipdb.sock',
+                         flush_interval=30, max_batch=100, max_queue=1000)
+        with patch('abuseipdb.cli._parse_parameter', return_value=args):
+            with patch('signal.signal'):
+                abuseipdb_cli()
+        serve_mock.assert_called_once_with()
+
+
+@patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+class CommandLineDedupTestCase(CommandLineTestHelper, TestCase):
+
+    def test_repeated_report_is_held(self, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            dedup_file = os.path.join(directory, 'dedup.sqlite')
+            for comment in ('first', 'second'):
+                mock = self.call_command(
+                    action='report', ip_address=self.TEST_IP_ADDRESS, categories=['SSH'], comment=[comment],
+                    dedup_file=dedup_file)
+                if comment == 'first':
+                    mock.assert_called_once_with(self.TEST_IP_ADDRESS, '22', 'first')
+                else:
+                    mock.assert_not_called()
+
+
+@patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+class CommandLineBatchTestCase(TestCase):
+
+    def run_batch(self, action, lines, **kwargs):
+        args = dict(
+            action=action, api_version=2, cache_file=None, cache_ttl=3600, config_file="/etc/abiseipdb",
+            from_file='-', mask_sensitive_data=False, max_age_in_days=None, workers=2)
+        args.update(kwargs)
+        stdout = io.StringIO()
+        with patch('abuseipdb.cli._parse_parameter', return_value=Namespace(**args)):
+            with patch('sys.stdin', io.StringIO(''.join(line + '\n' for line in lines))):
+                with patch('sys.stdout', stdout):
+                    abuseipdb_cli()
+        return sorted((json.loads(line) for line in stdout.getvalue().splitlines()), key=lambda line: line['ipAddress'])
+
+    @patch('abuseipdb.AbuseIpDb.check', side_effect=lambda ip_address, max_age_in_days: {'score': ip_address[-1]})
+    def test_check(self, check_mock, api_key_mock):
+        output = self.run_batch('check', ['192.0.2.1', '', '# comment', '192.0.2.2 ignored', '192.0.2.1'])
+        assert output == [
+            {'ipAddress': '192.0.2.1', 'result': {'score': '1'}},
+            {'ipAddress': '192.0.2.2', 'result': {'score': '2'}},
+        ]
+        assert check_mock.call_count == 2
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value=[{'status': 429}])
+    def test_check__errors(self, check_mock, api_key_mock):
+        output = self.run_batch('check', ['192.0.2.1', 'no address'])
+        assert output == [
+            {'ipAddress': '192.0.2.1', 'errors': [{'status': 429}]},
+            {'ipAddress': 'no', 'error': "'no' does not appear to be an IPv4 or IPv6 address"},
+        ]
+
+    def test_check__from_file(self, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'ips.txt')
+            with open(file_name, 'w') as ips:
+                ips.write('192.0.2.1\n192.0.2.2\n')
+            with patch('abuseipdb.AbuseIpDb.check', return_value={}) as check_mock:
+                output = self.run_batch('check', [], from_file=file_name, max_age_in_days=7)
+        assert [line['ipAddress'] for line in output] == ['192.0.2.1', '192.0.2.2']
+        check_mock.assert_any_call('192.0.2.1', 7)
+
+    @patch('abuseipdb.AbuseIpDb.report', return_value={'abuseConfidenceScore': 100})
+    def test_report(self, report_mock, api_key_mock):
+        output = self.run_batch('report', ['192.0.2.1 Failed  password', '192.0.2.2'], categories=[15, 'SSH'])
+        assert output == [
+            {'ipAddress': '192.0.2.1', 'result': {'abuseConfidenceScore': 100}},
+            {'ipAddress': '192.0.2.2', 'result': {'abuseConfidenceScore': 100}},
+        ]
+        report_mock.assert_any_call('192.0.2.1', '15,SSH', 'Failed password')
+        report_mock.assert_any_call('192.0.2.2', '15,SSH', '')
+
+    @patch('abuseipdb.AbuseIpDb.report', return_value={})
+    def test_report__tab_separated(self, report_mock, api_key_mock):
+        output = self.run_batch('report', ['192.0.2.1\tFailed password'], categories=[22])
+        assert output == [{'ipAddress': '192.0.2.1', 'result': {}}]
+        report_mock.assert_called_once_with('192.0.2.1', '22', 'Failed password')
+
+    @patch('abuseipdb.AbuseIpDb.report', return_value={})
+    def test_report__with_sensitive_comment(self, report_mock, api_key_mock):
+        with patch('pwd.getpwall', return_value=[('username',)]):
+            self.run_batch('report', ['192.0.2.1 login of username'], categories=[22], mask_sensitive_data=True)
+        report_mock.assert_called_once_with('192.0.2.1', '22', 'login of *user*')
+
+
 @patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
 class CommandLineRegressionTestCase(CommandLineTestHelper, TestCase):
 
@@ -0,0 +1,68 @@
+import json
+from unittest import TestCase, skipIf
+from unittest.mock import patch
+
+from abuseipdb import codec
+from abuseipdb.codec import StdlibCodec, get_codec
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PAYLOAD = {'data': [{'ipAddress': '192.0.2.1', 'abuseConfidenceScore': 100, 'countryCode': None}]}
+
+
+class StdlibCodecTestCase(TestCase):
+
+    def get_codec(self):
+        return get_codec('json')
+
+    def test_loads_bytes(self):
+        assert self.get_codec().loads(json.dumps(PAYLOAD).encode('utf-8')) == PAYLOAD
+
+    def test_loads_utf8(self):
+        payload = {'data': [{'countryName': 'Côte d’Ivoire'}]}
+        assert self.get_codec().loads(json.dumps(payload, ensure_ascii=False).encode('utf-8')) == payload
+
+    def test_loads_text(self):
+        assert self.get_codec().loads(json.dumps(PAYLOAD)) == PAYLOAD
+
+    def test_dumps_is_compact(self):
+        text = self.get_codec().dumps({'b': 1, 'a': [1, 2]}, sort_keys=True)
+        assert text == '{"a":[1,2],"b":1}'
+
+    def test_dumps_indented(self):
+        text = self.get_codec().dumps(PAYLOAD, indent=4, sort_keys=True)
+        assert text == json.dumps(PAYLOAD, indent=4, sort_keys=True)
+
+
+@skipIf(orjson is None, 'orjson is not installed')
+class OrjsonCodecTestCase(StdlibCodecTestCase):
+
+    def get_codec(self):
+        return get_codec('orjson')
+
+
+class Python35TestCase(TestCase):
+
+    @patch('json.loads', side_effect=lambda data: json.JSONDecoder().decode(data))
+    def test_stdlib_passes_text(self, mock):
+        # json.loads of Python 3.5 raises TypeError for bytes
+        assert get_codec('json').loads(b'{"data": 1}') == {'data': 1}
+        assert isinstance(mock.call_args[0][0], str)
+
+
+class GetCodecTestCase(TestCase):
+
+    def test_fastest_codec_by_default(self):
+        assert codec.backend == ('json' if orjson is None else 'orjson')
+
+    def test_fallback_to_stdlib(self):
+        with patch.dict('sys.modules', {'orjson': None}):
+            assert isinstance(get_codec(), StdlibCodec)
+            assert get_codec().name == 'json'
+
+    def test_unknown_codec(self):
+        with self.assertRaises(KeyError):
+            get_codec('simplejson')
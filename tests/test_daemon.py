@@ -0,0 +1,201 @@
+import os
+import stat
+import tempfile
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.api_v2 import AbuseIpDbV2
+from abuseipdb.daemon import MAX_BACKOFF, ReportDaemon, submit_report
+
+# IP addresses from TEST-NET-1 according to RFC 5737
+TEST_IP_ADDRESS = '192.0.2.123'
+BULK_RESULT = {'savedReports': 1, 'invalidReports': [], 'uploads': []}
+
+
+class ReportDaemonTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.socket_path = os.path.join(self.directory.name, 'abuseipdb.sock')
+        self.api = AbuseIpDb('some_API_key')
+        patcher = patch.object(self.api, 'bulk_report', return_value=BULK_RESULT)
+        self.bulk_report = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def start_daemon(self, **kwargs):
+        daemon = ReportDaemon(self.api, self.socket_path, **kwargs)
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        assert daemon.ready.wait(5)
+
+        def stop():
+            daemon.shutdown()
+            thread.join()
+        self.addCleanup(stop)
+        return daemon
+
+    def test_report_is_queued(self):
+        daemon = self.start_daemon()
+        answer = submit_report(self.socket_path, TEST_IP_ADDRESS, 'SSH,15', 'Some comment')
+        assert answer == {'queued': True}
+        assert len(daemon) == 1
+
+    def test_queued_reports_are_uploaded(self):
+        daemon = self.start_daemon()
+        submit_report(self.socket_path, TEST_IP_ADDRESS, 'SSH', 'Some comment')
+        submit_report(self.socket_path, '192.0.2.1', '18')
+        assert daemon.flush() == BULK_RESULT
+        reports = self.bulk_report.call_args[0][0]
+        assert [report[:2] for report in reports] == [(TEST_IP_ADDRESS, '22'), ('192.0.2.1', '18')]
+        assert reports[0][3] == 'Some comment'
+        assert len(daemon) == 0
+
+    def test_flush_without_reports(self):
+        daemon = ReportDaemon(self.api, self.socket_path)
+        assert daemon.flush() is None
+        self.bulk_report.assert_not_called()
+
+    def test_full_queue_is_uploaded(self):
+        uploaded = threading.Event()
+        self.bulk_report.side_effect = lambda reports: uploaded.set() or BULK_RESULT
+        self.start_daemon(max_batch=2)
+        submit_report(self.socket_path, TEST_IP_ADDRESS, 'SSH')
+        submit_report(self.socket_path, '192.0.2.1', 'SSH')
+        assert uploaded.wait(5)
+
+    def test_remaining_reports_are_uploaded_on_shutdown(self):
+        daemon = ReportDaemon(self.api, self.socket_path)
+        thread = threading.Thread(target=daemon.serve_forever)
+        thread.start()
+        assert daemon.ready.wait(5)
+        submit_report(self.socket_path, TEST_IP_ADDRESS, 'SSH')
+        daemon.shutdown()
+        thread.join()
+        assert self.bulk_report.call_count == 1
+        assert not os.path.exists(self.socket_path)
+
+    def test_failed_uploads_are_queued_again(self):
+        daemon = ReportDaemon(self.api, self.socket_path)
+        daemon.submit(TEST_IP_ADDRESS, 'SSH')
+        self.bulk_report.side_effect = OSError
+        with self.assertRaises(OSError):
+            daemon.flush()
+        assert len(daemon) == 1
+
+    def test_invalid_reports_are_refused(self):
+        daemon = self.start_daemon()
+        answer = submit_report(self.socket_path, TEST_IP_ADDRESS, 'invalid')
+        assert 'error' in answer
+        answer = submit_report(self.socket_path, 'malformed.ip.address', 'SSH')
+        assert 'error' in answer
+        assert len(daemon) == 0
+
+    def test_socket_is_only_accessible_by_owner(self):
+        self.start_daemon()
+        mode = os.stat(self.socket_path).st_mode
+        assert stat.S_ISSOCK(mode)
+        assert stat.S_IMODE(mode) & (stat.S_IRWXG | stat.S_IRWXO) == 0
+
+    def test_without_daemon(self):
+        with self.assertRaises(OSError):
+            submit_report(self.socket_path, TEST_IP_ADDRESS, 'SSH')
+
+    def test_invalid_parameters(self):
+        with self.assertRaises(ValueError):
+            ReportDaemon(self.api, self.socket_path, flush_interval=0)
+        with self.assertRaises(ValueError):
+            ReportDaemon(self.api, self.socket_path, max_batch=0)
+
+
+class ReportDaemonUploadTestCase(TestCase):
+    """Failed uploads with the real bulk_report of the API"""
+
+    RATE_LIMITED = [{'detail': 'Daily rate limit of 5 requests exceeded', 'status': 429}]
+
+    def setUp(self):
+        self.api = AbuseIpDb('some_API_key')
+        # Two reports per upload, the header included
+        patcher = patch.object(AbuseIpDbV2.BULK_REPORT, 'MAX_LINES', 3)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.daemon = ReportDaemon(self.api, 'unused.sock', max_batch=10, max_queue=10)
+        for number in range(1, 6):
+            self.daemon.submit('192.0.2.{}'.format(number), 'SSH')
+
+    def queued(self):
+        return [report[0] for report in self.daemon._queue]
+
+    def upload(self, *results):
+        results = iter(results)
+
+        def get_response(endpoint, query, data=None, content_type=None):
+            # Send the body, like requests does
+            b''.join(data)
+            result = next(results)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        return patch.object(self.api.api, '_get_response', side_effect=get_response)
+
+    def test_rate_limited_uploads_are_queued_again(self):
+        saved = {'savedReports': 2, 'invalidReports': []}
+        with self.upload(saved, self.RATE_LIMITED) as mock:
+            result = self.daemon.flush()
+        assert mock.call_count == 2
+        assert result['savedReports'] == 2
+        assert [(upload['firstRow'], upload['lastRow']) for upload in result['uploads']] == [(1, 2), (3, 4)]
+        assert self.queued() == ['192.0.2.3', '192.0.2.4', '192.0.2.5']
+
+    def test_uploads_are_paused_after_rate_limit(self):
+        with self.upload(self.RATE_LIMITED):
+            self.daemon.flush()
+        assert self.daemon._backoff == self.daemon.flush_interval
+        assert self.daemon._paused_until > time.monotonic()
+        with self.upload(self.RATE_LIMITED):
+            self.daemon.flush()
+        assert self.daemon._backoff == min(2 * self.daemon.flush_interval, MAX_BACKOFF)
+        with self.upload(*[{'savedReports': 2, 'invalidReports': []}] * 3):
+            self.daemon.flush()
+        assert self.daemon._backoff == 0
+        assert len(self.daemon) == 0
+
+    def test_server_errors_are_queued_again(self):
+        saved = {'savedReports': 2, 'invalidReports': []}
+        with self.upload(saved, [{'detail': 'Bad gateway', 'status': 502}], saved):
+            result = self.daemon.flush()
+        assert result['savedReports'] == 4
+        assert self.queued() == ['192.0.2.3', '192.0.2.4']
+        assert self.daemon._backoff == 0
+
+    def test_rejected_uploads_are_not_queued_again(self):
+        saved = {'savedReports': 2, 'invalidReports': [{'rowNumber': 1, 'error': 'Duplicate'}]}
+        with self.upload([{'detail': 'Invalid file', 'status': 422}], saved, saved):
+            with self.assertLogs('abuseipdb.daemon', 'ERROR'):
+                result = self.daemon.flush()
+        assert len(self.daemon) == 0
+        assert [report['rowNumber'] for report in result['invalidReports']] == [3, 5]
+
+    def test_only_unsent_uploads_are_queued_again_after_exceptions(self):
+        with self.upload({'savedReports': 2, 'invalidReports': []}, OSError()):
+            with self.assertRaises(OSError):
+                self.daemon.flush()
+        assert self.queued() == ['192.0.2.3', '192.0.2.4', '192.0.2.5']
+
+    def test_queue_is_limited(self):
+        for number in range(6, 11):
+            self.daemon.submit('192.0.2.{}'.format(number), 'SSH')
+        with self.assertRaises(ValueError):
+            self.daemon.submit('192.0.2.11', 'SSH')
+        assert len(self.daemon) == 10
+
+    def test_oldest_reports_are_dropped_from_a_full_queue(self):
+        for number in range(6, 11):
+            self.daemon.submit('192.0.2.{}'.format(number), 'SSH')
+        with self.assertLogs('abuseipdb.daemon', 'WARNING'):
+            self.daemon._requeue([('198.51.100.{}'.format(number), '22', None, '') for number in range(3)])
+        # Reports queued again are older than the queued ones
+        assert self.queued() == ['192.0.2.{}'.format(number) for number in range(1, 11)]
@@ -0,0 +1,192 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from helpers import FakeClock
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.dedup import (MAX_COMMENT_LENGTH, MemoryReportStore,
+                             ReportDeduplicator, SqliteReportStore,
+                             merge_categories, merge_comments)
+
+
+class MergeTestCase(TestCase):
+
+    def test_merge_categories(self):
+        assert merge_categories('18,22', '14,22') == '14,18,22'
+
+    def test_merge_comments(self):
+        assert merge_comments('first', 'second') == 'first\nsecond'
+
+    def test_merge_empty_comments(self):
+        assert merge_comments('', 'second') == 'second'
+        assert merge_comments('first', '') == 'first'
+
+    def test_merge_repeated_comments(self):
+        assert merge_comments('first\nsecond', 'second') == 'first\nsecond'
+
+    def test_merged_comments_are_limited(self):
+        merged = merge_comments('a' * 800, 'b' * 800)
+        assert len(merged) == MAX_COMMENT_LENGTH
+        assert merged.startswith('a' * 800 + '\n')
+
+
+@patch('abuseipdb.AbuseIpDb.report')
+class MemoryReportDeduplicatorTestCase(TestCase):
+
+    # IP addresses from TEST-NET-1 according to RFC 5737
+    TEST_IP_ADDRESS = '192.0.2.123'
+    OTHER_IP_ADDRESS = '192.0.2.124'
+
+    def get_store(self):
+        return MemoryReportStore(maxsize=2)
+
+    def get_deduplicator(self):
+        self.clock = FakeClock(1000.0)
+        abuse = AbuseIpDb(api_key='some_API_key')
+        return ReportDeduplicator(abuse, window=900, store=self.get_store(), clock=self.clock)
+
+    def test_first_report_is_sent(self, mock):
+        dedup = self.get_deduplicator()
+        result = dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'comment')
+        assert result == mock.return_value
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, '22', 'comment')
+
+    def test_repeated_reports_are_held(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'first')
+        self.clock.now += 60
+        result = dedup.report(self.TEST_IP_ADDRESS, [18, 'SSH'], 'second')
+        assert result == {'ipAddress': self.TEST_IP_ADDRESS, 'held': True}
+        assert mock.call_count == 1
+
+    def test_held_reports_are_merged_when_the_window_closes(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'first')
+        dedup.report(self.TEST_IP_ADDRESS, 18, 'second')
+        dedup.report(self.TEST_IP_ADDRESS, 'PORT_SCAN', 'third')
+        assert dedup.flush() == []
+        self.clock.now += 900
+        results = dedup.flush()
+        assert results == [(self.TEST_IP_ADDRESS, mock.return_value)]
+        mock.assert_called_with(self.TEST_IP_ADDRESS, '14,18', 'second\nthird')
+
+    def test_sent_held_report_opens_a_new_window(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        self.clock.now += 900
+        dedup.flush()
+        self.clock.now += 60
+        assert dedup.report(self.TEST_IP_ADDRESS, 'SSH')['held']
+        assert mock.call_count == 2
+
+    def test_report_after_the_window_is_combined_with_held_report(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.store = self.get_store()
+        dedup.store.claim(self.TEST_IP_ADDRESS, '22', '', self.clock.now, 900)
+        dedup.store.claim(self.TEST_IP_ADDRESS, '18', 'held', self.clock.now, 900)
+        self.clock.now += 900
+        # flush() sends it first, so the held report is merged directly
+        with patch.object(dedup, 'flush'):
+            dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'new')
+        mock.assert_called_once_with(self.TEST_IP_ADDRESS, '18,22', 'held\nnew')
+
+    def test_window_without_held_report_is_dropped(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        self.clock.now += 900
+        assert dedup.flush() == []
+        assert len(dedup.store) == 0
+
+    def test_failed_report_closes_the_window(self, mock):
+        mock.side_effect = [OSError(), {}]
+        dedup = self.get_deduplicator()
+        with self.assertRaises(OSError):
+            dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        assert dedup.report(self.TEST_IP_ADDRESS, 'SSH') == {}
+
+    def test_rejected_report_closes_the_window(self, mock):
+        error = [{'detail': 'Daily rate limit of 1000 requests exceeded for this endpoint.', 'status': 429}]
+        mock.side_effect = [error, {}]
+        dedup = self.get_deduplicator()
+        assert dedup.report(self.TEST_IP_ADDRESS, 'SSH') == error
+        assert dedup.report(self.TEST_IP_ADDRESS, 'SSH') == {}
+        assert mock.call_count == 2
+
+    def test_rejected_held_report_is_held_again(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'held')
+        self.clock.now += 900
+        error = [{'detail': 'Daily rate limit of 1000 requests exceeded for this endpoint.', 'status': 429}]
+        mock.side_effect = [error]
+        assert dedup.flush() == [(self.TEST_IP_ADDRESS, error)]
+        mock.side_effect = None
+        assert dedup.flush() == [(self.TEST_IP_ADDRESS, mock.return_value)]
+        mock.assert_called_with(self.TEST_IP_ADDRESS, '22', 'held')
+
+    def test_failed_held_report_is_held_again(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'held')
+        self.clock.now += 900
+        error = OSError()
+        mock.side_effect = [error]
+        assert dedup.flush() == [(self.TEST_IP_ADDRESS, error)]
+        mock.side_effect = None
+        assert dedup.flush() == [(self.TEST_IP_ADDRESS, mock.return_value)]
+        mock.assert_called_with(self.TEST_IP_ADDRESS, '22', 'held')
+
+    def test_oldest_window_is_evicted(self, mock):
+        dedup = self.get_deduplicator()
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH')
+        dedup.report(self.TEST_IP_ADDRESS, 'SSH', 'held')
+        self.clock.now += 1
+        dedup.report(self.OTHER_IP_ADDRESS, 'SSH')
+        self.clock.now += 1
+        dedup.report('192.0.2.125', 'SSH')
+        assert len(dedup.store) == 2
+        # The held report is sent early
+        mock.assert_any_call(self.TEST_IP_ADDRESS, '22', 'held')
+
+    def test_invalid_reports_are_refused(self, mock):
+        dedup = self.get_deduplicator()
+        with self.assertRaises(ValueError):
+            dedup.report('not an IP address', 'SSH')
+        with self.assertRaises(ValueError):
+            dedup.report(self.TEST_IP_ADDRESS, 'no category')
+        mock.assert_not_called()
+
+    def test_window_must_be_positive(self, mock):
+        with self.assertRaises(ValueError):
+            ReportDeduplicator(AbuseIpDb(api_key='some_API_key'), window=0)
+
+
+class SqliteReportDeduplicatorTestCase(MemoryReportDeduplicatorTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.stores = []
+
+    def tearDown(self):
+        for store in self.stores:
+            store.close()
+        self.directory.cleanup()
+
+    def get_store(self):
+        store = SqliteReportStore(os.path.join(self.directory.name, 'dedup.sqlite'), maxsize=2)
+        self.stores.append(store)
+        return store
+
+    @patch('abuseipdb.AbuseIpDb.report')
+    def test_processes_share_the_windows(self, mock):
+        first = self.get_deduplicator()
+        second = ReportDeduplicator(first.api, window=900, store=self.get_store(), clock=self.clock)
+        first.report(self.TEST_IP_ADDRESS, 'SSH', 'first')
+        assert second.report(self.TEST_IP_ADDRESS, 'SSH', 'second')['held']
+        self.clock.now += 900
+        assert second.flush() == [(self.TEST_IP_ADDRESS, mock.return_value)]
+        assert first.flush() == []
+        assert mock.call_count == 2
@@ -0,0 +1,293 @@
+import io
+import ipaddress
+import os
+import tempfile
+from argparse import Namespace
+from unittest import TestCase
+from unittest.mock import patch
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.cli import main as abuseipdb_cli
+from abuseipdb.firewall import (ADDED, REMOVED, FirewallState, IpsetFormat,
+                                Network, NftFormat, collapse_addresses,
+                                diff_networks, export_firewall)
+from abuseipdb.models import BlacklistEntry
+
+# Addresses from TEST-NET-1 according to RFC 5737 and the IPv6 documentation prefix
+ADDRESSES = ['192.0.2.3', '192.0.2.0', '192.0.2.1', '192.0.2.2', '192.0.2.5', '2001:db8::1', '2001:db8::']
+
+
+def networks(*cidrs):
+    return [
+        Network(network.version, int(network.network_address), network.prefixlen)
+        for network in map(ipaddress.ip_network, cidrs)]
+
+
+class CollapseAddressesTestCase(TestCase):
+
+    def test_adjacent_addresses_are_collapsed(self):
+        assert collapse_addresses(ADDRESSES) == {
+            4: networks('192.0.2.0/30', '192.0.2.5/32'),
+            6: networks('2001:db8::/127'),
+        }
+
+    def test_unaligned_ranges(self):
+        ip_addresses = [str(ipaddress.ip_address('198.51.100.3') + offset) for offset in range(10)]
+        result = collapse_addresses(ip_addresses)[4]
+        assert result == networks('198.51.100.3/32', '198.51.100.4/30', '198.51.100.8/30', '198.51.100.12/32')
+        assert result == networks(*map(str, ipaddress.summarize_address_range(
+            ipaddress.ip_address('198.51.100.3'), ipaddress.ip_address('198.51.100.12'))))
+
+    def test_matches_ipaddress(self):
+        ip_addresses = ['10.0.{}.{}'.format(i % 7, i * 37 % 256) for i in range(2000)]
+        expected = ipaddress.collapse_addresses(ipaddress.ip_address(ip) for ip in ip_addresses)
+        assert collapse_addresses(ip_addresses)[4] == networks(*map(str, expected))
+
+    def test_whole_address_space(self):
+        assert collapse_addresses(['0.0.0.0', '0.0.0.1'])[4] == networks('0.0.0.0/31')
+        assert collapse_addresses(['255.255.255.255'])[4] == networks('255.255.255.255/32')
+
+    def test_duplicates_and_entries(self):
+        entries = [{'ipAddress': '192.0.2.1'}, '192.0.2.1', BlacklistEntry.from_dict({'ipAddress': '192.0.2.0'})]
+        assert collapse_addresses(entries) == {4: networks('192.0.2.0/31'), 6: []}
+
+    def test_invalid_address(self):
+        with self.assertRaises(ValueError):
+            collapse_addresses(['no address'])
+
+    def test_network_text(self):
+        assert [str(network) for network in networks('192.0.2.0/30', '192.0.2.5/32', '2001:db8::/127')] == [
+            '192.0.2.0/30', '192.0.2.5', '2001:db8::/127']
+
+
+class FormatTestCase(TestCase):
+
+    def test_nft(self):
+        lines = list(NftFormat().replace(collapse_addresses(ADDRESSES)))
+        assert ''.join(lines) == (
+            'table inet abuseipdb {\n'
+            '\tset abuseipdb_v4 {\n'
+            '\t\ttype ipv4_addr\n'
+            '\t\tflags interval\n'
+            '\t}\n'
+            '\tset abuseipdb_v6 {\n'
+            '\t\ttype ipv6_addr\n'
+            '\t\tflags interval\n'
+            '\t}\n'
+            '}\n'
+            'flush set inet abuseipdb abuseipdb_v4\n'
+            'flush set inet abuseipdb abuseipdb_v6\n'
+            'add element inet abuseipdb abuseipdb_v4 { 192.0.2.0/30, 192.0.2.5 }\n'
+            'add element inet abuseipdb abuseipdb_v6 { 2001:db8::/127 }\n')
+
+    def test_nft_elements_are_chunked(self):
+        ip_addresses = ['192.0.2.{}'.format(i) for i in range(0, 256, 2)]
+        with patch.object(NftFormat, 'CHUNK_SIZE', 50):
+            lines = list(NftFormat('blocked', table='filter').replace(collapse_addresses(ip_addresses)))
+        elements = [line for line in lines if line.startswith('add element')]
+        assert [line.count(',') + 1 for line in elements] == [50, 50, 28]
+        assert all(line.startswith('add element inet filter blocked_v4 { ') for line in elements)
+
+    def test_ipset(self):
+        lines = list(IpsetFormat(maxelem=65536).replace(collapse_addresses(ADDRESSES)))
+        assert lines == [
+            'create abuseipdb_v4 hash:net family inet maxelem 65536 -exist\n',
+            'create abuseipdb_v4_tmp hash:net family inet maxelem 65536 -exist\n',
+            'flush abuseipdb_v4_tmp\n',
+            'add abuseipdb_v4_tmp 192.0.2.0/30\n',
+            'add abuseipdb_v4_tmp 192.0.2.5\n',
+            'swap abuseipdb_v4_tmp abuseipdb_v4\n',
+            'destroy abuseipdb_v4_tmp\n',
+            'create abuseipdb_v6 hash:net family inet6 maxelem 65536 -exist\n',
+            'create abuseipdb_v6_tmp hash:net family inet6 maxelem 65536 -exist\n',
+            'flush abuseipdb_v6_tmp\n',
+            'add abuseipdb_v6_tmp 2001:db8::/127\n',
+            'swap abuseipdb_v6_tmp abuseipdb_v6\n',
+            'destroy abuseipdb_v6_tmp\n',
+        ]
+
+    def test_empty_blacklist(self):
+        lines = list(NftFormat().replace(collapse_addresses([])))
+        assert not [line for line in lines if line.startswith('add')]
+        assert 'flush set inet abuseipdb abuseipdb_v6\n' in lines
+
+    def test_unknown_firewall(self):
+        with self.assertRaises(ValueError):
+            export_firewall(ADDRESSES, 'iptables')
+
+
+class DiffNetworksTestCase(TestCase):
+
+    def test_diff(self):
+        old = networks('192.0.2.0/31', '192.0.2.4/32', '2001:db8::1/128')
+        new = networks('192.0.2.0/32', '192.0.2.4/32', '198.51.100.0/30')
+        assert list(diff_networks(old, new)) == [
+            (REMOVED, networks('192.0.2.0/31')[0]),
+            (ADDED, networks('192.0.2.0/32')[0]),
+            (ADDED, networks('198.51.100.0/30')[0]),
+            (REMOVED, networks('2001:db8::1/128')[0]),
+        ]
+
+    def test_no_changes(self):
+        assert list(diff_networks(networks('192.0.2.0/31'), networks('192.0.2.0/31'))) == []
+        assert list(diff_networks([], [])) == []
+
+
+class FirewallStateTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.state = FirewallState(os.path.join(self.directory.name, 'abuseipdb.state'))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        stored = collapse_addresses(ADDRESSES + ['ffff:ffff:ffff:ffff:ffff:ffff:ffff:ffff'])
+        self.state.save('nft inet abuseipdb abuseipdb', stored)
+        assert list(self.state.load('nft inet abuseipdb abuseipdb')) == stored[4] + stored[6]
+        assert os.path.getsize(self.state.file_name) == 20 + len('nft inet abuseipdb abuseipdb') + 18 * 4
+
+    def test_read_in_chunks(self):
+        stored = collapse_addresses('192.0.2.{}'.format(i) for i in range(0, 256, 2))
+        self.state.save('ipset abuseipdb', stored)
+        with patch.object(FirewallState, 'CHUNK_RECORDS', 10):
+            assert list(self.state.load('ipset abuseipdb')) == stored[4]
+
+    def test_missing_state(self):
+        assert self.state.load('ipset abuseipdb') is None
+
+    def test_other_target(self):
+        self.state.save('ipset abuseipdb', collapse_addresses(ADDRESSES))
+        assert self.state.load('ipset blocked') is None
+        assert self.state.load('nft inet abuseipdb abuseipdb') is None
+
+    def test_no_state_file(self):
+        with open(self.state.file_name, 'wb') as state:
+            state.write(b'192.0.2.1\n')
+        assert self.state.load('ipset abuseipdb') is None
+
+    def test_truncated_state(self):
+        self.state.save('ipset abuseipdb', collapse_addresses(ADDRESSES))
+        with open(self.state.file_name, 'r+b') as state:
+            state.truncate(os.path.getsize(self.state.file_name) - 1)
+        with self.assertRaises(ValueError):
+            list(self.state.load('ipset abuseipdb'))
+
+
+class DifferentialExportTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.state_file = os.path.join(self.directory.name, 'abuseipdb.state')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def export(self, ip_addresses, firewall='nft', full=False):
+        return export_firewall(ip_addresses, firewall, state_file=self.state_file, full=full)
+
+    def test_first_export_replaces_the_sets(self):
+        export = self.export(ADDRESSES)
+        assert export.full
+        assert ''.join(export) == ''.join(NftFormat().replace(collapse_addresses(ADDRESSES)))
+        assert not os.path.exists(self.state_file)
+        export.commit()
+        assert os.path.exists(self.state_file)
+
+    def test_nft_changes(self):
+        self.export(ADDRESSES).commit()
+        export = self.export(['192.0.2.0', '192.0.2.1', '192.0.2.5', '2001:db8::', '2001:db8::1', '198.51.100.7'])
+        assert not export.full
+        assert (export.added, export.removed) == (2, 1)
+        assert list(export) == [
+            'delete element inet abuseipdb abuseipdb_v4 { 192.0.2.0/30 }\n',
+            'add element inet abuseipdb abuseipdb_v4 { 192.0.2.0/31, 198.51.100.7 }\n',
+        ]
+
+    def test_ipset_changes(self):
+        self.export(ADDRESSES, 'ipset').commit()
+        assert list(self.export(['192.0.2.5', '2001:db8::2'], 'ipset')) == [
+            'del abuseipdb_v4 192.0.2.0/30 -exist\n',
+            'del abuseipdb_v6 2001:db8::/127 -exist\n',
+            'add abuseipdb_v6 2001:db8::2 -exist\n',
+        ]
+
+    def test_unchanged_blacklist(self):
+        self.export(ADDRESSES).commit()
+        assert list(self.export(list(reversed(ADDRESSES)))) == []
+
+    def test_state_is_only_stored_on_commit(self):
+        self.export(ADDRESSES).commit()
+        self.export(['192.0.2.5'])
+        assert self.export(['192.0.2.5']).removed == 2
+
+    def test_full_resync(self):
+        self.export(ADDRESSES, 'ipset').commit()
+        export = self.export(['192.0.2.5'], 'ipset', full=True)
+        assert export.full
+        assert 'swap abuseipdb_v4_tmp abuseipdb_v4\n' in list(export)
+        export.commit()
+        assert list(self.export(['192.0.2.5'], 'ipset')) == []
+
+    def test_other_firewall_replaces_the_sets(self):
+        self.export(ADDRESSES, 'ipset').commit()
+        assert self.export(ADDRESSES, 'nft').full
+
+
+class ExportFirewallTestCase(TestCase):
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(ADDRESSES))
+    def test_export_firewall(self, mock):
+        lines = list(AbuseIpDb('some_API_key').export_firewall('ipset', 'blocked', confidence_minimum=90, limit=500))
+        mock.assert_called_once_with(90, 500, plaintext=True)
+        assert 'add blocked_v4_tmp 192.0.2.0/30\n' in lines
+
+    @patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(ADDRESSES))
+    def test_command_line(self, mock, api_key_mock):
+        args = Namespace(
+            action='export', api_version=2, cache_file=None, cache_ttl=3600, config_file="/etc/abiseipdb",
+            confidence_minimum=100, limit=10000, firewall='nft', set_name='abuseipdb', output=None,
+            state_file=None, full=False)
+        stdout = io.StringIO()
+        with patch('abuseipdb.cli._parse_parameter', return_value=args):
+            with patch('sys.stdout', stdout):
+                abuseipdb_cli()
+        mock.assert_called_once_with(100, 10000, plaintext=True)
+        assert stdout.getvalue().endswith('add element inet abuseipdb abuseipdb_v6 { 2001:db8::/127 }\n')
+
+    @patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+    def test_command_line__state_file(self, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            args = Namespace(
+                action='export', api_version=2, cache_file=None, cache_ttl=3600, config_file="/etc/abiseipdb",
+                confidence_minimum=100, limit=10000, firewall='nft', set_name='abuseipdb', output=None,
+                state_file=os.path.join(directory, 'abuseipdb.state'), full=False)
+            outputs = []
+            for ip_addresses in (ADDRESSES, ADDRESSES[1:]):
+                stdout = io.StringIO()
+                with patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(ip_addresses)):
+                    with patch('abuseipdb.cli._parse_parameter', return_value=args):
+                        with patch('sys.stdout', stdout):
+                            abuseipdb_cli()
+                outputs.append(stdout.getvalue())
+        assert outputs[0].startswith('table inet abuseipdb {\n')
+        assert outputs[1] == (
+            'delete element inet abuseipdb abuseipdb_v4 { 192.0.2.0/30 }\n'
+            'add element inet abuseipdb abuseipdb_v4 { 192.0.2.0/31, 192.0.2.2 }\n')
+
+    @patch('abuseipdb.cli._read_api_key_and_subscriber_status', return_value=("SomeAPIkey", False))
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(ADDRESSES))
+    def test_command_line__output(self, mock, api_key_mock):
+        with tempfile.TemporaryDirectory() as directory:
+            file_name = os.path.join(directory, 'abuseipdb.ipset')
+            args = Namespace(
+                action='export', api_version=2, cache_file=None, cache_ttl=3600, config_file="/etc/abiseipdb",
+                confidence_minimum=100, limit=10000, firewall='ipset', set_name='abuseipdb', output=file_name,
+                state_file=None, full=False)
+            with patch('abuseipdb.cli._parse_parameter', return_value=args):
+                abuseipdb_cli()
+            with open(file_name) as output:
+                lines = output.readlines()
+        assert lines[-1] == 'destroy abuseipdb_v6_tmp\n'
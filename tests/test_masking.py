@@ -0,0 +1,73 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from helpers import FakeClock
+
+from abuseipdb.masking import SensitiveDataMasker
+
+
+class SensitiveDataMaskerTestCase(TestCase):
+
+    def setUp(self):
+        patches = [
+            patch('pwd.getpwall', return_value=[('root',), ('Alice',), ('mail',)]),
+            patch('socket.gethostname', return_value='myhost'),
+            patch('socket.getfqdn', return_value='myhost.example.net'),
+            patch('socket.gethostbyname_ex', return_value=('myhost.example.net', ['www.example.net'], ['192.0.2.10'])),
+            patch('socket.getaddrinfo', return_value=[
+                (10, 1, 6, '', ('2001:db8::10%eth0', 0, 0, 0)),
+                (2, 1, 6, '', ('127.0.1.1', 0))]),
+        ]
+        self.mocks = [mock.start() for mock in patches]
+        for mock in patches:
+            self.addCleanup(mock.stop)
+        self.clock = FakeClock()
+        self.masker = SensitiveDataMasker(ttl=60, clock=self.clock)
+
+    def test_words(self):
+        assert self.masker.mask('Failed password for root on myhost') == 'Failed password for *user* on *host*'
+
+    def test_case_is_ignored(self):
+        assert self.masker.mask('ALICE logged in on MyHost') == '*user* logged in on *host*'
+
+    def test_host_aliases(self):
+        comment = 'myhost.example.net www.example.net 192.0.2.10 2001:db8::10'
+        assert self.masker.mask(comment) == '*host* *host* *host* *host*'
+
+    def test_loopback_addresses_are_kept(self):
+        assert self.masker.mask('127.0.1.1 localhost') == '127.0.1.1 localhost'
+
+    def test_names_inside_words(self):
+        assert self.masker.mask('user=root,host=[myhost]:') == 'user=*user*,host=[*host*]:'
+        assert self.masker.mask('root@myhost') == '*user*@*host*'
+        assert self.masker.mask('myhost:22 root:x:0:0') == '*host*:22 *user*:x:0:0'
+        assert self.masker.mask('sshd[123]: myhost. (192.0.2.10:22)') == 'sshd[123]: *host*. (*host*:22)'
+
+    def test_names_as_part_of_other_words_are_kept(self):
+        comment = 'notmyhost rootkit mail.example.com myhost_1 192.0.2.100'
+        assert self.masker.mask(comment) == comment
+
+    def test_email_addresses(self):
+        comment = 'from=<sender.address@example.com>, to=root@mail.example.org'
+        assert self.masker.mask(comment) == 'from=<*email*>, to=*email*'
+
+    def test_other_addresses_are_kept(self):
+        comment = 'client_address=192.0.2.123, sender=root@'
+        assert self.masker.mask(comment) == 'client_address=192.0.2.123, sender=*user*@'
+
+    def test_users_are_cached(self):
+        self.masker.mask('root')
+        self.masker.mask('root')
+        assert self.mocks[0].call_count == 1
+        assert self.mocks[1].call_count == 1
+
+    def test_users_are_refreshed_after_ttl(self):
+        self.masker.mask('root')
+        self.clock.now = 60
+        self.mocks[0].return_value = [('bob',)]
+        assert self.masker.mask('root bob') == 'root *user*'
+
+    def test_unresolvable_host(self):
+        self.mocks[3].side_effect = OSError()
+        self.mocks[4].side_effect = OSError()
+        assert self.masker.mask('myhost 192.0.2.10') == '*host* 192.0.2.10'
@@ -0,0 +1,141 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from requests import ConnectionError
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.cache import LookupCache
+from abuseipdb.metrics import (Counter, Histogram, Instrumentation,
+                               InstrumentationChain, MetricsRegistry)
+from abuseipdb.retry import RetryPolicy
+
+# IP address from TEST-NET-1 according to RFC 5737
+TEST_IP_ADDRESS = '192.0.2.123'
+
+
+def response(status_code=200, payload=None, headers=None):
+    content = json.dumps({'data': payload or {}}).encode('utf-8')
+    return MagicMock(status_code=status_code, headers=headers or {}, content=content)
+
+
+class RecordingInstrumentation(Instrumentation):
+
+    def __init__(self):
+        self.calls = []
+
+    def before_request(self, endpoint, method):
+        self.calls.append(('before', endpoint, method))
+
+    def after_request(self, endpoint, method, status_code, elapsed, response_size=None, headers=None,
+                      error=None):
+        self.calls.append(('after', endpoint, method, status_code, response_size, type(error)))
+
+
+class MetricTestCase(TestCase):
+
+    def test_counter(self):
+        counter = Counter('requests_total', 'Requests.', ('endpoint',))
+        counter.inc('check')
+        counter.inc('check', amount=2)
+        assert counter.value('check') == 3
+        assert counter.value('report') == 0
+
+    def test_labels_must_match(self):
+        counter = Counter('requests_total', 'Requests.', ('endpoint', 'status'))
+        with self.assertRaises(ValueError):
+            counter.inc('check')
+
+    def test_histogram_exposition(self):
+        histogram = Histogram('latency_seconds', 'Latency.', ('endpoint',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe('check', value=value)
+        assert histogram.count('check') == 4
+        assert histogram.exposition() == '\n'.join([
+            '# HELP latency_seconds Latency.',
+            '# TYPE latency_seconds histogram',
+            'latency_seconds_bucket{endpoint="check",le="0.1"} 2',
+            'latency_seconds_bucket{endpoint="check",le="1"} 3',
+            'latency_seconds_bucket{endpoint="check",le="+Inf"} 4',
+            'latency_seconds_sum{endpoint="check"} 2.65',
+            'latency_seconds_count{endpoint="check"} 4',
+        ])
+
+    def test_label_values_are_escaped(self):
+        counter = Counter('errors_total', 'Errors.', ('detail',))
+        counter.inc('say "hi"\\\n')
+        assert counter.exposition().endswith('errors_total{detail="say \\"hi\\"\\\\\\n"} 1')
+
+
+class MetricsRegistryTestCase(TestCase):
+
+    def get_api(self, **kwargs):
+        self.metrics = MetricsRegistry()
+        return AbuseIpDb('some_API_key', instrumentation=self.metrics, **kwargs)
+
+    @patch('requests.Session.request', return_value=response(headers={
+        'Content-Length': '1234', 'X-RateLimit-Remaining': '998'}))
+    def test_requests_are_measured(self, mock):
+        self.get_api().check(TEST_IP_ADDRESS)
+        assert self.metrics.requests.value('check', '200') == 1
+        assert self.metrics.latency.count('check') == 1
+        assert self.metrics.response_size.sum('check') == 1234
+        assert self.metrics.quota_remaining.value('check') == 998
+
+    @patch('requests.Session.request', return_value=response())
+    def test_size_without_content_length(self, mock):
+        self.get_api().check(TEST_IP_ADDRESS)
+        assert self.metrics.response_size.sum('check') == len(b'{"data": {}}')
+
+    @patch('requests.Session.request', side_effect=[ConnectionError(), response()])
+    def test_retries_and_failures_are_counted(self, mock):
+        self.get_api(retry_policy=RetryPolicy(backoff_factor=0)).check(TEST_IP_ADDRESS)
+        assert self.metrics.requests.value('check', 'error') == 1
+        assert self.metrics.requests.value('check', '200') == 1
+        assert self.metrics.retries.value('check') == 1
+
+    @patch('requests.Session.request', return_value=response(payload={'ipAddress': TEST_IP_ADDRESS}))
+    def test_cache_lookups_are_counted(self, mock):
+        abuse = self.get_api(cache=LookupCache())
+        abuse.check(TEST_IP_ADDRESS)
+        abuse.check(TEST_IP_ADDRESS)
+        assert self.metrics.cache_lookups.value('check', 'miss') == 1
+        assert self.metrics.cache_lookups.value('check', 'hit') == 1
+        assert mock.call_count == 1
+
+    @patch('requests.Session.request', return_value=response(headers={'X-RateLimit-Remaining': '998'}))
+    def test_prometheus_text(self, mock):
+        self.get_api().check(TEST_IP_ADDRESS)
+        lines = self.metrics.prometheus_text().splitlines()
+        assert '# TYPE abuseipdb_requests_total counter' in lines
+        assert 'abuseipdb_requests_total{endpoint="check",status="200"} 1' in lines
+        assert 'abuseipdb_request_duration_seconds_count{endpoint="check"} 1' in lines
+        assert 'abuseipdb_rate_limit_remaining{endpoint="check"} 998' in lines
+
+    def test_empty_registry(self):
+        text = MetricsRegistry().prometheus_text()
+        assert '# TYPE abuseipdb_retries_total counter' in text
+        assert text.endswith('\n')
+
+
+class InstrumentationTestCase(TestCase):
+
+    @patch('requests.Session.request', return_value=response(headers={'Content-Length': '12'}))
+    def test_hooks_are_called(self, mock):
+        hooks = RecordingInstrumentation()
+        AbuseIpDb('some_API_key', instrumentation=hooks).report(TEST_IP_ADDRESS, '18')
+        assert hooks.calls == [('before', 'report', 'POST'), ('after', 'report', 'POST', 200, 12, type(None))]
+
+    @patch('requests.Session.request', side_effect=ConnectionError())
+    def test_failed_requests_are_reported(self, mock):
+        hooks = RecordingInstrumentation()
+        with self.assertRaises(ConnectionError):
+            AbuseIpDb('some_API_key', instrumentation=hooks).check(TEST_IP_ADDRESS)
+        assert hooks.calls[-1] == ('after', 'check', 'GET', None, None, ConnectionError)
+
+    @patch('requests.Session.request', return_value=response())
+    def test_chain(self, mock):
+        first, second = RecordingInstrumentation(), RecordingInstrumentation()
+        AbuseIpDb('some_API_key', instrumentation=InstrumentationChain(first, second)).check(TEST_IP_ADDRESS)
+        assert first.calls == second.calls
+        assert len(first.calls) == 2
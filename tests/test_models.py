@@ -0,0 +1,157 @@
+import datetime
+import ipaddress
+from unittest import TestCase
+from unittest.mock import patch
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.models import (BlacklistEntry, BlockResult, CheckResult,
+                              ReportedAddress, is_error)
+
+# IP addresses from TEST-NET-1 according to RFC 5737
+CHECK = {
+    'ipAddress': '192.0.2.123',
+    'isPublic': True,
+    'ipVersion': 4,
+    'isWhitelisted': False,
+    'abuseConfidenceScore': 75,
+    'countryCode': 'US',
+    'usageType': 'Data Center/Web Hosting/Transit',
+    'isp': 'Example Hosting',
+    'domain': 'example.com',
+    'hostnames': ['host.example.com'],
+    'totalReports': 12,
+    'numDistinctUsers': 4,
+    'lastReportedAt': '2026-10-01T12:00:00+00:00',
+}
+
+BLOCK = {
+    'networkAddress': '192.0.2.0',
+    'netmask': '255.255.255.0',
+    'minAddress': '192.0.2.1',
+    'maxAddress': '192.0.2.254',
+    'numPossibleHosts': 254,
+    'addressSpaceDesc': 'Internet',
+    'reportedAddress': [{
+        'ipAddress': '192.0.2.1',
+        'numReports': 3,
+        'mostRecentReport': '2026-10-01T14:00:00+02:00',
+        'abuseConfidenceScore': 50,
+        'countryCode': 'US',
+    }],
+}
+
+BLACKLIST = [
+    {'ipAddress': '192.0.2.1', 'countryCode': 'US', 'abuseConfidenceScore': 100,
+     'lastReportedAt': '2026-10-01T12:00:00+00:00'},
+    {'ipAddress': '2001:db8::1', 'countryCode': 'DE', 'abuseConfidenceScore': 90,
+     'lastReportedAt': '2026-10-01T12:00:00+00:00'},
+]
+
+ERRORS = [{'detail': 'Daily rate limit of 1000 requests exceeded for this endpoint.', 'status': 429}]
+
+TIMESTAMP = datetime.datetime(2026, 10, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+class ModelsTestCase(TestCase):
+
+    def test_check_result(self):
+        result = CheckResult.from_dict(CHECK)
+        assert result.ip_address == ipaddress.ip_address('192.0.2.123')
+        assert result.key == int(ipaddress.ip_address('192.0.2.123'))
+        assert result.last_reported_at == TIMESTAMP
+        assert result.abuse_confidence_score == 75
+        assert result.to_dict() == CHECK
+
+    def test_unknown_fields_are_kept(self):
+        data = dict(CHECK, isTor=False)
+        result = CheckResult.from_dict(data)
+        assert result.extra == {'isTor': False}
+        assert result.to_dict() == data
+
+    def test_missing_fields(self):
+        result = CheckResult.from_dict({'ipAddress': '2001:db8::1'})
+        assert result.version == 6
+        assert result.last_reported_at is None
+        assert result.abuse_confidence_score is None
+
+    def test_block_result(self):
+        result = BlockResult.from_dict(BLOCK)
+        assert result.network == ipaddress.ip_network('192.0.2.0/24')
+        assert result.reported_addresses == [ReportedAddress(
+            4, int(ipaddress.ip_address('192.0.2.1')), 3, int(TIMESTAMP.timestamp()), 50, 'US')]
+        assert result.reported_addresses[0].most_recent_report_at == TIMESTAMP
+        data = result.to_dict()
+        assert data['reportedAddress'][0]['mostRecentReport'] == '2026-10-01T12:00:00+00:00'
+        assert dict(data, reportedAddress=None) == dict(BLOCK, reportedAddress=None)
+
+    def test_ipv6_block(self):
+        result = BlockResult.from_dict({'networkAddress': '2001:db8::', 'netmask': 'ffff:ffff:ffff:ffff::'})
+        assert result.network == ipaddress.ip_network('2001:db8::/64')
+
+    def test_blacklist_entry(self):
+        entries = [BlacklistEntry.from_dict(entry) for entry in BLACKLIST]
+        assert [str(entry.ip_address) for entry in entries] == ['192.0.2.1', '2001:db8::1']
+        assert entries[1].last_reported_at == TIMESTAMP
+        assert [entry.to_dict() for entry in entries] == BLACKLIST
+
+    def test_models_use_slots(self):
+        entry = BlacklistEntry.from_dict(BLACKLIST[0])
+        with self.assertRaises(AttributeError):
+            entry.comment = 'not a field'
+
+    def test_is_error(self):
+        assert is_error(ERRORS)
+        assert not is_error(BLACKLIST)
+        assert not is_error([])
+
+
+class ModelsApiTestCase(TestCase):
+
+    def get_api(self):
+        return AbuseIpDb('some_API_key', models=True)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value=CHECK)
+    def test_check(self, mock):
+        assert self.get_api().check('192.0.2.123') == CheckResult.from_dict(CHECK)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value=ERRORS)
+    def test_errors_are_returned_unchanged(self, mock):
+        assert self.get_api().check('192.0.2.123') == ERRORS
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=BLOCK)
+    def test_check_block(self, mock):
+        assert isinstance(self.get_api().check_block('192.0.2.0/24'), BlockResult)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.blacklist', return_value=BLACKLIST)
+    def test_blacklist(self, mock):
+        entries = self.get_api().blacklist()
+        assert [entry.to_dict() for entry in entries] == BLACKLIST
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.blacklist', return_value=ERRORS)
+    def test_blacklist_errors(self, mock):
+        assert self.get_api().blacklist() == ERRORS
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(BLACKLIST))
+    def test_iter_blacklist(self, mock):
+        assert all(isinstance(entry, BlacklistEntry) for entry in self.get_api().iter_blacklist())
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(['192.0.2.1']))
+    def test_iter_blacklist_plaintext(self, mock):
+        assert list(self.get_api().iter_blacklist(plaintext=True)) == ['192.0.2.1']
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=BLOCK)
+    def test_sweep_network(self, mock):
+        entries = list(self.get_api().sweep_network('192.0.2.0/24'))
+        assert entries == BlockResult.from_dict(BLOCK).reported_addresses
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', return_value=CHECK)
+    def test_dictionaries_by_default(self, mock):
+        assert AbuseIpDb('some_API_key').check('192.0.2.123') == CHECK
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=BLOCK)
+    def test_planned_check_many(self, mock):
+        from abuseipdb.planner import CheckPlanner
+        addresses = ['192.0.2.1', '192.0.2.2']
+        result = dict(self.get_api().check_many(addresses, planner=CheckPlanner(block_cost=1)))
+        assert result['192.0.2.1'].total_reports == 3
+        assert result['192.0.2.2'].total_reports == 0
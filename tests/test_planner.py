@@ -0,0 +1,106 @@
+import ipaddress
+from unittest import TestCase
+from unittest.mock import patch
+
+from requests import HTTPError
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.planner import CheckPlanner, answer_from_block
+
+# IP addresses from TEST-NET-1 and TEST-NET-2 according to RFC 5737
+CLUSTERED = ['192.0.2.{}'.format(number) for number in range(1, 13)]
+SCATTERED = ['198.51.100.1', '198.51.100.2', '2001:db8::1']
+
+BLOCK = {
+    'networkAddress': '192.0.2.0',
+    'netmask': '255.255.255.0',
+    'reportedAddress': [
+        {
+            'ipAddress': '192.0.2.1',
+            'numReports': 3,
+            'mostRecentReport': '2026-10-01T12:00:00+00:00',
+            'abuseConfidenceScore': 42,
+            'countryCode': 'US',
+        },
+    ],
+}
+
+
+class CheckPlannerTestCase(TestCase):
+
+    def test_clustered_addresses_are_checked_as_block(self):
+        plan = CheckPlanner().plan(CLUSTERED + SCATTERED)
+        assert plan.blocks == [(ipaddress.ip_network('192.0.2.0/24'), CLUSTERED)]
+        assert sorted(plan.checks) == sorted(SCATTERED)
+        assert len(plan) == 4
+        assert plan.cost == 13
+
+    def test_few_addresses_are_checked_one_by_one(self):
+        plan = CheckPlanner().plan(CLUSTERED[:10])
+        assert plan.blocks == []
+        assert plan.checks == CLUSTERED[:10]
+
+    def test_ipv6_addresses_are_grouped_by_64(self):
+        addresses = ['2001:db8::1', '2001:db8::ffff:1', '2001:db8:0:1::1']
+        plan = CheckPlanner(block_cost=1).plan(addresses)
+        assert plan.blocks == [(ipaddress.ip_network('2001:db8::/64'), addresses[:2])]
+        assert plan.checks == addresses[2:]
+
+    def test_invalid_addresses_are_checked_one_by_one(self):
+        plan = CheckPlanner(block_cost=1).plan(['malformed.ip.address'])
+        assert plan.checks == ['malformed.ip.address']
+
+    def test_costs_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            CheckPlanner(block_cost=0)
+
+
+class AnswerFromBlockTestCase(TestCase):
+
+    def test_reported_address(self):
+        result = dict(answer_from_block(['192.0.2.1', '192.0.2.2'], BLOCK))
+        assert result['192.0.2.1'] == {
+            'ipAddress': '192.0.2.1',
+            'abuseConfidenceScore': 42,
+            'countryCode': 'US',
+            'lastReportedAt': '2026-10-01T12:00:00+00:00',
+            'totalReports': 3,
+        }
+        assert result['192.0.2.2']['totalReports'] == 0
+        assert result['192.0.2.2']['abuseConfidenceScore'] == 0
+
+    def test_errors_are_returned_for_each_address(self):
+        errors = [{'detail': 'Daily rate limit exceeded'}]
+        assert answer_from_block(['192.0.2.1', '192.0.2.2'], errors) == [
+            ('192.0.2.1', errors), ('192.0.2.2', errors)]
+
+
+class PlannedCheckManyTestCase(TestCase):
+
+    def get_api(self):
+        return AbuseIpDb('some_API_key')
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=BLOCK)
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check', side_effect=lambda ip, days: {'ipAddress': ip})
+    def test_blocks_answer_their_addresses(self, check, check_block):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(CLUSTERED + SCATTERED, max_age_in_days=30, planner=CheckPlanner()))
+        assert sorted(result) == sorted(CLUSTERED + SCATTERED)
+        assert result['192.0.2.1']['totalReports'] == 3
+        assert result['198.51.100.1'] == {'ipAddress': '198.51.100.1'}
+        check_block.assert_called_once_with('192.0.2.0/24', 30)
+        assert check.call_count == len(SCATTERED)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', side_effect=HTTPError)
+    def test_failed_blocks_yield_the_error_for_each_address(self, mock):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(CLUSTERED, planner=CheckPlanner()))
+        assert sorted(result) == sorted(CLUSTERED)
+        assert all(isinstance(error, HTTPError) for error in result.values())
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check')
+    def test_invalid_addresses_yield_an_error(self, mock):
+        abuse = self.get_api()
+        result = dict(abuse.check_many(['malformed.ip.address'], planner=CheckPlanner()))
+        assert isinstance(result['malformed.ip.address'], ValueError)
+        mock.assert_not_called()
@@ -0,0 +1,184 @@
+import asyncio
+import threading
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from helpers import FakeClock
+from requests import ConnectionError
+
+from abuseipdb.api_v2 import AbuseIpDbV2
+from abuseipdb.ratelimit import RateLimiter, RateLimitExceeded
+
+
+def rate_limit_headers(limit=1000, remaining=999, reset=2000):
+    return {
+        'X-RateLimit-Limit': str(limit),
+        'X-RateLimit-Remaining': str(remaining),
+        'X-RateLimit-Reset': str(reset),
+    }
+
+
+class RateLimiterTestCase(TestCase):
+
+    def get_limiter(self, **kwargs):
+        self.clock = FakeClock(1000.0)
+        return RateLimiter(clock=self.clock, sleep=self.clock.sleep, **kwargs)
+
+    def test_unknown_limit_is_not_limited(self):
+        limiter = self.get_limiter()
+        for _ in range(100):
+            limiter.acquire('check')
+        assert self.clock.sleeps == []
+
+    def test_remaining_requests_are_used(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=2))
+        limiter.acquire('check')
+        limiter.acquire('check')
+        assert self.clock.sleeps == []
+        assert limiter.bucket('check').tokens == 0
+
+    def test_waits_until_reset(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=0, reset=1500))
+        limiter.acquire('check')
+        assert self.clock.sleeps == [500]
+
+    def test_endpoints_have_separate_buckets(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=0))
+        limiter.acquire('report')
+        assert self.clock.sleeps == []
+
+    def test_requests_in_flight_are_taken_off(self):
+        limiter = self.get_limiter()
+        for _ in range(3):
+            limiter.acquire('check')
+        # The server counted only the first request
+        limiter.update('check', 200, rate_limit_headers(remaining=5))
+        assert limiter.bucket('check').tokens == 3
+
+    def test_released_requests_are_not_in_flight(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.release('check')
+        assert limiter.bucket('check').in_flight == 0
+
+    def test_retry_after(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 429, {'Retry-After': '30'})
+        limiter.acquire('check')
+        assert self.clock.sleeps == [30]
+
+    def test_retry_after_with_reset(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        headers = rate_limit_headers(remaining=0, reset=1100)
+        headers['Retry-After'] = '100'
+        limiter.update('check', 429, headers)
+        limiter.acquire('check')
+        assert self.clock.sleeps == [100]
+
+    def test_invalid_headers_are_ignored(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 200, {'X-RateLimit-Remaining': 'many'})
+        assert limiter.bucket('check').tokens is None
+
+    def test_fail_fast(self):
+        limiter = self.get_limiter(block=False)
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=0, reset=1060))
+        with self.assertRaises(RateLimitExceeded) as context:
+            limiter.acquire('check')
+        assert context.exception.endpoint == 'check'
+        assert context.exception.retry_after == 60
+        assert self.clock.sleeps == []
+
+    def test_max_wait(self):
+        limiter = self.get_limiter(max_wait=10)
+        limiter.acquire('check')
+        limiter.update('check', 429, {'Retry-After': '5'})
+        limiter.acquire('check')
+        limiter.update('check', 429, {'Retry-After': '3600'})
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire('check')
+        assert self.clock.sleeps == [5]
+
+    def test_daily_reset_exceeds_default_max_wait(self):
+        limiter = self.get_limiter()
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=0, reset=1000 + 6 * 3600))
+        with self.assertRaises(RateLimitExceeded):
+            limiter.acquire('check')
+        assert self.clock.sleeps == []
+
+    def test_wait_until_daily_reset(self):
+        limiter = self.get_limiter(max_wait=None)
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=0, reset=1000 + 6 * 3600))
+        limiter.acquire('check')
+        assert self.clock.sleeps == [6 * 3600]
+
+    def test_acquire_async(self):
+        limiter = RateLimiter()
+        limiter.acquire('check')
+        limiter.update('check', 429, {'Retry-After': '0.01'})
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(limiter.acquire_async('check'))
+        finally:
+            loop.close()
+        assert limiter.bucket('check').in_flight == 1
+
+    def test_tokens_are_not_overdrawn_by_threads(self):
+        limiter = RateLimiter(block=False)
+        limiter.acquire('check')
+        limiter.update('check', 200, rate_limit_headers(remaining=50, reset=2 ** 40))
+        acquired = []
+
+        def acquire():
+            for _ in range(20):
+                try:
+                    limiter.acquire('check')
+                    acquired.append(1)
+                except RateLimitExceeded:
+                    pass
+
+        threads = [threading.Thread(target=acquire) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(acquired) == 50
+
+
+@patch('requests.Session.request')
+class ApiV2RateLimitTestCase(TestCase):
+
+    def get_api(self, limiter):
+        return AbuseIpDbV2(api_key='some_API_key', rate_limiter=limiter)
+
+    def test_headers_update_the_limiter(self, mock):
+        mock.return_value = MagicMock(
+            status_code=200, headers=rate_limit_headers(remaining=0, reset=2 ** 40), content=b'{"data": {}}')
+        limiter = RateLimiter(block=False)
+        abuse = self.get_api(limiter)
+        abuse.check('192.0.2.123')
+        with self.assertRaises(RateLimitExceeded):
+            abuse.check('192.0.2.123')
+        assert mock.call_count == 1
+        abuse.report('192.0.2.123', '22')
+        assert mock.call_count == 2
+
+    def test_failed_requests_are_released(self, mock):
+        mock.side_effect = ConnectionError()
+        limiter = RateLimiter()
+        abuse = self.get_api(limiter)
+        with self.assertRaises(ConnectionError):
+            abuse.check('192.0.2.123')
+        assert limiter.bucket('check').in_flight == 0
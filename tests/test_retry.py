@@ -0,0 +1,164 @@
+import json
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from helpers import FakeClock
+from requests import ConnectionError, HTTPError, Timeout
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.ratelimit import RateLimiter, RateLimitExceeded
+from abuseipdb.retry import CircuitBreaker, CircuitOpenError, RetryPolicy
+
+
+def response(status_code, payload=None):
+    fake = MagicMock(status_code=status_code, content=json.dumps(payload).encode('utf-8'))
+    if status_code >= 400:
+        fake.raise_for_status.side_effect = HTTPError(response=fake)
+    return fake
+
+
+class RetryPolicyTestCase(TestCase):
+
+    def test_backoff_is_exponential(self):
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=100, random=lambda: 1.0)
+        assert [policy.backoff(attempt) for attempt in range(4)] == [0.5, 1.0, 2.0, 4.0]
+
+    def test_backoff_is_capped(self):
+        policy = RetryPolicy(backoff_factor=0.5, max_backoff=3, random=lambda: 1.0)
+        assert policy.backoff(10) == 3
+
+    def test_backoff_is_jittered(self):
+        policy = RetryPolicy(backoff_factor=1, random=lambda: 0.25)
+        assert policy.backoff(2) == 1.0
+
+    def test_max_retries_must_not_be_negative(self):
+        with self.assertRaises(ValueError):
+            RetryPolicy(max_retries=-1)
+
+
+class CircuitBreakerTestCase(TestCase):
+
+    def get_breaker(self):
+        self.clock = FakeClock()
+        return CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=self.clock)
+
+    def test_opens_after_threshold(self):
+        breaker = self.get_breaker()
+        for _ in range(3):
+            breaker.before_request()
+            breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        with self.assertRaises(CircuitOpenError) as context:
+            breaker.before_request()
+        assert context.exception.retry_after == 30
+
+    def test_success_resets_failures(self):
+        breaker = self.get_breaker()
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_single_probe_after_timeout(self):
+        breaker = self.get_breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self.clock.now = 30
+        breaker.before_request()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        breaker.before_request()
+
+    def test_failed_probe_opens_again(self):
+        breaker = self.get_breaker()
+        for _ in range(3):
+            breaker.record_failure()
+        self.clock.now = 30
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        self.clock.now = 59
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_request()
+
+    def test_failure_threshold_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0)
+
+
+@patch('requests.Session.request')
+class ApiRetryTestCase(TestCase):
+
+    TEST_IP_ADDRESS = '192.0.2.123'
+
+    def get_api(self, rate_limiter=None, **kwargs):
+        self.sleeps = []
+        policy = RetryPolicy(max_retries=2, random=lambda: 1.0, sleep=self.sleeps.append, **kwargs)
+        return AbuseIpDb(api_key='some_API_key', retry_policy=policy, rate_limiter=rate_limiter)
+
+    def test_server_errors_are_retried(self, mock):
+        mock.side_effect = [response(503), response(502), response(200, {'data': {'ipAddress': '192.0.2.123'}})]
+        abuse = self.get_api()
+        assert abuse.check(self.TEST_IP_ADDRESS) == {'ipAddress': self.TEST_IP_ADDRESS}
+        assert mock.call_count == 3
+        assert self.sleeps == [0.5, 1.0]
+
+    def test_connection_errors_are_retried(self, mock):
+        mock.side_effect = [ConnectionError(), Timeout(), response(200, {'data': {}})]
+        abuse = self.get_api()
+        assert abuse.check_block('192.0.2.0/24') == {}
+        assert mock.call_count == 3
+
+    def test_retries_are_limited(self, mock):
+        mock.side_effect = [response(500), response(500), response(500), response(200)]
+        abuse = self.get_api()
+        with self.assertRaises(HTTPError):
+            abuse.check(self.TEST_IP_ADDRESS)
+        assert mock.call_count == 3
+
+    def test_connection_errors_are_raised_after_retries(self, mock):
+        mock.side_effect = ConnectionError()
+        abuse = self.get_api()
+        with self.assertRaises(ConnectionError):
+            abuse.blacklist()
+        assert mock.call_count == 3
+
+    def test_client_errors_are_not_retried(self, mock):
+        mock.return_value = response(404)
+        abuse = self.get_api()
+        with self.assertRaises(HTTPError):
+            abuse.check(self.TEST_IP_ADDRESS)
+        assert mock.call_count == 1
+
+    def test_reports_are_not_retried(self, mock):
+        mock.side_effect = [response(503), response(200, {'data': {}})]
+        abuse = self.get_api()
+        with self.assertRaises(HTTPError):
+            abuse.report(self.TEST_IP_ADDRESS, '22')
+        assert mock.call_count == 1
+
+    def test_open_circuit_short_circuits_requests(self, mock):
+        mock.side_effect = ConnectionError()
+        abuse = self.get_api(circuit_breaker=CircuitBreaker(failure_threshold=3))
+        with self.assertRaises(ConnectionError):
+            abuse.check(self.TEST_IP_ADDRESS)
+        with self.assertRaises(CircuitOpenError):
+            abuse.report(self.TEST_IP_ADDRESS, '22')
+        assert mock.call_count == 3
+
+    def test_errors_of_the_client_do_not_open_the_circuit(self, mock):
+        mock.return_value = response(200, {'data': {}})
+        limiter = RateLimiter(block=False, clock=lambda: 1000.0)
+        limiter.acquire('check')
+        limiter.update('check', 200, {
+            'X-RateLimit-Limit': '1000', 'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '2000'})
+        abuse = self.get_api(rate_limiter=limiter, circuit_breaker=CircuitBreaker(failure_threshold=2))
+        for _ in range(3):
+            with self.assertRaises(RateLimitExceeded):
+                abuse.check(self.TEST_IP_ADDRESS)
+        assert abuse.report(self.TEST_IP_ADDRESS, '22') == {}
+        assert mock.call_count == 1
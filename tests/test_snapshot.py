@@ -0,0 +1,116 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from abuseipdb.blacklist import BlacklistIndex
+from abuseipdb.snapshot import BlacklistSnapshot, write_snapshot
+
+# IP addresses from the documentation ranges according to RFC 5737 and RFC 3849
+BLACKLIST = [
+    {'ipAddress': '198.51.100.7', 'abuseConfidenceScore': 100, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.123', 'abuseConfidenceScore': 90, 'lastReportedAt': '2020-01-31T12:00:00+01:00'},
+    {'ipAddress': '2001:db8::1', 'abuseConfidenceScore': 75, 'lastReportedAt': '2020-01-31T11:00:00+00:00'},
+    {'ipAddress': '2001:db8:ffff::1', 'abuseConfidenceScore': 50, 'lastReportedAt': '2020-01-31T11:00:00+00:00'},
+    {'ipAddress': '203.0.113.5', 'abuseConfidenceScore': 100, 'lastReportedAt': None},
+]
+
+
+class SnapshotTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_name = os.path.join(self.directory.name, 'blacklist.snapshot')
+
+    def get_snapshot(self, entries=BLACKLIST):
+        write_snapshot(self.file_name, entries)
+        snapshot = BlacklistSnapshot(self.file_name)
+        self.addCleanup(snapshot.close)
+        return snapshot
+
+    def test_length(self):
+        assert len(self.get_snapshot()) == 5
+
+    def test_contains(self):
+        snapshot = self.get_snapshot()
+        assert snapshot.contains('192.0.2.123')
+        assert snapshot.contains('2001:db8::1')
+        assert snapshot.contains('2001:db8:ffff::1')
+        assert not snapshot.contains('192.0.2.124')
+        assert not snapshot.contains('2001:db8::2')
+
+    def test_contains_many(self):
+        snapshot = self.get_snapshot()
+        result = snapshot.contains_many(['192.0.2.123', '192.0.2.1', '2001:db8::1', '255.255.255.255', '::'])
+        assert result == [True, False, True, False, False]
+
+    def test_lookup(self):
+        snapshot = self.get_snapshot()
+        assert snapshot.lookup('198.51.100.7') == (100, 1580472000)
+        assert snapshot.lookup('192.0.2.123') == (90, 1580468400)
+        assert snapshot.lookup('2001:db8::1') == (75, 1580468400)
+        assert snapshot.lookup('203.0.113.5') == (100, 0)
+        assert snapshot.lookup('192.0.2.1') is None
+
+    def test_written_from_index(self):
+        snapshot = self.get_snapshot(BlacklistIndex(BLACKLIST))
+        assert len(snapshot) == 5
+
+    def test_empty(self):
+        snapshot = self.get_snapshot([])
+        assert len(snapshot) == 0
+        assert not snapshot.contains('192.0.2.123')
+        assert not snapshot.contains('2001:db8::1')
+
+    def test_file_is_replaced(self):
+        snapshot = self.get_snapshot()
+        write_snapshot(self.file_name, BLACKLIST[:1])
+        # The old mapping stays valid
+        assert len(snapshot) == 5
+        with BlacklistSnapshot(self.file_name) as replaced:
+            assert len(replaced) == 1
+        assert os.listdir(self.directory.name) == ['blacklist.snapshot']
+
+    def test_temporary_file_is_removed_on_error(self):
+        with patch('os.replace', side_effect=OSError):
+            with self.assertRaises(OSError):
+                write_snapshot(self.file_name, BLACKLIST)
+        assert os.listdir(self.directory.name) == []
+
+    def test_close(self):
+        snapshot = self.get_snapshot()
+        snapshot.contains('192.0.2.123')
+        snapshot.close()
+        with self.assertRaises(ValueError):
+            snapshot.contains('192.0.2.123')
+
+    def test_created(self):
+        assert self.get_snapshot().created > 0
+
+    def test_invalid_file(self):
+        with open(self.file_name, 'wb') as invalid:
+            invalid.write(b'\0' * 128)
+        with self.assertRaises(ValueError):
+            BlacklistSnapshot(self.file_name)
+
+    def test_short_file(self):
+        with open(self.file_name, 'wb') as invalid:
+            invalid.write(b'ABIPDBSN')
+        with self.assertRaises(ValueError):
+            BlacklistSnapshot(self.file_name)
+
+    def test_unsupported_version(self):
+        write_snapshot(self.file_name, BLACKLIST)
+        with open(self.file_name, 'r+b') as snapshot:
+            snapshot.seek(8)
+            snapshot.write(b'\xff\xff')
+        with self.assertRaises(ValueError):
+            BlacklistSnapshot(self.file_name)
+
+    def test_truncated_file(self):
+        write_snapshot(self.file_name, BLACKLIST)
+        with open(self.file_name, 'r+b') as snapshot:
+            snapshot.truncate(80)
+        with self.assertRaises(ValueError):
+            BlacklistSnapshot(self.file_name)
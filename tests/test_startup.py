@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOADED_MODULES = """
+import sys
+from abuseipdb.cli import main
+sys.argv = ['abuseipdb', '-f', {config!r}] + {argv!r}
+main()
+print(' '.join(sorted(module for module in {modules!r} if module in sys.modules)))
+"""
+
+
+class StartupTestCase(TestCase):
+    """The command line interface must only load what a command needs
+
+    Each case runs in a fresh interpreter, as other tests import everything.
+    """
+
+    HEAVY_MODULES = ('concurrent.futures', 'json', 'requests', 'socket', 'sqlite3')
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config = os.path.join(self.directory.name, 'abuseipdb')
+        with open(self.config, 'w') as config:
+            config.write('[AbuseIPDB]\napi_key = some_API_key\n')
+        os.chmod(self.config, 0o600)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def loaded_modules(self, code):
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        result = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+            stdout=subprocess.PIPE, universal_newlines=True)
+        return set(result.stdout.splitlines()[-1].split())
+
+    def heavy_modules(self, argv=None):
+        # Modules already loaded by the interpreter, e.g. by site, don't count
+        code = 'import sys; print(" ".join(m for m in {!r} if m in sys.modules))'
+        before = self.loaded_modules(code.format(self.HEAVY_MODULES))
+        if argv is None:
+            code = 'import sys, abuseipdb.cli; print(" ".join(m for m in {!r} if m in sys.modules))'
+            code = code.format(self.HEAVY_MODULES)
+        else:
+            code = LOADED_MODULES.format(config=self.config, argv=argv, modules=self.HEAVY_MODULES)
+        return self.loaded_modules(code) - before
+
+    def test_import_loads_no_heavy_modules(self):
+        assert self.heavy_modules() == set()
+
+    def test_list_categories_loads_no_heavy_modules(self):
+        assert self.heavy_modules(['list_categories']) == set()
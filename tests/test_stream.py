@@ -0,0 +1,63 @@
+import json
+from unittest import TestCase
+
+from abuseipdb.stream import iter_json_array
+
+BLACKLIST = {
+    'meta': {'generatedAt': '2020-01-31T12:00:00+00:00'},
+    'data': [
+        {'ipAddress': '192.0.2.123', 'abuseConfidenceScore': 100, 'countryCode': 'ÄÖ'},
+        {'ipAddress': '2001:db8::1', 'abuseConfidenceScore': 1234567890},
+        {'ipAddress': '198.51.100.7', 'nested': {'list': [1, 2, {'key': '"]}'}]}},
+    ],
+}
+
+
+def split(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterJsonArrayTestCase(TestCase):
+
+    def test_items_are_yielded(self):
+        body = json.dumps(BLACKLIST).encode('utf-8')
+        assert list(iter_json_array([body])) == BLACKLIST['data']
+
+    def test_any_chunk_size(self):
+        body = json.dumps(BLACKLIST, ensure_ascii=False, indent=2).encode('utf-8')
+        for size in (1, 2, 3, 7, 64):
+            assert list(iter_json_array(split(body, size))) == BLACKLIST['data'], size
+
+    def test_numbers_split_between_chunks(self):
+        body = b'{"data": [1234, 5678]}'
+        assert list(iter_json_array(split(body, 3))) == [1234, 5678]
+
+    def test_members_after_the_array_are_skipped(self):
+        body = b'{"data": [1], "meta": {"some": "thing"}}'
+        assert list(iter_json_array([body])) == [1]
+
+    def test_empty_array(self):
+        assert list(iter_json_array([b'{"data": []}'])) == []
+
+    def test_missing_key(self):
+        assert list(iter_json_array([b'{"errors": [{"status": 429}]}'])) == []
+
+    def test_empty_object(self):
+        assert list(iter_json_array([b' { } '])) == []
+
+    def test_other_key(self):
+        assert list(iter_json_array([b'{"errors": [{"status": 429}]}'], key='errors')) == [{'status': 429}]
+
+    def test_items_are_parsed_lazily(self):
+        def chunks():
+            yield b'{"data": [1, '
+            raise AssertionError('Read too far')
+        assert next(iter_json_array(chunks())) == 1
+
+    def test_truncated_input(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'{"data": [{"ipAddress": "192.0']))
+
+    def test_invalid_input(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array([b'[1, 2]']))
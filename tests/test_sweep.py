@@ -0,0 +1,94 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from requests import HTTPError
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.sweep import BlockCheckError
+
+
+def reported(*ip_addresses):
+    return {'reportedAddress': [{'ipAddress': ip, 'abuseConfidenceScore': 50} for ip in ip_addresses]}
+
+
+# Reported addresses of the blocks of 198.51.100.0/22 in TEST-NET-2
+BLOCKS = {
+    '198.51.100.0/24': reported('198.51.100.200', '198.51.100.3'),
+    '198.51.101.0/24': reported(),
+    '198.51.102.0/24': reported('198.51.102.1'),
+    '198.51.103.0/24': reported('198.51.103.20', '198.51.103.100', '198.51.103.9'),
+}
+
+
+class SweepNetworkTestCase(TestCase):
+
+    def get_api(self, subscriber=False):
+        return AbuseIpDb('some_API_key', subscriber=subscriber)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', side_effect=lambda network, days: BLOCKS[network])
+    def test_network_is_split_into_blocks(self, mock):
+        abuse = self.get_api()
+        entries = list(abuse.sweep_network('198.51.100.0/22', max_age_in_days=60))
+        assert sorted(call[0] for call in mock.call_args_list) == [(block, 60) for block in sorted(BLOCKS)]
+        assert [entry['ipAddress'] for entry in entries] == [
+            '198.51.100.3', '198.51.100.200', '198.51.102.1',
+            '198.51.103.9', '198.51.103.20', '198.51.103.100']
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=reported('198.51.100.1'))
+    def test_small_networks_are_checked_at_once(self, mock):
+        abuse = self.get_api()
+        assert len(list(abuse.sweep_network('198.51.100.0/25'))) == 1
+        mock.assert_called_once_with('198.51.100.0/25', None)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=reported())
+    def test_subscribers_check_larger_blocks(self, mock):
+        abuse = self.get_api(subscriber=True)
+        list(abuse.sweep_network('10.0.0.0/16'))
+        assert mock.call_count == 16
+        mock.assert_any_call('10.0.240.0/20', None)
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=reported())
+    def test_ipv6_networks_are_split_into_64(self, mock):
+        abuse = self.get_api()
+        list(abuse.sweep_network('2001:db8::/62'))
+        assert mock.call_count == 4
+
+    def test_blocks_completed_out_of_order_are_sorted(self):
+        first_block = threading.Event()
+
+        def check_block(network, days):
+            if network == '198.51.100.0/24':
+                first_block.wait(5)
+            elif network == '198.51.103.0/24':
+                first_block.set()
+            return BLOCKS[network]
+        abuse = self.get_api()
+        with patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', side_effect=check_block):
+            entries = list(abuse.sweep_network('198.51.100.0/22', concurrency=4))
+        assert entries[0]['ipAddress'] == '198.51.100.3'
+        assert entries[-1]['ipAddress'] == '198.51.103.100'
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', return_value=[{'detail': 'Daily rate limit exceeded'}])
+    def test_api_errors_are_raised(self, mock):
+        abuse = self.get_api()
+        with self.assertRaises(BlockCheckError) as context:
+            list(abuse.sweep_network('198.51.100.0/24'))
+        assert 'Daily rate limit exceeded' in str(context.exception)
+        assert context.exception.errors == [{'detail': 'Daily rate limit exceeded'}]
+
+    @patch('abuseipdb.api_v2.AbuseIpDbV2.check_block', side_effect=HTTPError)
+    def test_failed_requests_are_raised(self, mock):
+        abuse = self.get_api()
+        with self.assertRaises(HTTPError):
+            list(abuse.sweep_network('198.51.100.0/23'))
+
+    def test_invalid_network(self):
+        abuse = self.get_api()
+        with self.assertRaises(ValueError):
+            abuse.sweep_network('198.51.100.1/24')
+
+    def test_invalid_concurrency(self):
+        abuse = self.get_api()
+        with self.assertRaises(ValueError):
+            abuse.sweep_network('198.51.100.0/24', concurrency=0)
@@ -0,0 +1,132 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from abuseipdb import AbuseIpDb
+from abuseipdb.blacklist import BlacklistIndex
+from abuseipdb.snapshot import BlacklistSnapshot
+from abuseipdb.sync import BlacklistChange, BlacklistSync, diff_blacklists
+
+# IP addresses from the documentation ranges according to RFC 5737 and RFC 3849
+OLD_BLACKLIST = [
+    {'ipAddress': '192.0.2.1', 'abuseConfidenceScore': 100, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.2', 'abuseConfidenceScore': 90, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.3', 'abuseConfidenceScore': 80, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '2001:db8::1', 'abuseConfidenceScore': 75, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+]
+NEW_BLACKLIST = [
+    {'ipAddress': '192.0.2.1', 'abuseConfidenceScore': 100, 'lastReportedAt': '2020-02-01T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.2', 'abuseConfidenceScore': 95, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '192.0.2.4', 'abuseConfidenceScore': 85, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+    {'ipAddress': '2001:db8::2', 'abuseConfidenceScore': 75, 'lastReportedAt': '2020-01-31T12:00:00+00:00'},
+]
+EXPECTED_CHANGES = [
+    BlacklistChange('change', '192.0.2.2', 95, 1580472000),
+    BlacklistChange('remove', '192.0.2.3', 80, 1580472000),
+    BlacklistChange('add', '192.0.2.4', 85, 1580472000),
+    BlacklistChange('remove', '2001:db8::1', 75, 1580472000),
+    BlacklistChange('add', '2001:db8::2', 75, 1580472000),
+]
+
+
+class DiffBlacklistsTestCase(TestCase):
+
+    def test_changes(self):
+        changes = list(diff_blacklists(BlacklistIndex(OLD_BLACKLIST), BlacklistIndex(NEW_BLACKLIST)))
+        assert changes == EXPECTED_CHANGES
+
+    def test_no_changes(self):
+        assert list(diff_blacklists(BlacklistIndex(OLD_BLACKLIST), BlacklistIndex(OLD_BLACKLIST))) == []
+
+    def test_from_empty(self):
+        changes = list(diff_blacklists(BlacklistIndex([]), BlacklistIndex(OLD_BLACKLIST)))
+        assert [change.action for change in changes] == ['add'] * 4
+
+    def test_to_empty(self):
+        changes = list(diff_blacklists(BlacklistIndex(OLD_BLACKLIST), BlacklistIndex([])))
+        assert [change.action for change in changes] == ['remove'] * 4
+
+    def test_ipv6_mapped_to_small_integers(self):
+        old = BlacklistIndex([])
+        new = BlacklistIndex([{'ipAddress': '::1'}])
+        assert list(diff_blacklists(old, new)) == [BlacklistChange('add', '::1', 0, 0)]
+
+
+class BlacklistSyncTestCase(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.file_name = os.path.join(self.directory.name, 'blacklist.snapshot')
+        self.api = MagicMock()
+
+    def sync(self, blacklist, commit=True, **kwargs):
+        self.api.iter_blacklist.return_value = iter(blacklist)
+        sync = BlacklistSync(self.api, self.file_name, **kwargs)
+        delta = sync.sync()
+        if commit:
+            list(delta)
+            delta.commit()
+        return sync, delta
+
+    def test_first_sync_adds_everything(self):
+        sync, delta = self.sync(OLD_BLACKLIST, commit=False)
+        assert len(list(delta)) == 4
+        assert delta.added == 4
+        assert sync.metrics['entries'] == 4
+
+    def test_changes_since_last_sync(self):
+        self.sync(OLD_BLACKLIST)
+        sync, delta = self.sync(NEW_BLACKLIST, commit=False)
+        assert list(delta) == EXPECTED_CHANGES
+        assert (delta.added, delta.removed, delta.changed) == (2, 2, 1)
+
+    def test_changes_are_iterated_lazily(self):
+        self.sync(OLD_BLACKLIST)
+        sync, delta = self.sync(NEW_BLACKLIST, commit=False)
+        changes = iter(delta)
+        assert next(changes) == EXPECTED_CHANGES[0]
+        assert 'diff_seconds' not in sync.metrics
+
+    def test_state_is_persisted(self):
+        self.sync(NEW_BLACKLIST)
+        with BlacklistSnapshot(self.file_name) as snapshot:
+            assert list(snapshot.records()) == list(BlacklistIndex(NEW_BLACKLIST).records())
+
+    def test_state_is_kept_until_commit(self):
+        self.sync(OLD_BLACKLIST)
+        self.sync(NEW_BLACKLIST, commit=False)
+        sync, delta = self.sync(NEW_BLACKLIST, commit=False)
+        assert list(delta) == EXPECTED_CHANGES
+        delta.commit()
+        sync, delta = self.sync(NEW_BLACKLIST, commit=False)
+        assert list(delta) == []
+
+    def test_metrics(self):
+        sync, delta = self.sync(OLD_BLACKLIST)
+        assert sorted(sync.metrics.keys()) == [
+            'added', 'changed', 'diff_seconds', 'entries', 'fetch_seconds',
+            'persist_seconds', 'removed', 'total_seconds']
+        assert sync.metrics['total_seconds'] >= sync.metrics['fetch_seconds']
+
+    def test_parameters_are_passed_on(self):
+        self.sync([], confidence_minimum=90, limit=100)
+        self.api.iter_blacklist.assert_called_once_with(90, 100)
+
+    def test_state_is_kept_on_errors(self):
+        self.sync(OLD_BLACKLIST)
+        self.api.iter_blacklist.side_effect = OSError
+        with self.assertRaises(OSError):
+            BlacklistSync(self.api, self.file_name).sync()
+        with BlacklistSnapshot(self.file_name) as snapshot:
+            assert len(snapshot) == 4
+
+    def test_models(self):
+        self.sync(OLD_BLACKLIST)
+        with patch('abuseipdb.api_v2.AbuseIpDbV2.iter_blacklist', return_value=iter(NEW_BLACKLIST)):
+            delta = BlacklistSync(AbuseIpDb('some_API_key', models=True), self.file_name).sync()
+        assert list(delta) == EXPECTED_CHANGES
+        delta.commit()
+        with BlacklistSnapshot(self.file_name) as snapshot:
+            assert list(snapshot.records()) == list(BlacklistIndex(NEW_BLACKLIST).records())
@@ -0,0 +1,60 @@
+import threading
+import time
+from unittest import TestCase
+
+from abuseipdb.workers import imap_unordered
+
+
+class ImapUnorderedTestCase(TestCase):
+
+    def test_all_results_are_yielded(self):
+        result = dict(imap_unordered(lambda x: x * 2, range(100), 4))
+        assert result == {x: x * 2 for x in range(100)}
+
+    def test_exceptions_are_yielded_as_results(self):
+        def func(x):
+            if x == 3:
+                raise ValueError(x)
+            return x
+        result = dict(imap_unordered(func, range(5), 2))
+        assert isinstance(result.pop(3), ValueError)
+        assert result == {0: 0, 1: 1, 2: 2, 4: 4}
+
+    def test_results_are_yielded_as_they_complete(self):
+        def func(x):
+            time.sleep(x)
+            return x
+        result = [item for item, _ in imap_unordered(func, [0.2, 0.0], 2)]
+        assert result == [0.0, 0.2]
+
+    def test_items_are_consumed_lazily(self):
+        consumed = []
+
+        def items():
+            for x in range(1000):
+                consumed.append(x)
+                yield x
+
+        results = imap_unordered(lambda x: x, items(), 2)
+        next(results)
+        assert len(consumed) < 10
+        results.close()
+
+    def test_concurrency_is_bounded(self):
+        lock = threading.Lock()
+        state = {'active': 0, 'maximum': 0}
+
+        def func(x):
+            with lock:
+                state['active'] += 1
+                state['maximum'] = max(state['maximum'], state['active'])
+            time.sleep(0.005)
+            with lock:
+                state['active'] -= 1
+
+        list(imap_unordered(func, range(20), 3))
+        assert state['maximum'] <= 3
+
+    def test_number_of_workers_must_be_positive(self):
+        with self.assertRaises(ValueError):
+            imap_unordered(lambda x: x, [], 0)